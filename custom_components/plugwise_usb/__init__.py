@@ -1,30 +1,92 @@
 """Support for Plugwise devices connected to a Plugwise USB-stick."""
 
 import asyncio
+from datetime import timedelta
+from functools import partial
 import logging
+from time import monotonic
 from typing import Any, TypedDict
 
 from plugwise_usb import Stick
 from plugwise_usb.api import NodeEvent
 from plugwise_usb.exceptions import NodeError, StickError
 
-from homeassistant.components.device_tracker import ATTR_MAC
-from homeassistant.core import HomeAssistant, ServiceCall, callback
-from homeassistant.exceptions import ConfigEntryNotReady, HomeAssistantError
+from homeassistant.const import (
+    EVENT_HOMEASSISTANT_FINAL_WRITE,
+    EVENT_HOMEASSISTANT_STOP,
+)
+from homeassistant.core import HomeAssistant, SupportsResponse, callback
+from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.storage import STORAGE_DIR
 
+from .cache_writer import PlugwiseUSBCacheWriter
 from .const import (
+    CACHE_WRITER,
+    CONF_CACHE_FLUSH_INTERVAL,
+    CONF_DISCOVERY_TIMEOUT,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_NETWORK_REFRESH,
+    CONF_POLL_INTERVAL,
+    CONF_POLL_RATE,
+    CONF_POWER_WINDOW,
+    CONF_PUSH_WINDOW,
+    CONF_UNAVAILABLE_GRACE,
+    CONF_UNAVAILABLE_POLLS,
     CONF_USB_PATH,
+    DEFAULT_CACHE_FLUSH_INTERVAL,
+    DEFAULT_DISCOVERY_TIMEOUT,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DEFAULT_NETWORK_REFRESH,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_POLL_RATE,
+    DEFAULT_POWER_WINDOW,
+    DEFAULT_PUSH_WINDOW,
+    DEFAULT_UNAVAILABLE_GRACE,
+    DEFAULT_UNAVAILABLE_POLLS,
     DOMAIN,
+    ENERGY_STATISTICS,
+    ENTITY_DISPATCHER,
+    INVENTORY,
+    NETWORK_REFRESH_MAX_IN_FLIGHT,
     NODES,
     PLUGWISE_USB_PLATFORMS,
+    REQUEST_QUEUE,
+    SCHEDULER,
     SERVICE_DISABLE_PRODUCTION,
     SERVICE_ENABLE_PRODUCTION,
-    SERVICE_USB_DEVICE_SCHEMA,
+    SERVICE_START_RECORDING,
+    SERVICE_START_RECORDING_SCHEMA,
+    SERVICE_STOP_RECORDING,
+    SERVICE_SWITCH_RELAYS,
+    SETUP_TIMINGS,
+    SNAPSHOT,
+    SNAPSHOT_SAVE_INTERVAL,
     STICK,
+    TRAFFIC_RECORDER,
+)
+from .coordinator import (
+    PlugwiseUSBConfigEntry,
+    PlugwiseUSBDataUpdateCoordinator,
+    PlugwiseUSBNetworkCoordinator,
 )
-from .coordinator import PlugwiseUSBConfigEntry, PlugwiseUSBDataUpdateCoordinator
+from .dispatcher import PlugwiseUSBEntityDispatcher
+from .energy_statistics import PlugwiseUSBEnergyStatistics
+from .inventory import PlugwiseUSBInventory
+from .request_queue import PlugwiseUSBRequestQueue
+from .scheduler import PlugwiseUSBPollScheduler
+from .services import (
+    SERVICE_DISABLE_PRODUCTION_SCHEMA,
+    SERVICE_ENABLE_PRODUCTION_SCHEMA,
+    SERVICE_SWITCH_RELAYS_SCHEMA,
+    async_set_energy_intervals,
+    async_switch_relays,
+)
+from .snapshot import PlugwiseUSBSnapshot
+from .traffic import PlugwiseUSBTrafficRecorder
 
 _LOGGER = logging.getLogger(__name__)
 UNSUBSCRIBE_DISCOVERY = "unsubscribe_discovery"
@@ -37,6 +99,23 @@ class NodeConfigEntry(TypedDict):
     coordinator: PlugwiseUSBDataUpdateCoordinator
 
 
+def _poll_settings(
+    config_entry: PlugwiseUSBConfigEntry,
+) -> tuple[timedelta, float, timedelta, timedelta]:
+    """Return poll interval, poll rate and poll interval limits from the options."""
+    options = config_entry.options
+    return (
+        timedelta(seconds=options.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL)),
+        options.get(CONF_POLL_RATE, DEFAULT_POLL_RATE),
+        timedelta(
+            seconds=options.get(CONF_MIN_POLL_INTERVAL, DEFAULT_MIN_POLL_INTERVAL)
+        ),
+        timedelta(
+            seconds=options.get(CONF_MAX_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL)
+        ),
+    )
+
+
 async def async_setup_entry(hass: HomeAssistant, config_entry: PlugwiseUSBConfigEntry):
     """Establish connection with plugwise USB-stick."""
 
@@ -55,9 +134,24 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: PlugwiseUSBConfig
     api_stick.cache_folder = hass.config.path(
         STORAGE_DIR, f"plugwisecache-{config_entry.entry_id}"
     )
-    config_entry.runtime_data = {STICK: api_stick}
+    # Duration in seconds of each phase of the setup, for the diagnostics
+    setup_timings: dict[str, float] = {}
+    config_entry.runtime_data = {STICK: api_stick, SETUP_TIMINGS: setup_timings}
+    cache_flush_interval = config_entry.options.get(
+        CONF_CACHE_FLUSH_INTERVAL, DEFAULT_CACHE_FLUSH_INTERVAL
+    )
+    cache_writer = PlugwiseUSBCacheWriter(
+        hass, api_stick.cache_folder, cache_flush_interval
+    )
+    if cache_flush_interval:
+        cache_writer.async_start()
+    # Unload callbacks run after async_unload_entry disconnected the Stick, so
+    # the caches saved by the nodes while unloading are written as well
+    config_entry.async_on_unload(cache_writer.async_stop)
+    config_entry.runtime_data[CACHE_WRITER] = cache_writer
 
     _LOGGER.info("Connect & initialize Plugwise USB-Stick...")
+    setup_start = phase_start = monotonic()
     try:
         await api_stick.connect()
         await api_stick.initialize(create_root_cache_folder=True)
@@ -65,6 +159,7 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: PlugwiseUSBConfig
         raise ConfigEntryNotReady(
             f"Failed to open connection to Plugwise USB stick at {config_entry.data[CONF_USB_PATH]}"
         ) from exc
+    setup_timings["stick_connect"] = monotonic() - phase_start
 
     device_registry = dr.async_get(hass)
     device_registry.async_get_or_create(
@@ -79,81 +174,208 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: PlugwiseUSBConfig
     )
 
     config_entry.runtime_data[NODES] = {}
+    snapshot = PlugwiseUSBSnapshot(hass, config_entry)
+    await snapshot.async_load()
+    config_entry.runtime_data[SNAPSHOT] = snapshot
+    inventory = PlugwiseUSBInventory(hass, config_entry)
+    await inventory.async_load()
+    config_entry.runtime_data[INVENTORY] = inventory
+    if "recorder" in hass.config.components:
+        energy_statistics = PlugwiseUSBEnergyStatistics(hass, config_entry)
+        await energy_statistics.async_load()
+        config_entry.async_on_unload(energy_statistics.async_start())
+        config_entry.runtime_data[ENERGY_STATISTICS] = energy_statistics
+    traffic_recorder = PlugwiseUSBTrafficRecorder(hass, config_entry)
+    config_entry.runtime_data[TRAFFIC_RECORDER] = traffic_recorder
+    entity_dispatcher = PlugwiseUSBEntityDispatcher(config_entry)
+    config_entry.runtime_data[ENTITY_DISPATCHER] = entity_dispatcher
+    network_refresh = config_entry.options.get(
+        CONF_NETWORK_REFRESH, DEFAULT_NETWORK_REFRESH
+    )
+    request_queue = PlugwiseUSBRequestQueue(
+        NETWORK_REFRESH_MAX_IN_FLIGHT if network_refresh else 1
+    )
+    config_entry.runtime_data[REQUEST_QUEUE] = request_queue
+    poll_interval, poll_rate, min_poll_interval, max_poll_interval = _poll_settings(
+        config_entry
+    )
+    scheduler = PlugwiseUSBPollScheduler(
+        hass,
+        config_entry,
+        poll_interval,
+        poll_rate,
+        min_poll_interval=min_poll_interval,
+        max_poll_interval=max_poll_interval,
+    )
+    if network_refresh:
+        scheduler.async_set_network_coordinator(
+            PlugwiseUSBNetworkCoordinator(
+                hass,
+                config_entry,
+                NETWORK_REFRESH_MAX_IN_FLIGHT,
+            )
+        )
+    config_entry.runtime_data[SCHEDULER] = scheduler
+    config_entry.async_on_unload(
+        config_entry.add_update_listener(async_options_updated)
+    )
 
-    async def async_node_discovered(node_event: NodeEvent, mac: str) -> None:
-        """Node is detected."""
-        if node_event != NodeEvent.DISCOVERED:
+    async def async_node_event(node_event: NodeEvent, mac: str) -> None:
+        """Set up a discovered node, check a loaded node."""
+        traffic_recorder.record_node_event(node_event, api_stick.nodes[mac].node_info)
+        if node_event == NodeEvent.LOADED:
+            async_node_loaded(mac)
             return
-        _LOGGER.debug("async_node_discovered | mac=%s", mac)
+        _LOGGER.debug("async_node_event | mac=%s", mac)
         node = api_stick.nodes[mac]
-        _LOGGER.debug("async_node_discovered | node_info=%s", node.node_info)
-        coordinator = PlugwiseUSBDataUpdateCoordinator(hass, config_entry, node)
+        _LOGGER.debug("async_node_event | node_info=%s", node.node_info)
+        cache_writer.async_add_node(node)
+        coordinator = PlugwiseUSBDataUpdateCoordinator(
+            hass, config_entry, node, inventory_info=inventory.node_info(mac)
+        )
+        coordinator.async_restore_states(snapshot.restored_states(mac))
         config_entry.runtime_data[NODES][mac] = coordinator
-        await node.load()
+        if not coordinator.node_info.is_battery_powered:
+            scheduler.async_add_coordinator(coordinator)
+        # Nodes known from the inventory get their entities before being loaded
+        entity_dispatcher.async_add_node_entities(coordinator)
+        # Other nodes are loaded by the library once the network scan completes,
+        # a second load here would repeat the requests of loading the node
+        if mac == api_stick.mac_coordinator:
+            await node.load()
+
+    @callback
+    def async_node_loaded(mac: str) -> None:
+        """Correct inventory, device and entities with the info of a loaded node."""
+        if (coordinator := config_entry.runtime_data[NODES].get(mac)) is None:
+            return
+        node_info = coordinator.node.node_info
+        entity_registry = er.async_get(hass)
+        for (platform, key), feature in list(coordinator.entity_features.items()):
+            if feature in node_info.features:
+                continue
+            _LOGGER.debug("Remove unsupported %s %s of %s", platform, key, mac)
+            del coordinator.entity_features[(platform, key)]
+            if entity_id := entity_registry.async_get_entity_id(
+                platform, DOMAIN, f"{mac}-{key}"
+            ):
+                entity_registry.async_remove(entity_id)
+        entity_dispatcher.async_add_node_entities(coordinator)
+        if not inventory.async_update(node_info):
+            return
+        if device := device_registry.async_get_device(identifiers={(DOMAIN, mac)}):
+            device_registry.async_update_device(
+                device.id,
+                hw_version=str(node_info.version),
+                model=str(node_info.model),
+                model_id=node_info.model_type,
+                sw_version=str(node_info.firmware),
+            )
 
     config_entry.runtime_data[UNSUBSCRIBE_DISCOVERY] = (
         api_stick.subscribe_to_node_events(
-            async_node_discovered,
-            (NodeEvent.DISCOVERED,),
+            async_node_event,
+            (NodeEvent.DISCOVERED, NodeEvent.LOADED),
         )
     )
 
     _LOGGER.info("Start to discover the Plugwise network coordinator (Circle+)")
+    phase_start = monotonic()
     try:
         await api_stick.discover_coordinator(load=False)
     except StickError as exc:
         await api_stick.disconnect()
         raise ConfigEntryNotReady("Failed to connect to Circle+") from exc
+    setup_timings["coordinator_discovery"] = monotonic() - phase_start
 
     # Load platforms to allow them to register for node events
+    phase_start = monotonic()
     await hass.config_entries.async_forward_entry_setups(
         config_entry, PLUGWISE_USB_PLATFORMS
     )
-
-    async def enable_production(call: ServiceCall) -> bool:
-        """Enable production-logging for a Node."""
-        mac = call.data[ATTR_MAC]
-        try:
-            result = await api_stick.set_energy_intervals(mac, 60, 60)
-        except (NodeError, StickError) as exc:
-            raise HomeAssistantError(
-                f"Enable production logs failed for {mac}: {exc}"
-            ) from exc
-        return result
-
-    async def disable_production(call: ServiceCall) -> bool:
-        """Disable production-logging for a Node."""
-        mac = call.data[ATTR_MAC]
-        try:
-            result = await api_stick.set_energy_intervals(mac, 60, 0)
-        except (NodeError, StickError) as exc:
-            raise HomeAssistantError(
-                f"Disable production logs failed for {mac}: {exc}"
-            ) from exc
-        return result
+    setup_timings["platform_setup"] = monotonic() - phase_start
 
     hass.services.async_register(
-        DOMAIN, SERVICE_ENABLE_PRODUCTION, enable_production, SERVICE_USB_DEVICE_SCHEMA
+        DOMAIN,
+        SERVICE_ENABLE_PRODUCTION,
+        partial(async_set_energy_intervals, hass, config_entry),
+        SERVICE_ENABLE_PRODUCTION_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
     )
     hass.services.async_register(
         DOMAIN,
         SERVICE_DISABLE_PRODUCTION,
-        disable_production,
-        SERVICE_USB_DEVICE_SCHEMA,
+        partial(async_set_energy_intervals, hass, config_entry),
+        SERVICE_DISABLE_PRODUCTION_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SWITCH_RELAYS,
+        partial(async_switch_relays, hass, config_entry),
+        SERVICE_SWITCH_RELAYS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_RECORDING,
+        traffic_recorder.async_handle_start,
+        SERVICE_START_RECORDING_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_RECORDING,
+        traffic_recorder.async_handle_stop,
+        supports_response=SupportsResponse.OPTIONAL,
     )
 
-    # Initiate background nodes discovery task
-    config_entry.async_create_task(
+    async def async_save_snapshot(_: Any) -> None:
+        """Save the last known states of all nodes."""
+        await snapshot.async_save()
+
+    config_entry.async_on_unload(
+        async_track_time_interval(
+            hass, async_save_snapshot, timedelta(seconds=SNAPSHOT_SAVE_INTERVAL)
+        )
+    )
+    config_entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_save_snapshot)
+    )
+
+    async def async_write_caches(_: Any) -> None:
+        """Write the collected cache changes before Home Assistant stops."""
+        await cache_writer.async_stop()
+
+    config_entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_FINAL_WRITE, async_write_caches)
+    )
+
+    scheduler.async_start()
+
+    # Initiate background nodes discovery task, entities are added as nodes load
+    phase_start = monotonic()
+    discovery_task = config_entry.async_create_background_task(
         hass,
         api_stick.discover_nodes(load=True),
         "discover_nodes",
     )
+    discovery_task.add_done_callback(
+        lambda _: setup_timings.update(network_discovery=monotonic() - phase_start)
+    )
 
-    while True:
-        await asyncio.sleep(1)
-        if api_stick.network_discovered:
-            break
-
+    discovery_timeout = config_entry.options.get(
+        CONF_DISCOVERY_TIMEOUT, DEFAULT_DISCOVERY_TIMEOUT
+    )
+    if discovery_timeout > 0:
+        _, pending = await asyncio.wait({discovery_task}, timeout=discovery_timeout)
+        if pending:
+            _LOGGER.info(
+                "Plugwise network discovery not finished within %s seconds, continue in background",
+                discovery_timeout,
+            )
+
+    setup_timings["setup"] = monotonic() - setup_start
     return True
 
 
@@ -166,6 +388,18 @@ async def async_unload_entry(
         unsubscribe_discovery = runtime_data.get(UNSUBSCRIBE_DISCOVERY)
         if callable(unsubscribe_discovery):
             unsubscribe_discovery()
+        scheduler = runtime_data.get(SCHEDULER)
+        if scheduler is not None:
+            await scheduler.async_stop()
+        snapshot = runtime_data.get(SNAPSHOT)
+        if snapshot is not None:
+            await snapshot.async_save()
+        traffic_recorder = runtime_data.get(TRAFFIC_RECORDER)
+        if traffic_recorder is not None:
+            await traffic_recorder.async_stop()
+        energy_statistics = runtime_data.get(ENERGY_STATISTICS)
+        if energy_statistics is not None:
+            await energy_statistics.async_import()
         for coordinator in runtime_data.get(NODES, {}).values():
             await coordinator.unsubscribe_all_nodefeatures()
         stick = runtime_data.get(STICK)
@@ -177,6 +411,36 @@ async def async_unload_entry(
     )
 
 
+async def async_options_updated(
+    hass: HomeAssistant, config_entry: PlugwiseUSBConfigEntry
+) -> None:
+    """Apply changed options to the running poll scheduler and nodes."""
+    scheduler: PlugwiseUSBPollScheduler = config_entry.runtime_data[SCHEDULER]
+    options = config_entry.options
+    for coordinator in config_entry.runtime_data[NODES].values():
+        coordinator.push_window = options.get(CONF_PUSH_WINDOW, DEFAULT_PUSH_WINDOW)
+        coordinator.unavailable_polls = options.get(
+            CONF_UNAVAILABLE_POLLS, DEFAULT_UNAVAILABLE_POLLS
+        )
+        coordinator.unavailable_grace = options.get(
+            CONF_UNAVAILABLE_GRACE, DEFAULT_UNAVAILABLE_GRACE
+        )
+        coordinator.power_window = options.get(CONF_POWER_WINDOW, DEFAULT_POWER_WINDOW)
+        if coordinator.power_buffer is not None:
+            coordinator.power_buffer.window = coordinator.power_window * 60
+    network_refresh = config_entry.options.get(
+        CONF_NETWORK_REFRESH, DEFAULT_NETWORK_REFRESH
+    )
+    if network_refresh != (scheduler.network_coordinator is not None):
+        # Switching between per-node and network-wide refresh requires a reload
+        hass.config_entries.async_schedule_reload(config_entry.entry_id)
+        return
+    scheduler.async_update_settings(*_poll_settings(config_entry))
+    await config_entry.runtime_data[CACHE_WRITER].async_set_flush_interval(
+        options.get(CONF_CACHE_FLUSH_INTERVAL, DEFAULT_CACHE_FLUSH_INTERVAL)
+    )
+
+
 async def async_remove_config_entry_device(
     _hass: HomeAssistant,
     config_entry: PlugwiseUSBConfigEntry,
@@ -196,6 +460,8 @@ async def async_remove_config_entry_device(
             break
 
     if removable:
+        config_entry.runtime_data[INVENTORY].async_remove(mac)
+        config_entry.runtime_data[SNAPSHOT].async_remove(mac)
         try:
             await api_stick.unregister_node(mac)
         except NodeError as exc:
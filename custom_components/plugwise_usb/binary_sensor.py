@@ -6,7 +6,7 @@ from dataclasses import dataclass
 from datetime import timedelta
 import logging
 
-from plugwise_usb.api import NodeEvent, NodeFeature
+from plugwise_usb.api import NodeFeature
 
 from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
@@ -17,8 +17,9 @@ from homeassistant.const import EntityCategory, Platform
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import NODES, STICK, UNSUB_NODE_LOADED
+from .const import ENTITY_DISPATCHER
 from .coordinator import PlugwiseUSBConfigEntry
+from .dispatcher import feature_index
 from .entity import PlugwiseUSBEntity, PlugwiseUSBEntityDescription
 
 _LOGGER = logging.getLogger(__name__)
@@ -84,6 +85,8 @@ BINARY_SENSOR_TYPES: tuple[PlugwiseBinarySensorEntityDescription, ...] = (
     ),
 )
 
+BINARY_SENSOR_INDEX = feature_index(BINARY_SENSOR_TYPES)
+
 
 async def async_setup_entry(
     _hass: HomeAssistant,
@@ -91,50 +94,17 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Plugwise USB binary sensor based on config_entry."""
-
-    async def async_add_binary_sensor(node_event: NodeEvent, mac: str) -> None:
-        """Initialize DUC for binary sensor."""
-        if node_event != NodeEvent.LOADED:
-            return
-        entities: list[PlugwiseUSBEntity] = []
-        if (node_duc := config_entry.runtime_data[NODES].get(mac)) is not None:
-            for entity_description in BINARY_SENSOR_TYPES:
-                if entity_description.node_feature not in node_duc.node.features:
-                    continue
-                entities.append(PlugwiseUSBBinarySensor(node_duc, entity_description))
-                _LOGGER.debug(
-                    "Add %s binary sensor for node %s",
-                    entity_description.translation_key,
-                    node_duc.node.name,
-                )
-
-        if entities:
-            async_add_entities(entities)
-
-    api_stick = config_entry.runtime_data[STICK]
-
-    # Listen for loaded nodes
-    config_entry.runtime_data[Platform.BINARY_SENSOR] = {}
-    config_entry.runtime_data[Platform.BINARY_SENSOR][UNSUB_NODE_LOADED] = (
-        api_stick.subscribe_to_node_events(
-            async_add_binary_sensor,
-            (NodeEvent.LOADED,),
-        )
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_add_platform(
+        Platform.BINARY_SENSOR, BINARY_SENSOR_INDEX, PlugwiseUSBBinarySensor, async_add_entities
     )
 
-    # load current nodes
-    for mac, node in api_stick.nodes.items():
-        if node.is_loaded:
-            await async_add_binary_sensor(NodeEvent.LOADED, mac)
-        else:
-            _LOGGER.debug("Adding binary_sensor(s) for node %s failed, not loaded", mac)
 
 async def async_unload_entry(
     _hass: HomeAssistant,
     config_entry: PlugwiseUSBConfigEntry,
 ) -> None:
     """Unload a config entry."""
-    config_entry.runtime_data[Platform.BINARY_SENSOR][UNSUB_NODE_LOADED]()
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_remove_platform(Platform.BINARY_SENSOR)
 
 
 class PlugwiseUSBBinarySensor(PlugwiseUSBEntity, BinarySensorEntity):
@@ -162,4 +132,4 @@ class PlugwiseUSBBinarySensor(PlugwiseUSBEntity, BinarySensorEntity):
             self.coordinator.data[self.entity_description.node_feature],
             self.entity_description.api_attribute,
         )
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed(self._attr_is_on)
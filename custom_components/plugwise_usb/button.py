@@ -6,15 +6,16 @@ from dataclasses import dataclass
 from datetime import timedelta
 import logging
 
-from plugwise_usb.api import NodeEvent, NodeFeature
+from plugwise_usb.api import NodeFeature
 
 from homeassistant.components.button import ButtonEntity, ButtonEntityDescription
 from homeassistant.const import EntityCategory, Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import NODES, STICK, UNSUB_NODE_LOADED
+from .const import ENTITY_DISPATCHER
 from .coordinator import PlugwiseUSBConfigEntry, PlugwiseUSBDataUpdateCoordinator
+from .dispatcher import feature_index
 from .entity import PlugwiseUSBEntity, PlugwiseUSBEntityDescription
 
 _LOGGER = logging.getLogger(__name__)
@@ -62,6 +63,8 @@ BUTTON_TYPES: tuple[PlugwiseButtonEntityDescription, ...] = (
     ),
 )
 
+BUTTON_INDEX = feature_index(BUTTON_TYPES)
+
 
 async def async_setup_entry(
     _hass: HomeAssistant,
@@ -69,50 +72,17 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the USB buttons from a config entry."""
-
-    async def async_add_button(node_event: NodeEvent, mac: str) -> None:
-        """Initialize DUC for button."""
-        if node_event != NodeEvent.LOADED:
-            return
-        entities: list[PlugwiseUSBEntity] = []
-        if (node_duc := config_entry.runtime_data[NODES].get(mac)) is not None:
-            for entity_description in BUTTON_TYPES:
-                if entity_description.node_feature not in node_duc.node.features:
-                    continue
-                entities.append(PlugwiseUSBButtonEntity(node_duc, entity_description))
-                _LOGGER.debug(
-                    "Add %s button for node %s",
-                    entity_description.translation_key,
-                    node_duc.node.name,
-                )
-        if entities:
-            async_add_entities(entities)
-
-    api_stick = config_entry.runtime_data[STICK]
-
-    # Listen for loaded nodes
-    config_entry.runtime_data[Platform.BUTTON] = {}
-    config_entry.runtime_data[Platform.BUTTON][UNSUB_NODE_LOADED] = (
-        api_stick.subscribe_to_node_events(
-            async_add_button,
-            (NodeEvent.LOADED,),
-        )
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_add_platform(
+        Platform.BUTTON, BUTTON_INDEX, PlugwiseUSBButtonEntity, async_add_entities
     )
 
-    # load any current nodes
-    for mac, node in api_stick.nodes.items():
-        if node.is_loaded:
-            await async_add_button(NodeEvent.LOADED, mac)
-        else:
-            _LOGGER.debug("Adding button(s) for node %s failed, not loaded", mac)
-
 
 async def async_unload_entry(
     _hass: HomeAssistant,
     config_entry: PlugwiseUSBConfigEntry,
 ) -> None:
     """Unload a config entry."""
-    config_entry.runtime_data[Platform.BUTTON][UNSUB_NODE_LOADED]()
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_remove_platform(Platform.BUTTON)
 
 
 class PlugwiseUSBButtonEntity(PlugwiseUSBEntity, ButtonEntity):
@@ -131,4 +101,4 @@ class PlugwiseUSBButtonEntity(PlugwiseUSBEntity, ButtonEntity):
 
     async def async_press(self) -> None:
         """Button was pressed."""
-        await self.async_button_fn()
+        await self.async_node_command(self.async_button_fn)
@@ -0,0 +1,340 @@
+"""Write-behind of the cache files of the Plugwise USB nodes."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Coroutine
+from contextlib import suppress
+from datetime import datetime, timedelta
+from functools import partial
+import inspect
+import logging
+from pathlib import Path
+from time import monotonic
+from typing import Any, Final
+
+from plugwise_usb.api import PlugwiseNode
+from plugwise_usb.constants import CACHE_KEY_SEPARATOR
+from plugwise_usb.exceptions import CacheError
+from plugwise_usb.helpers.cache import PlugwiseCache
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util.file import write_utf8_file
+
+_LOGGER = logging.getLogger(__name__)
+
+# Methods of a library cache routed through the writer while started
+HOOKED_METHODS: Final = ("write_cache", "read_cache", "delete_cache")
+
+# Changed keys of one cache file, replacing all keys when rewrite is True
+type CacheChanges = tuple[bool, dict[str, str]]
+
+
+class _CacheHook:
+    """Route the cache methods of one library cache instance through a writer.
+
+    The library offers no public access to the cache of a node, nor a way to
+    defer its writes, and it only logs a failed write. All use of library
+    internals is kept in this adapter: when a library version lacks them, no
+    hook is created and the cache keeps writing through by itself.
+    """
+
+    def __init__(
+        self,
+        cache: PlugwiseCache,
+        methods: dict[str, Callable[..., Coroutine[Any, Any, Any]]],
+    ) -> None:
+        """Initialize the hook of a cache with its library methods."""
+        self.cache = cache
+        self._methods = methods
+
+    @classmethod
+    def from_cache(cls, cache: Any) -> _CacheHook | None:
+        """Return the hook of a library cache, None when it cannot be hooked."""
+        if (
+            not isinstance(cache, PlugwiseCache)
+            or not hasattr(cache, "__dict__")
+            or not hasattr(cache, "_cache_file")
+        ):
+            return None
+        methods: dict[str, Callable[..., Coroutine[Any, Any, Any]]] = {}
+        for name in HOOKED_METHODS:
+            method = getattr(type(cache), name, None)
+            if not inspect.iscoroutinefunction(method):
+                return None
+            methods[name] = partial(method, cache)
+        return cls(cache, methods)
+
+    @classmethod
+    def from_node(cls, node: PlugwiseNode) -> _CacheHook | None:
+        """Return the hook of the cache of a node, None when it cannot be hooked."""
+        return cls.from_cache(getattr(node, "_node_cache", None))
+
+    @property
+    def initialized(self) -> bool:
+        """Return True when the library can write the cache file."""
+        return bool(getattr(self.cache, "initialized", False))
+
+    @property
+    def name(self) -> str:
+        """Return the folder of the cache file, for logging."""
+        return str(getattr(self.cache, "cache_root_directory", self.cache))
+
+    def install(self, writer: PlugwiseUSBCacheWriter) -> None:
+        """Route the cache methods of the instance through the writer."""
+        for name in HOOKED_METHODS:
+            setattr(self.cache, name, partial(getattr(writer, f"_async_{name}"), self))
+
+    def uninstall(self) -> None:
+        """Restore the library methods of the instance."""
+        for name in HOOKED_METHODS:
+            vars(self.cache).pop(name, None)
+
+    def write(self, data: dict[str, str], rewrite: bool) -> None:
+        """Write the cache file in the format of the library, raise on failure."""
+        if (path := getattr(self.cache, "_cache_file", None)) is None:
+            raise CacheError(f"Cache file in {self.name} has no name")
+        content: dict[str, str] = {}
+        if not rewrite:
+            with suppress(FileNotFoundError):
+                for line in Path(path).read_text(encoding="utf-8").splitlines():
+                    key, separator, value = line.strip().partition(CACHE_KEY_SEPARATOR)
+                    if separator:
+                        content[key] = value
+        content.update(data)
+        write_utf8_file(
+            path,
+            "".join(
+                f"{key}{CACHE_KEY_SEPARATOR}{value}\n" for key, value in content.items()
+            ),
+        )
+
+    async def async_write_through(self, data: dict[str, str], rewrite: bool) -> None:
+        """Write the cache file by the library."""
+        await self._methods["write_cache"](data, rewrite)
+
+    async def async_read(self) -> dict[str, str]:
+        """Read the cache file by the library."""
+        return await self._methods["read_cache"]()
+
+    async def async_delete(self) -> None:
+        """Delete the cache file by the library."""
+        await self._methods["delete_cache"]()
+
+
+class PlugwiseUSBCacheWriter:
+    """Write the cache files of the nodes of the Stick behind, in batches.
+
+    The library rewrites the cache file of a node at every change, like for
+    each collected energy log during discovery. While started, the writes of
+    the node caches added to the writer are collected in memory instead, by
+    hooking the write, read and delete methods of those cache instances.
+    The changed keys of each file are merged, and all changed files are
+    written together every flush interval, off the event loop, atomically and
+    in the format of the library. Reads include the changes not written yet.
+    The changes of a file which failed to write are kept for the next flush.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, cache_folder: str, flush_interval: float
+    ) -> None:
+        """Initialize the cache writer."""
+        self._hass = hass
+        self.cache_folder = cache_folder
+        self.flush_interval = flush_interval
+        self._hooks: dict[PlugwiseCache, _CacheHook] = {}
+        self._pending: dict[_CacheHook, CacheChanges] = {}
+        self._flushing: dict[_CacheHook, CacheChanges] = {}
+        self._flush_lock = asyncio.Lock()
+        self._unsubscribe: Callable[[], None] | None = None
+        self.collected = 0
+        self.flushes = 0
+        self.files_written = 0
+        self.failed_writes = 0
+        self.last_flush_duration: float | None = None
+
+    @property
+    def started(self) -> bool:
+        """Return True while writes are collected."""
+        return self._unsubscribe is not None
+
+    @callback
+    def async_add_cache(self, cache: PlugwiseCache) -> None:
+        """Collect the writes of a cache file owned by the integration."""
+        self._async_add_hook(cache, _CacheHook.from_cache(cache))
+
+    @callback
+    def async_add_node(self, node: PlugwiseNode) -> None:
+        """Collect the writes of the cache file of a node."""
+        self._async_add_hook(node.mac, _CacheHook.from_node(node))
+
+    @callback
+    def _async_add_hook(self, name: Any, hook: _CacheHook | None) -> None:
+        """Add the hook of a cache, unless added before."""
+        if hook is None:
+            _LOGGER.debug("Cache of %s cannot be collected, write through", name)
+            return
+        if hook.cache in self._hooks:
+            return
+        self._hooks[hook.cache] = hook
+        if self.started:
+            hook.install(self)
+
+    @callback
+    def async_start(self) -> None:
+        """Collect the writes of the added caches, until stopped."""
+        if self.started:
+            return
+        for hook in self._hooks.values():
+            hook.install(self)
+        self._unsubscribe = async_track_time_interval(
+            self._hass,
+            self._async_flush_interval,
+            timedelta(seconds=self.flush_interval),
+        )
+
+    async def async_stop(self) -> None:
+        """Write all collected changes and write through from now on."""
+        if self._unsubscribe is None:
+            return
+        self._unsubscribe()
+        self._unsubscribe = None
+        # Writes collected while flushing are flushed as well, failed writes
+        # are retried once more before giving up
+        retry = True
+        while self._pending:
+            if not await self.async_flush():
+                if not retry:
+                    _LOGGER.error(
+                        "Failed to write %s cache files, their changes are lost",
+                        len(self._pending),
+                    )
+                    self._pending.clear()
+                    break
+                retry = False
+        for hook in self._hooks.values():
+            hook.uninstall()
+
+    async def async_set_flush_interval(self, flush_interval: float) -> None:
+        """Change the flush interval, write through without an interval."""
+        if flush_interval == self.flush_interval:
+            return
+        await self.async_stop()
+        self.flush_interval = flush_interval
+        if flush_interval:
+            self.async_start()
+
+    async def _async_write_cache(
+        self, hook: _CacheHook, data: dict[str, str], rewrite: bool = False
+    ) -> None:
+        """Collect the write of a cache file."""
+        if not hook.initialized:
+            # Let the library report the uninitialized cache
+            await hook.async_write_through(data, rewrite)
+            return
+        self.async_collect(hook, data, rewrite)
+
+    async def _async_read_cache(self, hook: _CacheHook) -> dict[str, str]:
+        """Return the cache file content with the changes not written yet."""
+        return self.merged(hook, await hook.async_read())
+
+    async def _async_delete_cache(self, hook: _CacheHook) -> None:
+        """Drop the collected changes of a cache file before deleting it."""
+        self.async_discard(hook)
+        await hook.async_delete()
+
+    @callback
+    def async_collect(
+        self, hook: _CacheHook, data: dict[str, str], rewrite: bool
+    ) -> None:
+        """Merge the changes of one write into the pending changes of the file."""
+        self.collected += 1
+        if rewrite or (pending := self._pending.get(hook)) is None:
+            self._pending[hook] = (rewrite, dict(data))
+            return
+        pending[1].update(data)
+
+    @callback
+    def async_discard(self, hook: _CacheHook) -> None:
+        """Forget the pending changes of a file which is deleted."""
+        self._pending.pop(hook, None)
+
+    @callback
+    def _async_retry(self, hook: _CacheHook, changes: CacheChanges) -> None:
+        """Put the changes of a failed write before the changes collected since."""
+        if (pending := self._pending.get(hook)) is None:
+            self._pending[hook] = changes
+        elif not pending[0]:
+            self._pending[hook] = (changes[0], changes[1] | pending[1])
+
+    def merged(self, hook: _CacheHook, data: dict[str, str]) -> dict[str, str]:
+        """Return data read from a file, with its changes not written yet."""
+        for changes in (self._flushing, self._pending):
+            if (change := changes.get(hook)) is None:
+                continue
+            rewrite, values = change
+            data = dict(values) if rewrite else data | values
+        return data
+
+    async def _async_flush_interval(self, _: datetime) -> None:
+        """Write the collected changes periodically."""
+        await self.async_flush()
+
+    async def async_flush(self) -> bool:
+        """Write all files with collected changes in one batch.
+
+        Return False when a file failed to write, its changes are kept for the
+        next flush.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return True
+            self._flushing, self._pending = self._pending, {}
+            start = monotonic()
+            results = await asyncio.gather(
+                *(
+                    self._hass.async_add_executor_job(hook.write, values, rewrite)
+                    for hook, (rewrite, values) in self._flushing.items()
+                ),
+                return_exceptions=True,
+            )
+            failed = 0
+            for (hook, changes), result in zip(
+                self._flushing.items(), results, strict=True
+            ):
+                if isinstance(result, Exception):
+                    _LOGGER.warning(
+                        "Failed to write cache of %s, retry at the next flush: %s",
+                        hook.name,
+                        result,
+                    )
+                    self._async_retry(hook, changes)
+                    failed += 1
+            self.files_written += len(self._flushing) - failed
+            self.failed_writes += failed
+            self.flushes += 1
+            self.last_flush_duration = monotonic() - start
+            _LOGGER.debug(
+                "Wrote %s cache files in %.3f seconds",
+                len(self._flushing) - failed,
+                self.last_flush_duration,
+            )
+            self._flushing = {}
+            return not failed
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the summary of the cache writes."""
+        return {
+            "started": self.started,
+            "flush_interval": self.flush_interval,
+            "cache_files": len(self._hooks),
+            "pending_files": len(self._pending),
+            "collected_writes": self.collected,
+            "files_written": self.files_written,
+            "failed_writes": self.failed_writes,
+            "flushes": self.flushes,
+            "last_flush_duration": None
+            if self.last_flush_duration is None
+            else round(self.last_flush_duration, 3),
+        }
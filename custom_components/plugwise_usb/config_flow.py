@@ -9,19 +9,101 @@ from plugwise_usb.exceptions import StickError
 import voluptuous as vol
 
 from homeassistant.components import usb
-from homeassistant.config_entries import SOURCE_USER, ConfigFlow, ConfigFlowResult
+from homeassistant.config_entries import (
+    SOURCE_USER,
+    ConfigEntry,
+    ConfigFlow,
+    ConfigFlowResult,
+    OptionsFlow,
+)
 from homeassistant.const import CONF_BASE
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 import serial.tools.list_ports
 
-from .const import CONF_MANUAL_PATH, CONF_USB_PATH, DOMAIN, MANUAL_PATH
+from .const import (
+    CONF_CACHE_FLUSH_INTERVAL,
+    CONF_DISCOVERY_TIMEOUT,
+    CONF_MANUAL_PATH,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_NETWORK_REFRESH,
+    CONF_POLL_INTERVAL,
+    CONF_POLL_RATE,
+    CONF_POWER_WINDOW,
+    CONF_PUSH_WINDOW,
+    CONF_UNAVAILABLE_GRACE,
+    CONF_UNAVAILABLE_POLLS,
+    CONF_USB_PATH,
+    DEFAULT_CACHE_FLUSH_INTERVAL,
+    DEFAULT_DISCOVERY_TIMEOUT,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DEFAULT_NETWORK_REFRESH,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_POLL_RATE,
+    DEFAULT_POWER_WINDOW,
+    DEFAULT_PUSH_WINDOW,
+    DEFAULT_UNAVAILABLE_GRACE,
+    DEFAULT_UNAVAILABLE_POLLS,
+    DOMAIN,
+    MANUAL_PATH,
+    MAX_CACHE_FLUSH_INTERVAL,
+    MAX_DISCOVERY_TIMEOUT,
+    MAX_POLL_INTERVAL,
+    MAX_POLL_RATE,
+    MAX_POWER_WINDOW,
+    MAX_PUSH_WINDOW,
+    MAX_UNAVAILABLE_GRACE,
+    MAX_UNAVAILABLE_POLLS,
+    MIN_POLL_INTERVAL,
+    MIN_POLL_RATE,
+)
 
 STICK_RECONF_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_USB_PATH): str,
     }
 )
+OPTIONS_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_POLL_INTERVAL, default=DEFAULT_POLL_INTERVAL): vol.All(
+            vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL, max=MAX_POLL_INTERVAL)
+        ),
+        vol.Required(
+            CONF_MIN_POLL_INTERVAL, default=DEFAULT_MIN_POLL_INTERVAL
+        ): vol.All(
+            vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL, max=MAX_POLL_INTERVAL)
+        ),
+        vol.Required(
+            CONF_MAX_POLL_INTERVAL, default=DEFAULT_MAX_POLL_INTERVAL
+        ): vol.All(
+            vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL, max=MAX_POLL_INTERVAL)
+        ),
+        vol.Required(CONF_POLL_RATE, default=DEFAULT_POLL_RATE): vol.All(
+            vol.Coerce(float), vol.Range(min=MIN_POLL_RATE, max=MAX_POLL_RATE)
+        ),
+        vol.Required(CONF_NETWORK_REFRESH, default=DEFAULT_NETWORK_REFRESH): bool,
+        vol.Required(
+            CONF_DISCOVERY_TIMEOUT, default=DEFAULT_DISCOVERY_TIMEOUT
+        ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_DISCOVERY_TIMEOUT)),
+        vol.Required(CONF_PUSH_WINDOW, default=DEFAULT_PUSH_WINDOW): vol.All(
+            vol.Coerce(float), vol.Range(min=0.0, max=MAX_PUSH_WINDOW)
+        ),
+        vol.Required(
+            CONF_UNAVAILABLE_POLLS, default=DEFAULT_UNAVAILABLE_POLLS
+        ): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_UNAVAILABLE_POLLS)),
+        vol.Required(
+            CONF_UNAVAILABLE_GRACE, default=DEFAULT_UNAVAILABLE_GRACE
+        ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_UNAVAILABLE_GRACE)),
+        vol.Required(CONF_POWER_WINDOW, default=DEFAULT_POWER_WINDOW): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=MAX_POWER_WINDOW)
+        ),
+        vol.Required(
+            CONF_CACHE_FLUSH_INTERVAL, default=DEFAULT_CACHE_FLUSH_INTERVAL
+        ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_CACHE_FLUSH_INTERVAL)),
+    }
+)
 
 
 @callback
@@ -67,6 +149,12 @@ class PlugwiseUSBConfigFlow(ConfigFlow, domain=DOMAIN):
 
     # no async_step_zeroconf this USB is physical
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Get the options flow for this handler."""
+        return PlugwiseUSBOptionsFlow()
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -165,3 +253,30 @@ class PlugwiseUSBConfigFlow(ConfigFlow, domain=DOMAIN):
             description_placeholders={"title": reconfigure_entry.title},
             errors=errors,
         )
+
+
+class PlugwiseUSBOptionsFlow(OptionsFlow):
+    """Handle Plugwise USB options."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the polling options."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            if (
+                user_input[CONF_MIN_POLL_INTERVAL]
+                <= user_input[CONF_POLL_INTERVAL]
+                <= user_input[CONF_MAX_POLL_INTERVAL]
+            ):
+                return self.async_create_entry(data=user_input)
+            errors[CONF_BASE] = "invalid_poll_range"
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(
+                data_schema=OPTIONS_SCHEMA,
+                suggested_values=user_input or self.config_entry.options,
+            ),
+            errors=errors,
+        )
@@ -3,21 +3,30 @@
 import logging
 from typing import Final
 
+from plugwise_usb.api import NodeFeature
 import voluptuous as vol
 
 from homeassistant.components.device_tracker import ATTR_MAC
-from homeassistant.const import Platform
+from homeassistant.const import ATTR_AREA_ID, Platform
 from homeassistant.helpers import config_validation as cv
 
 DOMAIN: Final[str] = "plugwise_usb"
 
 LOGGER = logging.getLogger(__package__)
-UNSUB_NODE_LOADED: Final[str] = "Unsubcribe_from_node_loaded_event"
 COORDINATOR: Final[str] = "coordinator"
 CONF_MANUAL_PATH: Final[str] = "Enter Manually"
 MANUAL_PATH: Final[str] = "manual_path"
 STICK: Final[str] = "stick"
 NODES: Final[str] = "nodes"
+SCHEDULER: Final[str] = "scheduler"
+REQUEST_QUEUE: Final[str] = "request_queue"
+SNAPSHOT: Final[str] = "snapshot"
+INVENTORY: Final[str] = "inventory"
+ENERGY_STATISTICS: Final[str] = "energy_statistics"
+ENTITY_DISPATCHER: Final[str] = "entity_dispatcher"
+SETUP_TIMINGS: Final[str] = "setup_timings"
+TRAFFIC_RECORDER: Final[str] = "traffic_recorder"
+CACHE_WRITER: Final[str] = "cache_writer"
 USB: Final[str] = "usb"
 
 UNDO_UPDATE_LISTENER: Final[str] = "undo_update_listener"
@@ -32,17 +41,107 @@ PLUGWISE_USB_PLATFORMS: Final[list[Platform]] = [
     Platform.SWITCH,
 ]
 CONF_USB_PATH: Final[str] = "usb_path"
+CONF_POLL_INTERVAL: Final[str] = "poll_interval"
+CONF_POLL_RATE: Final[str] = "poll_rate"
+CONF_NETWORK_REFRESH: Final[str] = "network_refresh"
+CONF_MIN_POLL_INTERVAL: Final[str] = "min_poll_interval"
+CONF_MAX_POLL_INTERVAL: Final[str] = "max_poll_interval"
+CONF_DISCOVERY_TIMEOUT: Final[str] = "discovery_timeout"
+CONF_PUSH_WINDOW: Final[str] = "push_window"
+CONF_UNAVAILABLE_POLLS: Final[str] = "unavailable_polls"
+CONF_UNAVAILABLE_GRACE: Final[str] = "unavailable_grace"
+CONF_POWER_WINDOW: Final[str] = "power_window"
+CONF_CACHE_FLUSH_INTERVAL: Final[str] = "cache_flush_interval"
+
+# Stick-wide polling defaults
+DEFAULT_POLL_INTERVAL: Final[int] = 15  # seconds between refreshes of one node
+DEFAULT_POLL_RATE: Final[float] = 4.0  # maximum node refreshes per second
+MIN_POLL_INTERVAL: Final[int] = 5
+MAX_POLL_INTERVAL: Final[int] = 300
+MIN_POLL_RATE: Final[float] = 0.5
+MAX_POLL_RATE: Final[float] = 20.0
+DEFAULT_NETWORK_REFRESH: Final[bool] = False
+DEFAULT_MIN_POLL_INTERVAL: Final[int] = 10
+DEFAULT_MAX_POLL_INTERVAL: Final[int] = 60
+DEFAULT_DISCOVERY_TIMEOUT: Final[int] = 0  # seconds setup waits for network discovery
+MAX_DISCOVERY_TIMEOUT: Final[int] = 600
+NETWORK_REFRESH_MAX_IN_FLIGHT: Final[int] = 4  # concurrent node requests in one sweep
+DEFAULT_PUSH_WINDOW: Final[float] = 1.0  # seconds pushes of one feature are coalesced
+MAX_PUSH_WINDOW: Final[float] = 10.0
+DEFAULT_UNAVAILABLE_POLLS: Final[int] = 3  # failed polls before entities go unavailable
+MAX_UNAVAILABLE_POLLS: Final[int] = 20
+DEFAULT_UNAVAILABLE_GRACE: Final[int] = 60  # seconds of failed polls, whichever first
+MAX_UNAVAILABLE_GRACE: Final[int] = 3600
+DEFAULT_POWER_WINDOW: Final[int] = 5  # minutes of the rolling power statistics
+MAX_POWER_WINDOW: Final[int] = 60
+POWER_BUFFER_SIZE: Final[int] = 720  # samples per node, an hour of 5 second polls
+DEFAULT_CACHE_FLUSH_INTERVAL: Final[int] = 60  # seconds between cache writes, 0 at once
+MAX_CACHE_FLUSH_INTERVAL: Final[int] = 3600
+
+# Adaptive polling, based on the volatility of the power samples of a node
+POWER_SAMPLES: Final[int] = 8  # number of recent samples to judge volatility
+POWER_STABLE_STDEV: Final[float] = 1.0  # W, slow down polling below this
+POWER_VOLATILE_STDEV: Final[float] = 5.0  # W, speed up polling above this
+POWER_STEP_ABSOLUTE: Final[float] = 10.0  # W, minimal step change to boost polling
+POWER_STEP_RELATIVE: Final[float] = 0.2  # minimal relative step change to boost polling
+POLL_BOOST_DELAY: Final[float] = 2.0  # seconds, refresh delay after a relay command
+
+# Circuit breaker, backing off from polling nodes which stopped responding
+BREAKER_FAILURE_THRESHOLD: Final[int] = 3  # consecutive failed polls opening it
+BREAKER_MIN_BACKOFF: Final[int] = 30  # seconds until the first probe of a node
+BREAKER_MAX_BACKOFF: Final[int] = 900
+
+# Seconds between two refreshes of a slowly changing feature which costs a
+# request of its own, features not listed here are refreshed at every poll of
+# their node. Relay states are served from the library cache.
+# ENERGY and POWER must share a cadence: never list only one of them, the
+# library handles the hour rollover only when both are requested together.
+FEATURE_REFRESH_INTERVALS: Final[dict[NodeFeature, int]] = {
+    NodeFeature.PING: 300,
+}
+
+# Warm restart from the last known node states
+SNAPSHOT_SAVE_INTERVAL: Final[int] = 300  # seconds between two snapshots
+INVENTORY_SAVE_DELAY: Final[int] = 10  # seconds to collect inventory changes
+ENERGY_IMPORT_INTERVAL: Final[int] = 300  # seconds between two statistics imports
+ENERGY_SAVE_DELAY: Final[int] = 10  # seconds to collect the running hours of all nodes
+TRAFFIC_FLUSH_INTERVAL: Final[int] = 10  # seconds between two writes of a recording
+MAX_TRAFFIC_DURATION: Final[int] = 86400  # seconds a recording may be limited to
+
 SERVICE_DISABLE_PRODUCTION: Final[str] = "disable_production"
 SERVICE_ENABLE_PRODUCTION: Final[str] = "enable_production"
 SERVICE_ENERGY_RESET: Final[str] = "reset_energy_logs"
-SERVICE_USB_DEVICE_SCHEMA: Final = vol.Schema(
+SERVICE_START_RECORDING: Final[str] = "start_traffic_recording"
+SERVICE_STOP_RECORDING: Final[str] = "stop_traffic_recording"
+ATTR_DURATION: Final[str] = "duration"
+SERVICE_START_RECORDING_SCHEMA: Final = vol.Schema(
     {
-        vol.Required(ATTR_MAC): vol.All(
-            cv.string,
-            vol.Match(r"^[0-9A-Fa-f]{16}$")
+        vol.Optional(ATTR_DURATION): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=MAX_TRAFFIC_DURATION)
         )
     }
 )
+ATTR_ALL_CIRCLES: Final[str] = "all_circles"
+ATTR_CONSUMPTION_INTERVAL: Final[str] = "consumption_interval"
+ATTR_PRODUCTION_INTERVAL: Final[str] = "production_interval"
+DEFAULT_ENERGY_INTERVAL: Final[int] = 60  # minutes between two energy log records
+MAX_ENERGY_INTERVAL: Final[int] = 1440
+SERVICE_MAX_IN_FLIGHT: Final[int] = 4  # concurrent node requests of one service call
+SERVICE_SWITCH_RELAYS: Final[str] = "switch_relays"
+ATTR_STAGGER: Final[str] = "stagger"
+ATTR_RETRIES: Final[str] = "retries"
+MAX_RELAY_STAGGER: Final[float] = 5.0  # seconds between two relay commands
+DEFAULT_RELAY_RETRIES: Final[int] = 2
+MAX_RELAY_RETRIES: Final[int] = 5
+# Nodes a service call applies to, by mac, by area or all Circles
+SERVICE_NODES_FIELDS: Final = {
+    vol.Optional(ATTR_MAC): vol.All(
+        cv.ensure_list,
+        [vol.All(cv.string, vol.Match(r"^[0-9A-Fa-f]{16}$"))],
+    ),
+    vol.Optional(ATTR_AREA_ID): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(ATTR_ALL_CIRCLES): cv.boolean,
+}
 
 # USB SED (battery powered) device constants
 ATTR_SED_STAY_ACTIVE: Final[str] = "stay_active"
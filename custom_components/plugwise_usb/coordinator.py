@@ -1,19 +1,58 @@
 """DataUpdateCoordinator for Plugwise USB-Stick."""
 
-from collections import Counter
+import asyncio
+from collections import Counter, deque
 from collections.abc import Callable
-from datetime import timedelta
+from datetime import datetime, timedelta
+from functools import partial
 import logging
+from statistics import pstdev
+from time import monotonic
 from typing import Any
 
-from plugwise_usb.api import PUSHING_FEATURES, NodeFeature, PlugwiseNode
+from plugwise_usb.api import (
+    PUSHING_FEATURES,
+    NodeFeature,
+    NodeInfo,
+    PlugwiseNode,
+    RelayState,
+)
 from plugwise_usb.exceptions import NodeError, NodeTimeout, StickError, StickTimeout
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .const import STICK
+from .const import (
+    BREAKER_FAILURE_THRESHOLD,
+    CONF_POWER_WINDOW,
+    CONF_PUSH_WINDOW,
+    CONF_UNAVAILABLE_GRACE,
+    CONF_UNAVAILABLE_POLLS,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_POWER_WINDOW,
+    DEFAULT_PUSH_WINDOW,
+    DEFAULT_UNAVAILABLE_GRACE,
+    DEFAULT_UNAVAILABLE_POLLS,
+    ENERGY_STATISTICS,
+    FEATURE_REFRESH_INTERVALS,
+    POLL_BOOST_DELAY,
+    POWER_SAMPLES,
+    POWER_STABLE_STDEV,
+    POWER_STEP_ABSOLUTE,
+    POWER_STEP_RELATIVE,
+    POWER_VOLATILE_STDEV,
+    REQUEST_QUEUE,
+    SCHEDULER,
+    STICK,
+    TRAFFIC_RECORDER,
+)
+from .metrics import PlugwiseUSBCircuitBreaker, PlugwiseUSBNodeMetrics
+from .power_buffer import PlugwiseUSBPowerBuffer
+from .request_queue import RequestPriority
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,47 +70,161 @@ class PlugwiseUSBDataUpdateCoordinator(DataUpdateCoordinator):
         config_entry: PlugwiseUSBConfigEntry,
         node: PlugwiseNode,
         update_interval: timedelta | None = None,
+        inventory_info: NodeInfo | None = None,
     ) -> None:
         """Initialize Plugwise USB data update coordinator."""
         self.node = node
+        self._inventory_info = inventory_info
+        # Feature of each created entity, indexed by platform and description key
+        self.entity_features: dict[tuple[Platform, str], NodeFeature] = {}
         self.subscribed_nodefeatures: list[NodeFeature] = []
         self._subscribe_to_feature_fn = self.node.subscribe_to_feature_update
         self.unsubscribe_push_events: list[Callable[[], None]] = []
-        if node.node_info.is_battery_powered:
+        # Version of the state of each feature, pushes not changing it are dropped
+        self.feature_versions: Counter[NodeFeature] = Counter()
+        self.feature_updated: dict[NodeFeature, datetime] = {}
+        # Features to refresh at the next poll, regardless of their cadence
+        self._expired_features: set[NodeFeature] = set()
+        # Refresh of mains powered nodes is driven by the stick-wide poll scheduler
+        self.poll_interval = update_interval or timedelta(seconds=DEFAULT_POLL_INTERVAL)
+        self.min_poll_interval = self.poll_interval
+        self.max_poll_interval = self.poll_interval
+        self._power_samples: deque[float] = deque(maxlen=POWER_SAMPLES)
+        # Rolling power statistics, created at the first power sample
+        self.power_window: int = config_entry.options.get(
+            CONF_POWER_WINDOW, DEFAULT_POWER_WINDOW
+        )
+        self.power_buffer: PlugwiseUSBPowerBuffer | None = None
+        # Pushes of a feature following a delivered push are coalesced
+        self.push_window: float = config_entry.options.get(
+            CONF_PUSH_WINDOW, DEFAULT_PUSH_WINDOW
+        )
+        self.coalesced_pushes = 0
+        self._push_windows: dict[NodeFeature, Callable[[], None]] = {}
+        self._held_pushes: set[NodeFeature] = set()
+        self._delivered_pushes: dict[NodeFeature, Any] = {}
+        # Data restored from the snapshot of the previous run, until refreshed
+        self.stale = False
+        self.metrics = PlugwiseUSBNodeMetrics()
+        self.breaker = PlugwiseUSBCircuitBreaker()
+        # Entities stay available for a few failed polls or a grace period
+        self.unavailable_polls: int = config_entry.options.get(
+            CONF_UNAVAILABLE_POLLS, DEFAULT_UNAVAILABLE_POLLS
+        )
+        self.unavailable_grace: int = config_entry.options.get(
+            CONF_UNAVAILABLE_GRACE, DEFAULT_UNAVAILABLE_GRACE
+        )
+        self._failing_since: datetime | None = None
+        self._cancel_grace: Callable[[], None] | None = None
+        self._cancel_half_open: Callable[[], None] | None = None
+        if self.node_info.is_battery_powered:
             _LOGGER.debug("Create battery powered DUC for %s", node.mac)
-            super().__init__(
-                hass,
-                _LOGGER,
-                config_entry=config_entry,
-                name=node.node_info.name,
-                update_method=self.async_node_update,
-                always_update=True,
-            )
         else:
             _LOGGER.debug(
-                "Create DUC for %s with update interval %s", node.mac, update_interval
-            )
-            super().__init__(
-                hass,
-                _LOGGER,
-                name=node.node_info.name,
-                update_interval=timedelta(seconds=15),
-                update_method=self.async_node_update,
-                always_update=True,
+                "Create DUC for %s with poll interval %s", node.mac, self.poll_interval
             )
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=config_entry,
+            name=self.node_info.name,
+            update_method=self.async_node_update,
+            always_update=True,
+        )
 
         self.api_stick = config_entry.runtime_data[STICK]
+        self.request_queue = config_entry.runtime_data[REQUEST_QUEUE]
+        self.traffic_recorder = config_entry.runtime_data.get(TRAFFIC_RECORDER)
+
+    @property
+    def node_info(self) -> NodeInfo:
+        """Return the node info, from the inventory until the node is loaded."""
+        if self.node.is_loaded or self._inventory_info is None:
+            return self.node.node_info
+        return self._inventory_info
+
+    @property
+    def features(self) -> tuple[NodeFeature, ...]:
+        """Return the features of the node, none until loaded or in the inventory."""
+        if self.node.is_loaded:
+            return self.node.features
+        if self._inventory_info is None:
+            return ()
+        return self._inventory_info.features
+
+    @property
+    def available(self) -> bool:
+        """Return if the entities of the node are available.
+
+        Once polled successfully, a mains powered node only becomes unavailable
+        after a number of failed polls in a row or a grace period, whichever
+        comes first, instead of at the first lost frame. The restored states of
+        the previous run are served the same way until the first live state.
+        """
+        if self.stale and self._failing_since is None:
+            return True
+        if self.node_info.is_battery_powered or (
+            self.metrics.last_success is None and not self.stale
+        ):
+            return self.node.available and self.last_update_success
+        if self._failing_since is None:
+            return True
+        return (
+            self.metrics.consecutive_failures < self.unavailable_polls
+            and dt_util.utcnow() - self._failing_since
+            < timedelta(seconds=self.unavailable_grace)
+        )
+
+    @property
+    def polled_features(self) -> tuple[NodeFeature, ...]:
+        """Return the unique features requested by the entities of this node."""
+        freq_features = Counter(self.async_contexts())
+        return tuple(freq_features.keys())
+
+    @property
+    def due_features(self) -> tuple[NodeFeature, ...]:
+        """Return the polled features whose refresh cadence has passed."""
+        now = dt_util.utcnow()
+        return tuple(
+            feature
+            for feature in self.polled_features
+            if self._feature_due(feature, now)
+        )
+
+    def _feature_due(self, feature: NodeFeature, now: datetime) -> bool:
+        """Return True when a feature should be refreshed at this poll."""
+        if (
+            feature in self._expired_features
+            or (updated := self.feature_updated.get(feature)) is None
+        ):
+            return True
+        if (interval := FEATURE_REFRESH_INTERVALS.get(feature)) is None:
+            return True
+        return (now - updated).total_seconds() >= interval
+
+    @callback
+    def async_expire_feature(self, feature: NodeFeature) -> None:
+        """Refresh a feature at the next poll, like after a command changed it."""
+        self._expired_features.add(feature)
 
     async def async_node_update(self) -> dict[NodeFeature, Any]:
         """Request status update for Plugwise Node."""
         states: dict[NodeFeature, Any] = {}
 
-        # Only unique features
-        freq_features = Counter(self.async_contexts())
-        features = tuple(freq_features.keys())
+        # Only the unique features which are due, slow features skip most polls
+        features = self.due_features
+        # Energy refreshes may trigger the collection of many energy logs
+        priority = (
+            RequestPriority.BACKGROUND
+            if NodeFeature.ENERGY in features
+            else RequestPriority.POLL
+        )
         try:
-            states = await self.node.get_state(features)
+            states = await self.request_queue.async_submit(
+                priority, self._async_get_state, features
+            )
         except (NodeError, NodeTimeout, StickError, StickTimeout) as err:
+            await self._async_record_failure(type(err).__name__)
             raise UpdateFailed(
                 f"Failed to refresh node {self.node.node_info.mac}: {err}"
             ) from err
@@ -81,17 +234,195 @@ class PlugwiseUSBDataUpdateCoordinator(DataUpdateCoordinator):
             and self.node.initialized
             and not states[NodeFeature.AVAILABLE].state
         ):
+            await self._async_record_failure("unavailable")
             raise UpdateFailed(
                 f"Device '{self.node.node_info.mac}' is (temporarily) not available"
             )
 
+        self.stale = False
+        self.metrics.record_success()
+        self._async_reset_failing()
+        if self.breaker.record_success():
+            _LOGGER.info("Node %s responds again, resume polling", self.node.mac)
+        self._expired_features.difference_update(features)
+        self._adapt_poll_interval(states)
+        if (power := states.get(NodeFeature.POWER)) is not None:
+            if self.power_buffer is None:
+                self.power_buffer = PlugwiseUSBPowerBuffer(self.power_window * 60)
+            self.power_buffer.add(power)
+        if (energy := states.get(NodeFeature.ENERGY)) is not None and (
+            importer := self.config_entry.runtime_data.get(ENERGY_STATISTICS)
+        ) is not None:
+            importer.async_add_energy(self.node.mac, str(self.node_info.name), energy)
+        return self._merge_states(states)
+
+    async def _async_get_state(
+        self, features: tuple[NodeFeature, ...]
+    ) -> dict[NodeFeature, Any]:
+        """Request the states of the node, measuring the time on the link."""
+        start = monotonic()
+        try:
+            states = await self.node.get_state(features)
+        except (NodeError, NodeTimeout, StickError, StickTimeout) as err:
+            if self.traffic_recorder is not None:
+                self.traffic_recorder.record_error(
+                    self.node.mac, features, monotonic() - start, err
+                )
+            raise
+        finally:
+            self.metrics.record_duration(monotonic() - start)
+        if self.traffic_recorder is not None:
+            self.traffic_recorder.record_response(
+                self.node.mac, features, monotonic() - start, states
+            )
         return states
 
+    async def _async_record_failure(self, error: str) -> None:
+        """Count a failed refresh and refresh the diagnostic entities."""
+        self.metrics.record_failure(error)
+        if self._failing_since is None:
+            self._failing_since = dt_util.utcnow()
+            self._cancel_grace = async_call_later(
+                self.hass, self.unavailable_grace, self._async_grace_expired
+            )
+        elif self.metrics.consecutive_failures == self.unavailable_polls:
+            # Listeners are not notified of repeated failures, only of the first
+            self.async_update_listeners()
+        if (backoff := self.breaker.record_failure()) is not None:
+            if self.breaker.failures == BREAKER_FAILURE_THRESHOLD:
+                _LOGGER.info(
+                    "Node %s failed %s polls in a row, back off polling",
+                    self.node.mac,
+                    BREAKER_FAILURE_THRESHOLD,
+                )
+            _LOGGER.debug("Probe %s again in %s seconds", self.node.mac, backoff)
+            self._async_cancel_half_open()
+            self._cancel_half_open = async_call_later(
+                self.hass, backoff, self._async_circuit_half_open
+            )
+            # Any frame of the node closes the circuit, without waiting for a probe
+            await self.subscribe_nodefeature(NodeFeature.AVAILABLE)
+        # Listeners are only notified of the first failure in a row
+        self.async_update_feature_listeners(NodeFeature.AVAILABLE)
+
+    @callback
+    def _async_grace_expired(self, _: datetime) -> None:
+        """Make the entities of a still failing node unavailable."""
+        self._cancel_grace = None
+        self.async_update_listeners()
+
+    @callback
+    def _async_circuit_half_open(self, _: datetime) -> None:
+        """Show the circuit is half open, the node is probed at its next poll."""
+        self._cancel_half_open = None
+        self.async_update_feature_listeners(NodeFeature.AVAILABLE)
+
+    @callback
+    def _async_cancel_half_open(self) -> None:
+        """Cancel the update at the end of the backoff, the node responded."""
+        if self._cancel_half_open is not None:
+            self._cancel_half_open()
+            self._cancel_half_open = None
+
+    @callback
+    def _async_reset_failing(self) -> None:
+        """Stop counting towards unavailability, the node responded."""
+        self._failing_since = None
+        self.metrics.reset_failures()
+        if self._cancel_grace is not None:
+            self._cancel_grace()
+            self._cancel_grace = None
+        self._async_cancel_half_open()
+
+    @callback
+    def async_restore_states(self, states: dict[NodeFeature, Any]) -> None:
+        """Seed the coordinator with the states of the previous run."""
+        if not states or self.data is not None:
+            return
+        _LOGGER.debug("Restore %s states of %s", len(states), self.node.mac)
+        self.data = states
+        self.stale = True
+
+    @callback
+    def async_set_poll_limits(
+        self,
+        poll_interval: timedelta,
+        min_poll_interval: timedelta,
+        max_poll_interval: timedelta,
+    ) -> None:
+        """Set the poll interval and the range it may be adapted in."""
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.poll_interval = min(max(poll_interval, min_poll_interval), max_poll_interval)
+
+    @callback
+    def async_relay_switched(self, state: bool) -> None:
+        """Merge the state of a switched relay, until a refresh confirms it."""
+        self.data = self._merge_states(
+            {NodeFeature.RELAY: RelayState(state, dt_util.utcnow())}
+        )
+        self.async_update_feature_listeners(NodeFeature.RELAY)
+        self.async_expire_feature(NodeFeature.RELAY)
+        self.async_boost_polling()
+
+    @callback
+    def async_boost_polling(self, delay: float = POLL_BOOST_DELAY) -> None:
+        """Poll at the shortest interval, starting after delay seconds."""
+        self.poll_interval = self.min_poll_interval
+        self._power_samples.clear()
+        if (scheduler := self.config_entry.runtime_data.get(SCHEDULER)) is not None:
+            scheduler.async_reschedule(self.node.mac, delay)
+
+    def _adapt_poll_interval(self, states: dict[NodeFeature, Any]) -> None:
+        """Adjust the poll interval to the volatility of the power samples."""
+        if (
+            self.min_poll_interval == self.max_poll_interval
+            or (power := states.get(NodeFeature.POWER)) is None
+            or power.last_second is None
+        ):
+            return
+        sample = power.last_second
+        previous = self._power_samples[-1] if self._power_samples else None
+        self._power_samples.append(sample)
+        if previous is not None and abs(sample - previous) >= max(
+            POWER_STEP_ABSOLUTE, POWER_STEP_RELATIVE * abs(previous)
+        ):
+            _LOGGER.debug("Power step change for %s, boost polling", self.node.mac)
+            self.poll_interval = self.min_poll_interval
+            return
+        if len(self._power_samples) < 2:
+            return
+        spread = pstdev(self._power_samples)
+        if spread >= POWER_VOLATILE_STDEV:
+            self.poll_interval = max(self.poll_interval / 2, self.min_poll_interval)
+        elif spread <= POWER_STABLE_STDEV:
+            self.poll_interval = min(self.poll_interval * 1.5, self.max_poll_interval)
+
+    def _merge_states(self, states: dict[NodeFeature, Any]) -> dict[NodeFeature, Any]:
+        """Return last known states updated with the given (not None) states."""
+        merged: dict[NodeFeature, Any] = dict(self.data) if self.data else {}
+        now = dt_util.utcnow()
+        for feature, state in states.items():
+            if state is None:
+                continue
+            if merged.get(feature) != state:
+                self.feature_versions[feature] += 1
+            merged[feature] = state
+            self.feature_updated[feature] = now
+        return merged
+
+    @callback
+    def async_update_feature_listeners(self, feature: NodeFeature) -> None:
+        """Notify only the listeners bound to the given feature."""
+        for update_callback, context in list(self._listeners.values()):
+            if context == feature:
+                update_callback()
+
     async def subscribe_nodefeature(self, node_feature: NodeFeature) -> None:
         """Subscribe to a nodefeature."""
         if (
             node_feature in PUSHING_FEATURES
-            and node_feature in self.node.node_info.features
+            and node_feature in self.features
             and node_feature not in self.subscribed_nodefeatures
         ):
             self.unsubscribe_push_events.append(
@@ -103,12 +434,75 @@ class PlugwiseUSBDataUpdateCoordinator(DataUpdateCoordinator):
             self.subscribed_nodefeatures.append(node_feature)
 
     async def async_push_event(self, feature: NodeFeature, state: Any) -> None:
-        """Update data pushed by node."""
-        self.async_set_updated_data(
-            {
-                feature: state,
-            }
-        )
+        """Merge data pushed by node into the last known states."""
+        if state is None:
+            return
+        if self.traffic_recorder is not None:
+            self.traffic_recorder.record_push(self.node.mac, feature, state)
+        if feature != NodeFeature.AVAILABLE or state.state:
+            self._async_reset_failing()
+            if self.breaker.record_success():
+                _LOGGER.info("Node %s is back, resume polling", self.node.mac)
+                if (
+                    scheduler := self.config_entry.runtime_data.get(SCHEDULER)
+                ) is not None:
+                    scheduler.async_reschedule(self.node.mac)
+        version = self.feature_versions[feature]
+        data = self._merge_states({feature: state})
+        self.stale = False
+        if not self.last_update_success:
+            # Availability of all entities changes, notify every listener
+            self._async_open_push_window(feature, state)
+            self.async_set_updated_data(data)
+            return
+        self.data = data
+        if self.feature_versions[feature] == version:
+            # The same state again, like a repeated configuration
+            return
+        if feature in self._push_windows and not self._urgent_push(feature, state):
+            # The listeners get the latest merged state when the window closes
+            self._held_pushes.add(feature)
+            self.coalesced_pushes += 1
+            return
+        self._async_open_push_window(feature, state)
+        self.async_update_feature_listeners(feature)
+
+    def _urgent_push(self, feature: NodeFeature, state: Any) -> bool:
+        """Return True for a push which cannot wait for its window to close."""
+        delivered = self._delivered_pushes.get(feature)
+        if feature == NodeFeature.MOTION:
+            # The start of a motion is delivered at once, the end may wait
+            return bool(state.state) and not (delivered and delivered.state)
+        if feature == NodeFeature.SWITCH:
+            # Another button is an event of its own, only repeats are merged
+            return delivered is None or (state.state, state.group) != (
+                delivered.state,
+                delivered.group,
+            )
+        return False
+
+    @callback
+    def _async_open_push_window(self, feature: NodeFeature, state: Any) -> None:
+        """Hold back the pushes of a just delivered feature for the push window."""
+        self._delivered_pushes[feature] = state
+        self._held_pushes.discard(feature)
+        if (cancel := self._push_windows.pop(feature, None)) is not None:
+            cancel()
+        if self.push_window > 0:
+            self._push_windows[feature] = async_call_later(
+                self.hass,
+                self.push_window,
+                partial(self._async_push_window_closed, feature),
+            )
+
+    @callback
+    def _async_push_window_closed(self, feature: NodeFeature, _: datetime) -> None:
+        """Deliver the latest held push, coalescing while pushes keep coming."""
+        self._push_windows.pop(feature, None)
+        if feature not in self._held_pushes or not self.data:
+            return
+        self._async_open_push_window(feature, self.data[feature])
+        self.async_update_feature_listeners(feature)
 
     async def unsubscribe_all_nodefeatures(self) -> None:
         """Unsubscribe to updates."""
@@ -117,4 +511,91 @@ class PlugwiseUSBDataUpdateCoordinator(DataUpdateCoordinator):
                 unsubscribe_push_event()
         self.unsubscribe_push_events.clear()
         self.subscribed_nodefeatures.clear()
+        for cancel in self._push_windows.values():
+            cancel()
+        self._push_windows.clear()
+        self._held_pushes.clear()
+        self._async_reset_failing()
+
+
+class PlugwiseUSBNetworkCoordinator(DataUpdateCoordinator):
+    """Class to refresh all mains powered nodes in one pipelined sweep."""
+
+    config_entry: PlugwiseUSBConfigEntry
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry: PlugwiseUSBConfigEntry,
+        max_in_flight: int,
+    ) -> None:
+        """Initialize Plugwise USB network update coordinator."""
+        self.node_coordinators: dict[str, PlugwiseUSBDataUpdateCoordinator] = {}
+        self.max_in_flight = max_in_flight
+        self._sweep_macs: set[str] | None = None
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=config_entry,
+            name="Plugwise USB network",
+            update_method=self.async_network_update,
+            always_update=True,
+        )
+
+    async def async_sweep(self, macs: set[str]) -> None:
+        """Refresh only the nodes of the given macs in one sweep."""
+        self._sweep_macs = macs
+        try:
+            await self.async_refresh()
+        finally:
+            self._sweep_macs = None
+
+    async def async_network_update(self) -> dict[str, dict[NodeFeature, Any]]:
+        """Request status update for all nodes, several requests in flight at once.
+
+        Requests are paced by the number in flight only, the next one starts as
+        soon as one of the previous completes.
+        """
+        coordinators = [
+            coordinator
+            for mac, coordinator in self.node_coordinators.items()
+            if (self._sweep_macs is None or mac in self._sweep_macs)
+            and coordinator.node.is_loaded
+            and coordinator.polled_features
+            and coordinator.breaker.allow_poll
+        ]
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def _async_node_update(
+            coordinator: PlugwiseUSBDataUpdateCoordinator,
+        ) -> dict[NodeFeature, Any] | UpdateFailed:
+            """Request the state of one node once a request slot is free.
+
+            A failing node only fails its own refresh, not the whole sweep.
+            """
+            async with semaphore:
+                try:
+                    return await coordinator.async_node_update()
+                except UpdateFailed as err:
+                    return err
+                except Exception as err:
+                    _LOGGER.exception(
+                        "Unexpected error refreshing node %s", coordinator.node.mac
+                    )
+                    return UpdateFailed(
+                        f"Failed to refresh node {coordinator.node.mac}: {err}"
+                    )
+
+        results = await asyncio.gather(
+            *(_async_node_update(coordinator) for coordinator in coordinators)
+        )
 
+        # Hand each node coordinator its own slice in one pass
+        network_states: dict[str, dict[NodeFeature, Any]] = {}
+        for coordinator, result in zip(coordinators, results, strict=True):
+            if isinstance(result, UpdateFailed):
+                coordinator.async_set_update_error(result)
+                continue
+            coordinator.async_set_updated_data(result)
+            network_states[coordinator.node.mac] = result
+        return network_states
@@ -0,0 +1,142 @@
+"""Diagnostics support for Plugwise USB."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.device_registry import DeviceEntry
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CACHE_WRITER,
+    CONF_USB_PATH,
+    DOMAIN,
+    INVENTORY,
+    NODES,
+    REQUEST_QUEUE,
+    SCHEDULER,
+    SETUP_TIMINGS,
+    STICK,
+)
+from .coordinator import PlugwiseUSBConfigEntry, PlugwiseUSBDataUpdateCoordinator
+from .metrics import metrics_summary
+from .snapshot import encode_dataclass
+
+TO_REDACT = {CONF_USB_PATH}
+
+
+def _redact_macs(data: Any, macs: dict[str, str]) -> Any:
+    """Replace the MAC addresses in keys and values by their placeholder."""
+    if isinstance(data, dict):
+        return {
+            _redact_macs(key, macs): _redact_macs(value, macs)
+            for key, value in data.items()
+        }
+    if isinstance(data, list | tuple):
+        return [_redact_macs(item, macs) for item in data]
+    if isinstance(data, str):
+        for mac, placeholder in macs.items():
+            data = data.replace(mac, placeholder)
+    return data
+
+
+def _mac_placeholders(config_entry: PlugwiseUSBConfigEntry) -> dict[str, str]:
+    """Return a placeholder per MAC, the same one in every section."""
+    runtime_data = config_entry.runtime_data
+    stick = runtime_data[STICK]
+    macs = {str(stick.mac_stick): "**STICK**", str(stick.mac_coordinator): "**CIRCLE+**"}
+    known = set(runtime_data[NODES]) | set(runtime_data[INVENTORY].as_dict())
+    for index, mac in enumerate(sorted(known - set(macs)), start=1):
+        macs[mac] = f"**NODE_{index}**"
+    return macs
+
+
+def _node_diagnostics(
+    coordinator: PlugwiseUSBDataUpdateCoordinator,
+) -> dict[str, Any]:
+    """Return the state, timings and failures of one node."""
+    now = dt_util.utcnow()
+    return {
+        "node_info": encode_dataclass(coordinator.node_info),
+        "loaded": coordinator.node.is_loaded,
+        "available": coordinator.node.available,
+        "entities_available": coordinator.available,
+        "stale": coordinator.stale,
+        "last_update_success": coordinator.last_update_success,
+        "poll_interval": coordinator.poll_interval.total_seconds(),
+        "polled_features": [feature.value for feature in coordinator.polled_features],
+        "due_features": [feature.value for feature in coordinator.due_features],
+        "state_age": {
+            feature.value: round((now - updated).total_seconds(), 1)
+            for feature, updated in coordinator.feature_updated.items()
+        },
+        "push_window": coordinator.push_window,
+        "coalesced_pushes": coordinator.coalesced_pushes,
+        "metrics": coordinator.metrics.as_dict(),
+        "circuit_breaker": coordinator.breaker.as_dict(),
+        "power_statistics": None
+        if coordinator.power_buffer is None
+        else coordinator.power_buffer.as_dict(),
+    }
+
+
+def _stick_diagnostics(config_entry: PlugwiseUSBConfigEntry) -> dict[str, Any]:
+    """Return the state of the Stick, the setup timings, requests and cache writes."""
+    runtime_data = config_entry.runtime_data
+    stick = runtime_data[STICK]
+    return {
+        "stick": {
+            "mac_stick": stick.mac_stick,
+            "mac_coordinator": stick.mac_coordinator,
+            "hardware": stick.hardware,
+            "firmware": stick.firmware,
+            "network_state": stick.network_state,
+            "network_discovered": stick.network_discovered,
+            "joined_nodes": stick.joined_nodes,
+        },
+        "setup_timings": {
+            phase: round(duration, 3)
+            for phase, duration in runtime_data[SETUP_TIMINGS].items()
+        },
+        "scheduler": runtime_data[SCHEDULER].as_dict(),
+        "request_queue": runtime_data[REQUEST_QUEUE].as_dict(),
+        "cache_writer": runtime_data[CACHE_WRITER].as_dict(),
+    }
+
+
+async def async_get_config_entry_diagnostics(
+    _hass: HomeAssistant, config_entry: PlugwiseUSBConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    runtime_data = config_entry.runtime_data
+    nodes = runtime_data[NODES]
+    diagnostics = {
+        "entry": {
+            "data": async_redact_data(config_entry.data, TO_REDACT),
+            "options": dict(config_entry.options),
+        },
+        **_stick_diagnostics(config_entry),
+        "inventory": runtime_data[INVENTORY].as_dict(),
+        "nodes": {mac: _node_diagnostics(nodes[mac]) for mac in sorted(nodes)},
+        # Ranking of the nodes by the link time their refreshes took
+        "slowest_nodes": list(metrics_summary(nodes.values())),
+    }
+    return _redact_macs(diagnostics, _mac_placeholders(config_entry))
+
+
+async def async_get_device_diagnostics(
+    _hass: HomeAssistant, config_entry: PlugwiseUSBConfigEntry, device: DeviceEntry
+) -> dict[str, Any]:
+    """Return diagnostics for the Stick or a node device."""
+    runtime_data = config_entry.runtime_data
+    diagnostics: dict[str, Any] = {}
+    for domain, mac in device.identifiers:
+        if domain != DOMAIN:
+            continue
+        if mac == str(runtime_data[STICK].mac_stick):
+            diagnostics = _stick_diagnostics(config_entry)
+        elif (coordinator := runtime_data[NODES].get(mac)) is not None:
+            diagnostics = _node_diagnostics(coordinator)
+    return _redact_macs(diagnostics, _mac_placeholders(config_entry))
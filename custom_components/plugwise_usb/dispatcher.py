@@ -0,0 +1,109 @@
+"""Create the entities of Plugwise USB nodes for all platforms at once."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+import logging
+
+from plugwise_usb.api import NodeFeature
+
+from homeassistant.const import Platform
+from homeassistant.core import callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import NODES
+from .coordinator import PlugwiseUSBConfigEntry, PlugwiseUSBDataUpdateCoordinator
+from .entity import PlugwiseUSBEntity, PlugwiseUSBEntityDescription
+
+_LOGGER = logging.getLogger(__name__)
+
+type EntityClass = Callable[
+    [PlugwiseUSBDataUpdateCoordinator, PlugwiseUSBEntityDescription],
+    PlugwiseUSBEntity,
+]
+
+
+def feature_index[D: PlugwiseUSBEntityDescription](
+    descriptions: Iterable[D],
+) -> dict[NodeFeature, tuple[D, ...]]:
+    """Return the entity descriptions grouped by node feature."""
+    index: defaultdict[NodeFeature, list[D]] = defaultdict(list)
+    for description in descriptions:
+        index[description.node_feature].append(description)
+    return {feature: tuple(grouped) for feature, grouped in index.items()}
+
+
+class PlugwiseUSBEntityDispatcher:
+    """Hand each platform the entities of a node in one call.
+
+    Platforms register their feature index once. For every node that is known
+    or loaded, only the descriptions of the features of the node are looked up,
+    instead of every platform matching all its descriptions against each node.
+    """
+
+    def __init__(self, config_entry: PlugwiseUSBConfigEntry) -> None:
+        """Initialize the entity dispatcher."""
+        self._config_entry = config_entry
+        self._platforms: dict[Platform, tuple[EntityClass, AddEntitiesCallback]] = {}
+        self._index: defaultdict[
+            NodeFeature,
+            list[tuple[Platform, tuple[PlugwiseUSBEntityDescription, ...]]],
+        ] = defaultdict(list)
+
+    @callback
+    def async_add_platform(
+        self,
+        platform: Platform,
+        index: dict[NodeFeature, tuple[PlugwiseUSBEntityDescription, ...]],
+        entity_class: EntityClass,
+        async_add_entities: AddEntitiesCallback,
+    ) -> None:
+        """Register a platform and add the entities of the current nodes."""
+        self._platforms[platform] = (entity_class, async_add_entities)
+        for feature, descriptions in index.items():
+            self._index[feature].append((platform, descriptions))
+        for node_duc in self._config_entry.runtime_data[NODES].values():
+            self.async_add_node_entities(node_duc, (platform,))
+
+    @callback
+    def async_remove_platform(self, platform: Platform) -> None:
+        """Stop adding entities to an unloaded platform."""
+        self._platforms.pop(platform, None)
+        for feature, platforms in self._index.items():
+            self._index[feature] = [
+                (index_platform, descriptions)
+                for index_platform, descriptions in platforms
+                if index_platform != platform
+            ]
+
+    @callback
+    def async_add_node_entities(
+        self,
+        node_duc: PlugwiseUSBDataUpdateCoordinator,
+        platforms: Iterable[Platform] | None = None,
+    ) -> None:
+        """Add the entities of all supported features of a node not added yet."""
+        selected = set(self._platforms if platforms is None else platforms)
+        entities: defaultdict[Platform, list[PlugwiseUSBEntity]] = defaultdict(list)
+        for feature in node_duc.features:
+            for platform, descriptions in self._index.get(feature, ()):
+                if platform not in selected:
+                    continue
+                entity_class = self._platforms[platform][0]
+                for description in descriptions:
+                    if (platform, description.key) in node_duc.entity_features or (
+                        description.exists_fn is not None
+                        and not description.exists_fn(node_duc)
+                    ):
+                        continue
+                    node_duc.entity_features[(platform, description.key)] = feature
+                    entities[platform].append(entity_class(node_duc, description))
+        for platform, platform_entities in entities.items():
+            _LOGGER.debug(
+                "Add %s %s entities for node %s",
+                len(platform_entities),
+                platform,
+                node_duc.node_info.mac,
+            )
+            self._platforms[platform][1](platform_entities)
@@ -0,0 +1,232 @@
+"""Import the hourly energy of Plugwise USB nodes into long-term statistics."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+import logging
+from typing import Any, NamedTuple
+
+from plugwise_usb.api import EnergyStatistics
+
+from homeassistant.components.recorder.models import (
+    StatisticData,
+    StatisticMeanType,
+    StatisticMetaData,
+)
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.util.unit_conversion import EnergyConverter
+
+from .const import DOMAIN, ENERGY_IMPORT_INTERVAL, ENERGY_SAVE_DELAY
+from .coordinator import PlugwiseUSBConfigEntry
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+HOUR = timedelta(hours=1)
+DIRECTIONS = ("consumption", "production")
+
+
+def statistic_id(mac: str, direction: str) -> str:
+    """Return the id of the external statistic of a node."""
+    return f"{DOMAIN}:{mac.lower()}_energy_{direction}"
+
+
+class RunningHour(NamedTuple):
+    """Energy counters of a node during the hour which is not completed yet."""
+
+    start: datetime
+    # Start of the day of the day counter, None without day counter
+    day: datetime | None
+    # Day counter at the start of the hour
+    day_start: float | None
+    # Last value seen of the hour counter
+    value: float
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the JSON compatible representation to store."""
+        return {
+            "start": self.start.isoformat(),
+            "day": None if self.day is None else self.day.isoformat(),
+            "day_start": self.day_start,
+            "value": self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, values: dict[str, Any]) -> RunningHour:
+        """Return the running hour represented by stored values."""
+        return cls(
+            datetime.fromisoformat(values["start"]),
+            None if values["day"] is None else datetime.fromisoformat(values["day"]),
+            values["day_start"],
+            values["value"],
+        )
+
+
+class PlugwiseUSBEnergyStatistics:
+    """Collect completed hours of energy and import them in batches.
+
+    The energy logs of a Circle are not exposed by the plugwise_usb library,
+    so the hour totals are taken from the energy statistics of the node. The
+    day counter minus the hour counter is the day counter at the start of the
+    running hour. At the first sample after an hour, the increase of that
+    value since the hour started is its total, however late the sample is.
+    Hours without any sample share the increase evenly. Only when the day
+    counter restarted in between, the last value seen of the hour is used.
+    The running hour, and the start and cumulative sum of the last imported
+    hour are persisted per node and direction, so hours are imported once and
+    hours running at a restart are completed after it.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, config_entry: PlugwiseUSBConfigEntry
+    ) -> None:
+        """Initialize the energy statistics importer."""
+        self._hass = hass
+        self._store: Store[dict[str, dict[str, dict[str, Any]]]] = Store(
+            hass,
+            STORAGE_VERSION,
+            f"{DOMAIN}.energy_statistics.{config_entry.entry_id}",
+        )
+        self._imported: dict[str, dict[str, Any]] = {}
+        self._running_hour: dict[str, RunningHour] = {}
+        self._pending: defaultdict[str, list[StatisticData]] = defaultdict(list)
+        self._names: dict[str, str] = {}
+
+    async def async_load(self) -> None:
+        """Load the last imported and running hours of the previous run."""
+        data = await self._store.async_load() or {}
+        self._imported = data.get("imported", {})
+        self._running_hour = {
+            stat_id: RunningHour.from_dict(values)
+            for stat_id, values in data.get("running", {}).items()
+        }
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Import the collected hours periodically, return the stop callback."""
+
+        async def async_import_interval(_: datetime) -> None:
+            await self.async_import()
+
+        return async_track_time_interval(
+            self._hass,
+            async_import_interval,
+            timedelta(seconds=ENERGY_IMPORT_INTERVAL),
+        )
+
+    @callback
+    def async_add_energy(self, mac: str, name: str, energy: EnergyStatistics) -> None:
+        """Collect the totals of the hours completed since the last update."""
+        for direction in DIRECTIONS:
+            value = getattr(energy, f"hour_{direction}")
+            hour = getattr(energy, f"hour_{direction}_reset")
+            if value is None or hour is None:
+                continue
+            day_value = getattr(energy, f"day_{direction}")
+            day = getattr(energy, f"day_{direction}_reset")
+            stat_id = statistic_id(mac, direction)
+            self._names[stat_id] = f"{name} energy {direction}"
+            running = RunningHour(
+                hour,
+                None if day_value is None else day,
+                None if day_value is None else max(abs(day_value) - abs(value), 0.0),
+                abs(value),
+            )
+            previous = self._running_hour.get(stat_id)
+            if previous is not None and hour <= previous.start:
+                if hour == previous.start:
+                    self._running_hour[stat_id] = previous._replace(value=abs(value))
+                continue
+            self._running_hour[stat_id] = running
+            self._store.async_delay_save(self._data_to_save, ENERGY_SAVE_DELAY)
+            if previous is not None:
+                self._async_add_completed(stat_id, previous, running)
+
+    @callback
+    def _async_add_completed(
+        self, stat_id: str, previous: RunningHour, running: RunningHour
+    ) -> None:
+        """Queue the hours between the previous and the new running hour."""
+        same_day = previous.day is not None and previous.day == running.day
+        if (
+            same_day
+            and previous.day_start is not None
+            and running.day_start is not None
+            and running.day_start >= previous.day_start
+        ):
+            self._async_add_hours(
+                stat_id,
+                previous.start,
+                running.start,
+                running.day_start - previous.day_start,
+            )
+            return
+        self._async_add_hours(
+            stat_id, previous.start, previous.start + HOUR, previous.value
+        )
+        if not same_day and running.day is not None and running.day_start:
+            # The hours of the new day before the running hour, the hours of the
+            # previous day after the previous running hour are unknown
+            self._async_add_hours(
+                stat_id,
+                max(running.day, previous.start + HOUR),
+                running.start,
+                running.day_start,
+            )
+
+    @callback
+    def _async_add_hours(
+        self, stat_id: str, start: datetime, end: datetime, energy: float
+    ) -> None:
+        """Queue the hours from start until end, sharing the energy evenly."""
+        if (hours := round((end - start) / HOUR)) < 1:
+            return
+        for hour in range(hours):
+            self._async_add_hour(stat_id, start + hour * HOUR, energy / hours)
+
+    @callback
+    def _async_add_hour(self, stat_id: str, start: datetime, value: float) -> None:
+        """Queue the total of a completed hour, unless imported before."""
+        last = self._imported.get(stat_id)
+        if last is not None and start <= datetime.fromisoformat(last["start"]):
+            return
+        total = (last["sum"] if last is not None else 0.0) + value
+        self._imported[stat_id] = {"start": start.isoformat(), "sum": total}
+        self._pending[stat_id].append(
+            StatisticData(start=start, state=value, sum=total)
+        )
+
+    async def async_import(self) -> None:
+        """Import all queued hours, with one batched call per statistic."""
+        for stat_id, rows in self._pending.items():
+            _LOGGER.debug("Import %s hours of %s", len(rows), stat_id)
+            async_add_external_statistics(
+                self._hass,
+                StatisticMetaData(
+                    mean_type=StatisticMeanType.NONE,
+                    has_sum=True,
+                    name=self._names.get(stat_id),
+                    source=DOMAIN,
+                    statistic_id=stat_id,
+                    unit_class=EnergyConverter.UNIT_CLASS,
+                    unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+                ),
+                rows,
+            )
+        self._pending.clear()
+        await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self) -> dict[str, dict[str, dict[str, Any]]]:
+        """Return the imported and running hours to save."""
+        return {
+            "imported": self._imported,
+            "running": {
+                stat_id: running.as_dict()
+                for stat_id, running in self._running_hour.items()
+            },
+        }
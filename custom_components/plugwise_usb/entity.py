@@ -2,17 +2,21 @@
 
 from __future__ import annotations
 
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
 import logging
+from typing import Any
 
 from plugwise_usb.api import NodeFeature, NodeInfo
 
+from homeassistant.core import callback
 from homeassistant.helpers.device_registry import CONNECTION_ZIGBEE, DeviceInfo
 from homeassistant.helpers.entity import EntityDescription
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
 from .coordinator import PlugwiseUSBDataUpdateCoordinator
+from .request_queue import RequestPriority
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -22,6 +26,11 @@ class PlugwiseUSBEntityDescription(EntityDescription):
     """Describes Plugwise sensor entity."""
 
     node_feature: NodeFeature
+    # Only create the entity for nodes for which this returns True
+    exists_fn: Callable[[PlugwiseUSBDataUpdateCoordinator], bool] | None = None
+    # Numeric state changes smaller than the largest deadband are not written
+    deadband_absolute: float | None = None
+    deadband_relative: float | None = None
 
 
 class PlugwiseUSBEntity(CoordinatorEntity):
@@ -38,17 +47,71 @@ class PlugwiseUSBEntity(CoordinatorEntity):
         super().__init__(node_duc, context=entity_description.node_feature)
         self.node_duc = node_duc
         self.entity_description = entity_description
-        self._node_info: NodeInfo = node_duc.node.node_info
         self._attr_unique_id = f"{self._node_info.mac}-{entity_description.key}"
         self._via_device = (DOMAIN, str(node_duc.api_stick.mac_stick))
+        self._written_state: tuple[Any, Any, bool] | None = None
+
+    @property
+    def _node_info(self) -> NodeInfo:
+        """Return the node info, from the inventory until the node is loaded."""
+        return self.node_duc.node_info
 
     @property
     def available(self) -> bool:
         """Return if entity is available."""
-        available = self.node_duc.node.available and super().available
+        available = self.node_duc.available
         _LOGGER.debug("Entity %s | available = %s", self.entity_description.key, available)
         return available
 
+    def _value_changed(self, old: Any, new: Any) -> bool:
+        """Return True when the new value differs meaningfully from the old one."""
+        if old == new:
+            return False
+        if (
+            isinstance(old, bool)
+            or isinstance(new, bool)
+            or not isinstance(old, int | float)
+            or not isinstance(new, int | float)
+            or new == 0
+        ):
+            return True
+        deadband = max(
+            self.entity_description.deadband_absolute or 0.0,
+            (self.entity_description.deadband_relative or 0.0) * abs(old),
+        )
+        return abs(new - old) >= deadband
+
+    @callback
+    def async_write_ha_state_if_changed(
+        self, value: Any, attributes: Any = None, *, force: bool = False
+    ) -> None:
+        """Write state when value, attributes or availability changed, or forced.
+
+        All state writes go through here, so the next poll is compared with the
+        state actually shown, also after a command wrote its result.
+        """
+        available = self.available
+        if (
+            not force
+            and self._written_state is not None
+            and self._written_state[1:] == (attributes, available)
+            and not self._value_changed(self._written_state[0], value)
+        ):
+            return
+        self._written_state = (value, attributes, available)
+        self.async_write_ha_state()
+
+    async def async_node_command[T](
+        self, command: Callable[..., Awaitable[T]], *args: Any
+    ) -> T:
+        """Send a user command to the node, ahead of background requests."""
+        result = await self.node_duc.request_queue.async_submit(
+            RequestPriority.INTERACTIVE, command, *args
+        )
+        # Confirm the changed state at the next poll
+        self.node_duc.async_expire_feature(self.entity_description.node_feature)
+        return result
+
     @property
     def device_info(self) -> DeviceInfo:
         """Return DeviceInfo for each created entity."""
@@ -70,6 +133,8 @@ class PlugwiseUSBEntity(CoordinatorEntity):
         await self.node_duc.subscribe_nodefeature(
                  self.entity_description.node_feature
               )
+        if self.node_duc.stale:
+            self._handle_coordinator_update()
 
     async def async_will_remove_from_hass(self):
         """Unsubscribe to updates."""
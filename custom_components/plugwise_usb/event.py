@@ -6,7 +6,7 @@ from dataclasses import dataclass
 from datetime import timedelta
 import logging
 
-from plugwise_usb.api import NodeEvent, NodeFeature
+from plugwise_usb.api import NodeFeature
 
 from homeassistant.components.event import (
     EventDeviceClass,
@@ -17,8 +17,9 @@ from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import NODES, STICK, UNSUB_NODE_LOADED
+from .const import ENTITY_DISPATCHER
 from .coordinator import PlugwiseUSBConfigEntry, PlugwiseUSBDataUpdateCoordinator
+from .dispatcher import feature_index
 from .entity import PlugwiseUSBEntity, PlugwiseUSBEntityDescription
 
 _LOGGER = logging.getLogger(__name__)
@@ -70,6 +71,8 @@ EVENT_TYPES: tuple[PlugwiseEventEntityDescription, ...] = (
     ),
 )
 
+EVENT_INDEX = feature_index(EVENT_TYPES)
+
 
 async def async_setup_entry(
     _hass: HomeAssistant,
@@ -77,48 +80,17 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the USB Event from a config entry."""
-    async def async_add_event(node_event: NodeEvent, mac: str) -> None:
-        """Initialize DUC for event."""
-        if node_event != NodeEvent.LOADED:
-            return
-        entities: list[PlugwiseUSBEntity] = []
-        if (node_duc := config_entry.runtime_data[NODES].get(mac)) is not None:
-            for entity_description in EVENT_TYPES:
-                if entity_description.node_feature not in node_duc.node.features:
-                    continue
-                entities.append(PlugwiseUSBEventEntity(node_duc, entity_description))
-                _LOGGER.debug(
-                    "Add %s event for node %s",
-                    entity_description.translation_key,
-                    node_duc.node.name,
-                )
-        if entities:
-            async_add_entities(entities)
-
-    api_stick = config_entry.runtime_data[STICK]
-
-    # Listen for loaded nodes
-    config_entry.runtime_data[Platform.EVENT] = {}
-    config_entry.runtime_data[Platform.EVENT][UNSUB_NODE_LOADED] = (
-        api_stick.subscribe_to_node_events(
-            async_add_event,
-            (NodeEvent.LOADED,),
-        )
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_add_platform(
+        Platform.EVENT, EVENT_INDEX, PlugwiseUSBEventEntity, async_add_entities
     )
 
-    # load any current nodes
-    for mac, node in api_stick.nodes.items():
-        if node.is_loaded:
-            await async_add_event(NodeEvent.LOADED, mac)
-        else:
-            _LOGGER.debug("Adding event(s) for node %s failed, not loaded", mac)
 
 async def async_unload_entry(
     _hass: HomeAssistant,
     config_entry: PlugwiseUSBConfigEntry,
 ) -> None:
     """Unload a config entry."""
-    config_entry.runtime_data[Platform.EVENT][UNSUB_NODE_LOADED]()
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_remove_platform(Platform.EVENT)
 
 
 class PlugwiseUSBEventEntity(PlugwiseUSBEntity, EventEntity):
@@ -0,0 +1,80 @@
+"""Persisted inventory of the nodes of a Plugwise USB network."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from plugwise_usb.api import NodeInfo
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, INVENTORY_SAVE_DELAY
+from .coordinator import PlugwiseUSBConfigEntry
+from .snapshot import decode_dataclass, encode_dataclass
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Changes at every node info update and is not needed to create entities
+EXCLUDED_FIELDS = ("timestamp",)
+
+
+class PlugwiseUSBInventory:
+    """Persist mac, type, features and firmware of the known nodes.
+
+    The inventory is stored next to the cache folder of the plugwise_usb
+    library. It allows to create coordinators and entities as soon as a node is
+    discovered, before the node itself is loaded.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, config_entry: PlugwiseUSBConfigEntry
+    ) -> None:
+        """Initialize the node inventory."""
+        self._store: Store[dict[str, dict[str, Any]]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.inventory.{config_entry.entry_id}"
+        )
+        self._nodes: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Load the inventory saved by the previous run."""
+        self._nodes = await self._store.async_load() or {}
+        _LOGGER.debug("Loaded inventory of %s nodes", len(self._nodes))
+
+    def node_info(self, mac: str) -> NodeInfo | None:
+        """Return the node info of a node in the inventory."""
+        if (values := self._nodes.get(mac)) is None:
+            return None
+        try:
+            return decode_dataclass(NodeInfo, values)
+        except (TypeError, ValueError) as err:
+            _LOGGER.debug("Ignore inventory of %s: %s", mac, err)
+            return None
+
+    @callback
+    def async_update(self, node_info: NodeInfo) -> bool:
+        """Store the node info of a loaded node, return True when it changed."""
+        values = encode_dataclass(node_info, exclude=EXCLUDED_FIELDS)
+        if self._nodes.get(node_info.mac) == values:
+            return False
+        _LOGGER.debug("Update inventory of %s", node_info.mac)
+        self._nodes[node_info.mac] = values
+        self._store.async_delay_save(self._data_to_save, INVENTORY_SAVE_DELAY)
+        return True
+
+    @callback
+    def async_remove(self, mac: str) -> None:
+        """Remove a node from the inventory."""
+        if self._nodes.pop(mac, None) is not None:
+            self._store.async_delay_save(self._data_to_save, INVENTORY_SAVE_DELAY)
+
+    def as_dict(self) -> dict[str, dict[str, Any]]:
+        """Return the stored node info of all known nodes."""
+        return dict(self._nodes)
+
+    def _data_to_save(self) -> dict[str, dict[str, Any]]:
+        """Return the inventory to save."""
+        return self._nodes
@@ -0,0 +1,184 @@
+"""Request latency and reliability metrics of Plugwise USB nodes."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter, deque
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+from plugwise_usb.exceptions import NodeTimeout, StickTimeout
+
+from homeassistant.util import dt as dt_util
+
+from .const import BREAKER_FAILURE_THRESHOLD, BREAKER_MAX_BACKOFF, BREAKER_MIN_BACKOFF
+
+if TYPE_CHECKING:
+    from .coordinator import PlugwiseUSBDataUpdateCoordinator
+
+POLL_DURATION_SAMPLES = 20
+# Upper bounds in seconds of the poll duration histogram buckets
+POLL_DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TIMEOUT_ERRORS = (NodeTimeout, StickTimeout)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+CIRCUIT_STATES = [CIRCUIT_CLOSED, CIRCUIT_OPEN, CIRCUIT_HALF_OPEN]
+
+
+class PlugwiseUSBNodeMetrics:
+    """Keep track of the duration and failures of the refreshes of one node.
+
+    Durations only cover the time the request spent on the link, not the time
+    waiting in the request queue.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the node metrics."""
+        self.polls = 0
+        self.total_duration = 0.0
+        self.durations: deque[float] = deque(maxlen=POLL_DURATION_SAMPLES)
+        # Count of polls per bucket, the last bucket holds the slower polls
+        self.histogram = [0] * (len(POLL_DURATION_BUCKETS) + 1)
+        self.errors: Counter[str] = Counter()
+        self.consecutive_failures = 0
+        self.last_success: datetime | None = None
+        self.last_failure: datetime | None = None
+
+    @property
+    def timeouts(self) -> int:
+        """Return the number of refreshes which timed out."""
+        return sum(self.errors[error.__name__] for error in TIMEOUT_ERRORS)
+
+    @property
+    def mean_duration(self) -> float | None:
+        """Return the mean duration in seconds of the recent polls."""
+        if not self.durations:
+            return None
+        return sum(self.durations) / len(self.durations)
+
+    def record_duration(self, duration: float) -> None:
+        """Store the duration in seconds of one poll."""
+        self.polls += 1
+        self.total_duration += duration
+        self.durations.append(duration)
+        self.histogram[bisect_left(POLL_DURATION_BUCKETS, duration)] += 1
+
+    def record_success(self) -> None:
+        """Store a successful refresh."""
+        self.consecutive_failures = 0
+        self.last_success = dt_util.utcnow()
+
+    def reset_failures(self) -> None:
+        """Restart counting failures in a row, the node responded to a push."""
+        self.consecutive_failures = 0
+
+    def record_failure(self, error: str) -> None:
+        """Store a failed refresh, by the name of its error."""
+        self.errors[error] += 1
+        self.consecutive_failures += 1
+        self.last_failure = dt_util.utcnow()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the summary of the metrics."""
+        mean_duration = self.mean_duration
+        return {
+            "polls": self.polls,
+            "total_duration": round(self.total_duration, 3),
+            "mean_duration": None if mean_duration is None else round(mean_duration, 3),
+            "histogram": {
+                f"le_{bound}": polls
+                for bound, polls in zip(
+                    (*POLL_DURATION_BUCKETS, "inf"), self.histogram, strict=True
+                )
+            },
+            "timeouts": self.timeouts,
+            "errors": dict(self.errors),
+            "consecutive_failures": self.consecutive_failures,
+            "last_success": self.last_success,
+            "last_failure": self.last_failure,
+        }
+
+
+class PlugwiseUSBCircuitBreaker:
+    """Back off from polling a node which stopped responding.
+
+    After a number of consecutive failed polls the circuit opens and the node
+    is only probed once its backoff expired, half open. Every failed probe
+    doubles the backoff. A successful poll or any frame pushed by the node
+    closes the circuit again.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a closed circuit breaker."""
+        self.failures = 0
+        self.backoff: float | None = None
+        self.retry_at: datetime | None = None
+        self.opened: datetime | None = None
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        """Return closed, open or half open once the next probe is due."""
+        if self.retry_at is None:
+            return CIRCUIT_CLOSED
+        if dt_util.utcnow() < self.retry_at:
+            return CIRCUIT_OPEN
+        return CIRCUIT_HALF_OPEN
+
+    @property
+    def allow_poll(self) -> bool:
+        """Return True unless the node is backed off."""
+        return self.state != CIRCUIT_OPEN
+
+    def record_failure(self) -> float | None:
+        """Count a failed poll, return the backoff in seconds when open."""
+        self.failures += 1
+        if self.failures < BREAKER_FAILURE_THRESHOLD:
+            return None
+        if self.retry_at is None:
+            self.trips += 1
+            self.opened = dt_util.utcnow()
+        exponent = min(self.failures - BREAKER_FAILURE_THRESHOLD, 10)
+        self.backoff = float(
+            min(BREAKER_MIN_BACKOFF * 2**exponent, BREAKER_MAX_BACKOFF)
+        )
+        self.retry_at = dt_util.utcnow() + timedelta(seconds=self.backoff)
+        return self.backoff
+
+    def record_success(self) -> bool:
+        """Close the circuit, return True when it was not closed."""
+        tripped = self.retry_at is not None
+        self.failures = 0
+        self.backoff = None
+        self.retry_at = None
+        self.opened = None
+        return tripped
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state of the circuit breaker."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "backoff": self.backoff,
+            "opened": self.opened,
+            "retry_at": self.retry_at,
+            "trips": self.trips,
+        }
+
+
+def metrics_summary(
+    coordinators: Iterable[PlugwiseUSBDataUpdateCoordinator],
+) -> dict[str, dict[str, Any]]:
+    """Return the metrics of all nodes, the most link time consuming first."""
+    ranked = sorted(
+        coordinators,
+        key=lambda coordinator: coordinator.metrics.total_duration,
+        reverse=True,
+    )
+    return {
+        coordinator.node.mac: coordinator.metrics.as_dict() for coordinator in ranked
+    }
@@ -6,7 +6,7 @@ from dataclasses import dataclass
 from datetime import timedelta
 import logging
 
-from plugwise_usb.api import NodeEvent, NodeFeature
+from plugwise_usb.api import NodeFeature
 
 from homeassistant.components.number import (
     NumberDeviceClass,
@@ -23,8 +23,9 @@ from homeassistant.const import (
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import NODES, STICK, UNSUB_NODE_LOADED
+from .const import ENTITY_DISPATCHER
 from .coordinator import PlugwiseUSBConfigEntry, PlugwiseUSBDataUpdateCoordinator
+from .dispatcher import feature_index
 from .entity import PlugwiseUSBEntity, PlugwiseUSBEntityDescription
 
 _LOGGER = logging.getLogger(__name__)
@@ -171,6 +172,8 @@ NUMBER_TYPES: tuple[PlugwiseNumberEntityDescription, ...] = (
     ),
 )
 
+NUMBER_INDEX = feature_index(NUMBER_TYPES)
+
 
 async def async_setup_entry(
     _hass: HomeAssistant,
@@ -178,49 +181,17 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the USB Number from a config entry."""
-
-    async def async_add_number(node_event: NodeEvent, mac: str) -> None:
-        """Initialize DUC for number."""
-        if node_event != NodeEvent.LOADED:
-            return
-        entities: list[PlugwiseUSBEntity] = []
-        if (node_duc := config_entry.runtime_data[NODES].get(mac)) is not None:
-            for entity_description in NUMBER_TYPES:
-                if entity_description.node_feature not in node_duc.node.features:
-                    continue
-                entities.append(PlugwiseUSBNumberEntity(node_duc, entity_description))
-                _LOGGER.debug(
-                    "Add %s number for node %s",
-                    entity_description.translation_key,
-                    node_duc.node.name,
-                )
-        if entities:
-            async_add_entities(entities)
-
-    api_stick = config_entry.runtime_data[STICK]
-
-    # Listen for loaded nodes
-    config_entry.runtime_data[Platform.NUMBER] = {}
-    config_entry.runtime_data[Platform.NUMBER][UNSUB_NODE_LOADED] = (
-        api_stick.subscribe_to_node_events(
-            async_add_number,
-            (NodeEvent.LOADED,),
-        )
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_add_platform(
+        Platform.NUMBER, NUMBER_INDEX, PlugwiseUSBNumberEntity, async_add_entities
     )
 
-    # load any current nodes
-    for mac, node in api_stick.nodes.items():
-        if node.is_loaded:
-            await async_add_number(NodeEvent.LOADED, mac)
-        else:
-            _LOGGER.debug("Adding number(s) for node %s failed, not loaded", mac)
 
 async def async_unload_entry(
     _hass: HomeAssistant,
     config_entry: PlugwiseUSBConfigEntry,
 ) -> None:
     """Unload a config entry."""
-    config_entry.runtime_data[Platform.NUMBER][UNSUB_NODE_LOADED]()
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_remove_platform(Platform.NUMBER)
 
 
 class PlugwiseUSBNumberEntity(PlugwiseUSBEntity, NumberEntity):
@@ -258,12 +229,12 @@ class PlugwiseUSBNumberEntity(PlugwiseUSBEntity, NumberEntity):
             self.coordinator.data[self.entity_description.node_feature],
             self.entity_description.key,
         )
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed(self._attr_native_value)
 
     async def async_set_native_value(self, value: float) -> None:
         """Update the current value."""
         if self.entity_description.async_number_type == "float":
-            await self.async_number_fn(float(value))
+            await self.async_node_command(self.async_number_fn, float(value))
         else:
-            await self.async_number_fn(int(value))
-        self.async_write_ha_state()
+            await self.async_node_command(self.async_number_fn, int(value))
+        self.async_write_ha_state_if_changed(self._attr_native_value, force=True)
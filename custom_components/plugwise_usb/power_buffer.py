@@ -0,0 +1,139 @@
+"""Rolling power statistics of Plugwise USB nodes."""
+
+from __future__ import annotations
+
+from array import array
+from collections import deque
+from collections.abc import Callable
+from operator import ge, le
+from typing import Any
+
+from plugwise_usb.api import PowerStatistics
+
+from .const import POWER_BUFFER_SIZE
+
+
+class PlugwiseUSBPowerBuffer:
+    """Keep the recent power samples of a node in a fixed size ring buffer.
+
+    Samples are stored in preallocated arrays and expire once older than the
+    window, or when the buffer is full. The sum of the 8 second averages and
+    the candidates for their minimum and maximum, and for the peak of the one
+    second values, are updated as samples are added and expire. Every
+    statistic is therefore O(1) per sample, amortized for the extremes.
+    """
+
+    def __init__(self, window: float, size: int = POWER_BUFFER_SIZE) -> None:
+        """Initialize an empty buffer, window in seconds."""
+        self.window = window
+        self._size = size
+        self._times = array("d", bytes(8 * size))
+        self._averages = array("d", bytes(8 * size))
+        self._seconds = array("d", bytes(8 * size))
+        # Sequence numbers of the oldest and of the next sample
+        self._first = 0
+        self._next = 0
+        self._sum = 0.0
+        # Sequence numbers of the samples which may become the extreme
+        self._min: deque[int] = deque()
+        self._max: deque[int] = deque()
+        self._peak: deque[int] = deque()
+
+    def __len__(self) -> int:
+        """Return the number of samples within the window."""
+        return self._next - self._first
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of the 8 second averages."""
+        if not len(self):
+            return None
+        return self._sum / len(self)
+
+    @property
+    def minimum(self) -> float | None:
+        """Return the lowest 8 second average."""
+        return self._value(self._averages, self._min)
+
+    @property
+    def maximum(self) -> float | None:
+        """Return the highest 8 second average."""
+        return self._value(self._averages, self._max)
+
+    @property
+    def peak(self) -> float | None:
+        """Return the highest one second value."""
+        return self._value(self._seconds, self._peak)
+
+    def _value(self, values: array[float], candidates: deque[int]) -> float | None:
+        """Return the value of the first candidate."""
+        if not candidates:
+            return None
+        return values[candidates[0] % self._size]
+
+    def add(self, power: PowerStatistics) -> bool:
+        """Add a power sample, return False for a sample without new values."""
+        if (
+            power.timestamp is None
+            or power.last_second is None
+            or power.last_8_seconds is None
+        ):
+            return False
+        time = power.timestamp.timestamp()
+        if len(self) and time <= self._times[(self._next - 1) % self._size]:
+            return False
+        if len(self) == self._size:
+            self._expire_oldest()
+        sequence = self._next
+        index = sequence % self._size
+        self._times[index] = time
+        self._averages[index] = power.last_8_seconds
+        self._seconds[index] = power.last_second
+        self._sum += power.last_8_seconds
+        self._push(self._min, self._averages, sequence, ge)
+        self._push(self._max, self._averages, sequence, le)
+        self._push(self._peak, self._seconds, sequence, le)
+        self._next += 1
+        self.expire(time)
+        return True
+
+    def _push(
+        self,
+        candidates: deque[int],
+        values: array[float],
+        sequence: int,
+        superseded: Callable[[float, float], bool],
+    ) -> None:
+        """Add a candidate, dropping the older ones it supersedes."""
+        value = values[sequence % self._size]
+        while candidates and superseded(values[candidates[-1] % self._size], value):
+            candidates.pop()
+        candidates.append(sequence)
+
+    def expire(self, time: float) -> None:
+        """Drop the samples which are out of the window at time."""
+        while len(self) and self._times[self._first % self._size] <= time - self.window:
+            self._expire_oldest()
+
+    def _expire_oldest(self) -> None:
+        """Drop the oldest sample."""
+        sequence = self._first
+        self._sum -= self._averages[sequence % self._size]
+        for candidates in (self._min, self._max, self._peak):
+            if candidates and candidates[0] == sequence:
+                candidates.popleft()
+        self._first += 1
+        if not len(self):
+            # Do not carry rounding errors over to the next samples
+            self._sum = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics of the buffer."""
+        return {
+            "window": self.window,
+            "samples": len(self),
+            "mean": self.mean,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "peak": self.peak,
+        }
@@ -0,0 +1,159 @@
+"""Priority lane for requests sent through the Plugwise USB-Stick."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+from enum import IntEnum
+import heapq
+from itertools import count
+import logging
+from time import monotonic
+from typing import Any
+
+from plugwise_usb.exceptions import NodeError, NodeTimeout, StickError, StickTimeout
+
+from .telemetry import PlugwiseUSBLinkTelemetry
+
+_LOGGER = logging.getLogger(__name__)
+
+LATENCY_SAMPLES = 20
+
+
+def _mean(samples: deque[float]) -> float | None:
+    """Return the rounded mean of the samples, if any."""
+    if not samples:
+        return None
+    return round(sum(samples) / len(samples), 3)
+
+
+class RequestPriority(IntEnum):
+    """Priority of a request, lower values are handled first."""
+
+    INTERACTIVE = 0  # commands of users, like switching a relay
+    POLL = 1  # periodic state refreshes
+    BACKGROUND = 2  # work that may be delayed, like collecting energy logs
+
+
+class PlugwiseUSBRequestQueue:
+    """Order the requests of the integration by priority.
+
+    Interactive requests are started right away, and while any of them is
+    running no new poll or background request is started. Poll and background
+    requests are limited to max_in_flight at once, polls first.
+    """
+
+    def __init__(self, max_in_flight: int = 1) -> None:
+        """Initialize the request queue."""
+        self.max_in_flight = max_in_flight
+        self._waiting: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = count()
+        self._in_flight = 0
+        self._interactive = 0
+        self.wait_time: dict[RequestPriority, deque[float]] = {
+            priority: deque(maxlen=LATENCY_SAMPLES) for priority in RequestPriority
+        }
+        self.relay_latency: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.telemetry = PlugwiseUSBLinkTelemetry()
+
+    @property
+    def depth(self) -> int:
+        """Number of requests waiting to be started."""
+        return sum(1 for *_, waiter in self._waiting if not waiter.done())
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests currently running."""
+        return self._in_flight + self._interactive
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the summary of the queue."""
+        return {
+            "max_in_flight": self.max_in_flight,
+            "depth": self.depth,
+            "in_flight": self.in_flight,
+            "mean_wait_time": {
+                priority.name.lower(): _mean(wait_time)
+                for priority, wait_time in self.wait_time.items()
+            },
+            "mean_relay_latency": _mean(self.relay_latency),
+            "telemetry": self.telemetry.as_dict(),
+        }
+
+    async def async_submit[T](
+        self,
+        priority: RequestPriority,
+        request: Callable[..., Awaitable[T]],
+        *args: Any,
+    ) -> T:
+        """Run request(*args) once its priority allows it."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        if priority is RequestPriority.INTERACTIVE:
+            self._interactive += 1
+            self.wait_time[priority].append(0.0)
+            try:
+                return await self._async_run(request, *args)
+            finally:
+                self._interactive -= 1
+                self._start_waiting()
+
+        await self._async_acquire(priority)
+        self.wait_time[priority].append(loop.time() - start)
+        try:
+            return await self._async_run(request, *args)
+        finally:
+            self._in_flight -= 1
+            self._start_waiting()
+
+    async def _async_run[T](
+        self, request: Callable[..., Awaitable[T]], *args: Any
+    ) -> T:
+        """Run request(*args), recording its outcome in the link telemetry."""
+        self.telemetry.record_sent()
+        start = monotonic()
+        try:
+            result = await request(*args)
+        except (NodeTimeout, StickTimeout):
+            self.telemetry.record_failure(timeout=True)
+            raise
+        except (NodeError, StickError):
+            self.telemetry.record_failure(timeout=False)
+            raise
+        self.telemetry.record_response(monotonic() - start)
+        return result
+
+    def record_relay_latency(self, latency: float) -> None:
+        """Store the time in seconds a relay command took to complete."""
+        self.relay_latency.append(latency)
+        _LOGGER.debug("Relay command completed in %.3f seconds", latency)
+
+    async def _async_acquire(self, priority: RequestPriority) -> None:
+        """Wait until a poll or background request may be started."""
+        if not self._waiting and self._can_start():
+            self._in_flight += 1
+            return
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was granted just before cancellation, hand it over
+                self._in_flight -= 1
+                self._start_waiting()
+            raise
+
+    def _can_start(self) -> bool:
+        """Return True when a poll or background request may be started."""
+        return self._interactive == 0 and self._in_flight < self.max_in_flight
+
+    def _start_waiting(self) -> None:
+        """Start waiting requests in order of priority while allowed."""
+        while self._waiting and self._can_start():
+            *_, waiter = heapq.heappop(self._waiting)
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
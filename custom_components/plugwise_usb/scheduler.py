@@ -0,0 +1,271 @@
+"""Stick-wide poll scheduler for Plugwise USB node coordinators."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from datetime import timedelta
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .coordinator import (
+    PlugwiseUSBConfigEntry,
+    PlugwiseUSBDataUpdateCoordinator,
+    PlugwiseUSBNetworkCoordinator,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PlugwiseUSBPollScheduler:
+    """Drive the refresh of all node coordinators sharing one USB-Stick.
+
+    Instead of one timer per node, a single loop picks the coordinator that is
+    due first. Consecutive polls are spaced so the polls of all nodes are spread
+    evenly over their interval, without exceeding the request budget of the Stick.
+    Each coordinator may adapt its own interval between the configured limits.
+
+    When a network coordinator is set, the due nodes are refreshed together in
+    network sweeps instead. Nodes due soon are taken along in the same sweep, so
+    nodes with similar intervals stay together. The requests of a sweep are only
+    limited by the number in flight, not spaced.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry: PlugwiseUSBConfigEntry,
+        poll_interval: timedelta,
+        poll_rate: float,
+        *,
+        min_poll_interval: timedelta | None = None,
+        max_poll_interval: timedelta | None = None,
+    ) -> None:
+        """Initialize the poll scheduler."""
+        self._hass = hass
+        self._config_entry = config_entry
+        self._poll_interval = poll_interval
+        self._poll_rate = poll_rate
+        self._min_poll_interval = min_poll_interval or poll_interval
+        self._max_poll_interval = max_poll_interval or poll_interval
+        self._coordinators: dict[str, PlugwiseUSBDataUpdateCoordinator] = {}
+        self._due: dict[str, float] = {}
+        self._last_poll: float = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._network_coordinator: PlugwiseUSBNetworkCoordinator | None = None
+        self.last_sweep_duration: float | None = None
+
+    @property
+    def poll_interval(self) -> timedelta:
+        """Default interval between two refreshes of the same node."""
+        return self._poll_interval
+
+    @property
+    def poll_rate(self) -> float:
+        """Maximum number of node refreshes per second."""
+        return self._poll_rate
+
+    @property
+    def coordinators(self) -> dict[str, PlugwiseUSBDataUpdateCoordinator]:
+        """Coordinators driven by this scheduler, indexed by mac."""
+        return self._coordinators
+
+    @property
+    def network_coordinator(self) -> PlugwiseUSBNetworkCoordinator | None:
+        """Network coordinator refreshing all nodes at once, if enabled."""
+        return self._network_coordinator
+
+    @callback
+    def async_set_network_coordinator(
+        self, network_coordinator: PlugwiseUSBNetworkCoordinator
+    ) -> None:
+        """Refresh all nodes by sweeps of the network coordinator."""
+        self._network_coordinator = network_coordinator
+        self._wakeup.set()
+
+    @callback
+    def async_update_settings(
+        self,
+        poll_interval: timedelta,
+        poll_rate: float,
+        min_poll_interval: timedelta | None = None,
+        max_poll_interval: timedelta | None = None,
+    ) -> None:
+        """Apply new poll settings without restarting the scheduler."""
+        self._poll_interval = poll_interval
+        self._poll_rate = poll_rate
+        self._min_poll_interval = min_poll_interval or poll_interval
+        self._max_poll_interval = max_poll_interval or poll_interval
+        for coordinator in self._coordinators.values():
+            coordinator.async_set_poll_limits(
+                poll_interval, self._min_poll_interval, self._max_poll_interval
+            )
+        self._wakeup.set()
+
+    @callback
+    def async_add_coordinator(self, coordinator: PlugwiseUSBDataUpdateCoordinator) -> None:
+        """Start scheduling the refresh of a node coordinator."""
+        mac = coordinator.node.mac
+        coordinator.async_set_poll_limits(
+            self._poll_interval, self._min_poll_interval, self._max_poll_interval
+        )
+        if self._network_coordinator is not None:
+            self._network_coordinator.node_coordinators[mac] = coordinator
+        self._coordinators[mac] = coordinator
+        self._due[mac] = self._hass.loop.time()
+        self._wakeup.set()
+
+    @callback
+    def async_remove_coordinator(self, mac: str) -> None:
+        """Stop scheduling the refresh of a node coordinator."""
+        self._coordinators.pop(mac, None)
+        self._due.pop(mac, None)
+        if self._network_coordinator is not None:
+            self._network_coordinator.node_coordinators.pop(mac, None)
+
+    @callback
+    def async_reschedule(self, mac: str, delay: float = 0.0) -> None:
+        """Move the next refresh of a node forward to now + delay seconds."""
+        if mac not in self._due:
+            return
+        self._due[mac] = min(self._due[mac], self._hass.loop.time() + delay)
+        self._wakeup.set()
+
+    @callback
+    def async_start(self) -> None:
+        """Start the scheduler loop as a background task of the config entry."""
+        if self._task is not None:
+            return
+        self._task = self._config_entry.async_create_background_task(
+            self._hass, self._async_run(), "plugwise_usb_poll_scheduler"
+        )
+
+    async def async_stop(self) -> None:
+        """Stop the scheduler loop."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the summary of the schedule."""
+        now = self._hass.loop.time()
+        return {
+            "mode": "network" if self._network_coordinator is not None else "node",
+            "running": self._task is not None and not self._task.done(),
+            "poll_interval": self._poll_interval.total_seconds(),
+            "min_poll_interval": self._min_poll_interval.total_seconds(),
+            "max_poll_interval": self._max_poll_interval.total_seconds(),
+            "poll_rate": self._poll_rate,
+            "spacing": round(self._spacing(), 3),
+            "last_sweep_duration": self.last_sweep_duration,
+            "due_in": {
+                mac: round(due - now, 1) for mac, due in sorted(self._due.items())
+            },
+        }
+
+    def _spacing(self) -> float:
+        """Return the minimal time in seconds between two consecutive polls."""
+        # Backed off nodes are left out, they are hardly ever polled
+        polls_per_second = sum(
+            1 / coordinator.poll_interval.total_seconds()
+            for coordinator in self._coordinators.values()
+            if coordinator.breaker.backoff is None
+        )
+        min_spacing = 1 / self._poll_rate
+        if polls_per_second == 0:
+            return min_spacing
+        return max(min_spacing, 1 / polls_per_second)
+
+    def _next_due(self) -> tuple[str | None, float]:
+        """Return mac and due time of the coordinator to refresh next."""
+        if not self._due:
+            return None, 0.0
+        mac = min(self._due, key=self._due.__getitem__)
+        return mac, self._due[mac]
+
+    async def _async_wait(self, delay: float | None) -> None:
+        """Sleep until delay expired or the schedule changed."""
+        self._wakeup.clear()
+        try:
+            async with asyncio.timeout(delay):
+                await self._wakeup.wait()
+        except TimeoutError:
+            pass
+
+    async def _async_run(self) -> None:
+        """Refresh the coordinators in order of due time."""
+        if self._network_coordinator is not None:
+            await self._async_run_sweeps(self._network_coordinator)
+            return
+        while True:
+            mac, due = self._next_due()
+            if mac is None:
+                await self._async_wait(None)
+                continue
+            now = self._hass.loop.time()
+            start = max(due, self._last_poll + self._spacing())
+            if start > now:
+                await self._async_wait(start - now)
+                continue
+
+            coordinator = self._coordinators[mac]
+            if not coordinator.node.is_loaded or not coordinator.polled_features:
+                # Node not loaded or no entity depends on it (yet), check again shortly
+                self._due[mac] = now + self._spacing()
+                continue
+            self._due[mac] = now + coordinator.poll_interval.total_seconds()
+            self._last_poll = now
+            _LOGGER.debug("Scheduled refresh of %s", mac)
+            await coordinator.async_refresh()
+            if (backoff := coordinator.breaker.backoff) is not None:
+                # Unreachable node, only probe it again after its backoff
+                self._due[mac] = self._hass.loop.time() + backoff
+
+    async def _async_run_sweeps(
+        self, network_coordinator: PlugwiseUSBNetworkCoordinator
+    ) -> None:
+        """Refresh the due nodes together with network sweeps."""
+        while True:
+            mac, due = self._next_due()
+            if mac is None:
+                await self._async_wait(None)
+                continue
+            now = self._hass.loop.time()
+            if due > now:
+                await self._async_wait(due - now)
+                continue
+
+            # Nodes due within half the shortest interval join the sweep
+            horizon = now + self._min_poll_interval.total_seconds() / 2
+            sweep: set[str] = set()
+            for mac, due in self._due.items():
+                coordinator = self._coordinators[mac]
+                if not coordinator.node.is_loaded or not coordinator.polled_features:
+                    if due <= now:
+                        self._due[mac] = now + 1 / self._poll_rate
+                    continue
+                if due <= horizon:
+                    sweep.add(mac)
+            if not any(self._due[mac] <= now for mac in sweep):
+                continue
+            for mac in sweep:
+                interval = self._coordinators[mac].poll_interval.total_seconds()
+                self._due[mac] = now + interval
+
+            _LOGGER.debug("Start network sweep of %s nodes", len(sweep))
+            await network_coordinator.async_sweep(sweep)
+            elapsed = self._hass.loop.time() - now
+            self.last_sweep_duration = elapsed
+            _LOGGER.debug("Network sweep finished in %.2f seconds", elapsed)
+            for mac in sweep:
+                if (coordinator := self._coordinators.get(mac)) is None:
+                    continue
+                if (backoff := coordinator.breaker.backoff) is not None:
+                    # Unreachable node, only probe it again after its backoff
+                    self._due[mac] = self._hass.loop.time() + backoff
@@ -7,15 +7,16 @@ from datetime import timedelta
 from enum import Enum
 import logging
 
-from plugwise_usb.api import MotionSensitivity, NodeEvent, NodeFeature
+from plugwise_usb.api import MotionSensitivity, NodeFeature
 
 from homeassistant.components.select import SelectEntity, SelectEntityDescription
 from homeassistant.const import EntityCategory, Platform
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import NODES, STICK, UNSUB_NODE_LOADED
+from .const import ENTITY_DISPATCHER
 from .coordinator import PlugwiseUSBConfigEntry, PlugwiseUSBDataUpdateCoordinator
+from .dispatcher import feature_index
 from .entity import PlugwiseUSBEntity, PlugwiseUSBEntityDescription
 
 _LOGGER = logging.getLogger(__name__)
@@ -43,6 +44,8 @@ SELECT_TYPES: tuple[PlugwiseSelectEntityDescription, ...] = (
     ),
 )
 
+SELECT_INDEX = feature_index(SELECT_TYPES)
+
 
 async def async_setup_entry(
     _hass: HomeAssistant,
@@ -50,49 +53,17 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the USB selects from a config entry."""
-
-    async def async_add_select(node_event: NodeEvent, mac: str) -> None:
-        """Initialize DUC for select."""
-        if node_event != NodeEvent.LOADED:
-            return
-        entities: list[PlugwiseUSBEntity] = []
-        if (node_duc := config_entry.runtime_data[NODES].get(mac)) is not None:
-            for entity_description in SELECT_TYPES:
-                if entity_description.node_feature not in node_duc.node.features:
-                    continue
-                entities.append(PlugwiseUSBSelectEntity(node_duc, entity_description))
-                _LOGGER.debug(
-                    "Add %s select for node %s",
-                    entity_description.translation_key,
-                    node_duc.node.name,
-                )
-        if entities:
-            async_add_entities(entities)
-
-    api_stick = config_entry.runtime_data[STICK]
-
-    # Listen for loaded nodes
-    config_entry.runtime_data[Platform.SELECT] = {}
-    config_entry.runtime_data[Platform.SELECT][UNSUB_NODE_LOADED] = (
-        api_stick.subscribe_to_node_events(
-            async_add_select,
-            (NodeEvent.LOADED,),
-        )
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_add_platform(
+        Platform.SELECT, SELECT_INDEX, PlugwiseUSBSelectEntity, async_add_entities
     )
 
-    # load any current nodes
-    for mac, node in api_stick.nodes.items():
-        if node.is_loaded:
-            await async_add_select(NodeEvent.LOADED, mac)
-        else:
-            _LOGGER.debug("Adding select(s) for node %s failed, not loaded", mac)
 
 async def async_unload_entry(
     _hass: HomeAssistant,
     config_entry: PlugwiseUSBConfigEntry,
 ) -> None:
     """Unload a config entry."""
-    config_entry.runtime_data[Platform.SELECT][UNSUB_NODE_LOADED]()
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_remove_platform(Platform.SELECT)
 
 
 class PlugwiseUSBSelectEntity(PlugwiseUSBEntity, SelectEntity):
@@ -109,6 +80,8 @@ class PlugwiseUSBSelectEntity(PlugwiseUSBEntity, SelectEntity):
             node_duc.node, entity_description.async_select_fn
         )
         self._attr_options = [o.name.lower() for o in entity_description.options_enum]
+        # Entities may be added before the first state of the node is known
+        self._attr_current_option = None
 
     @callback
     def _handle_coordinator_update(self) -> None:
@@ -132,7 +105,7 @@ class PlugwiseUSBSelectEntity(PlugwiseUSBEntity, SelectEntity):
             self.entity_description.key,
         )
         self._attr_current_option = current_option.name.lower()
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed(self._attr_current_option)
 
     async def async_select_option(self, option: str) -> None:
         """Change to the selected entity option."""
@@ -140,6 +113,6 @@ class PlugwiseUSBSelectEntity(PlugwiseUSBEntity, SelectEntity):
         if normalized not in self._attr_options:
             raise ValueError(f"Unsupported option: {option}")
         value = self.entity_description.options_enum[normalized.upper()]
-        await self.async_select_fn(value)
+        await self.async_node_command(self.async_select_fn, value)
         self._attr_current_option = normalized
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed(self._attr_current_option, force=True)
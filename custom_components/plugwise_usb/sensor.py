@@ -2,11 +2,13 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable
 from dataclasses import dataclass
 from datetime import timedelta
 import logging
+from typing import Any
 
-from plugwise_usb.api import NodeEvent, NodeFeature
+from plugwise_usb.api import NodeFeature
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -25,11 +27,15 @@ from homeassistant.const import (
     UnitOfTime,
 )
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import NODES, STICK, UNSUB_NODE_LOADED
-from .coordinator import PlugwiseUSBConfigEntry
+from .const import DOMAIN, ENTITY_DISPATCHER, REQUEST_QUEUE, STICK
+from .coordinator import PlugwiseUSBConfigEntry, PlugwiseUSBDataUpdateCoordinator
+from .dispatcher import feature_index
 from .entity import PlugwiseUSBEntity, PlugwiseUSBEntityDescription
+from .metrics import CIRCUIT_STATES
+from .request_queue import PlugwiseUSBRequestQueue
 
 _LOGGER = logging.getLogger(__name__)
 PARALLEL_UPDATES = 2
@@ -42,6 +48,27 @@ class PlugwiseSensorEntityDescription(
 ):
     """Describes Plugwise sensor entity."""
 
+    # Value taken from the coordinator instead of the state of the node feature
+    value_fn: Callable[[PlugwiseUSBDataUpdateCoordinator], Any] | None = None
+
+
+def _is_polled(node_duc: PlugwiseUSBDataUpdateCoordinator) -> bool:
+    """Return True for nodes which are refreshed by polling."""
+    return not node_duc.node_info.is_battery_powered
+
+
+def _power_statistic(
+    name: str,
+) -> Callable[[PlugwiseUSBDataUpdateCoordinator], float | None]:
+    """Return the value function of a rolling power statistic."""
+
+    def _value(node_duc: PlugwiseUSBDataUpdateCoordinator) -> float | None:
+        if node_duc.power_buffer is None:
+            return None
+        return getattr(node_duc.power_buffer, name)
+
+    return _value
+
 
 SENSOR_TYPES: tuple[PlugwiseSensorEntityDescription, ...] = (
     PlugwiseSensorEntityDescription(
@@ -52,6 +79,8 @@ SENSOR_TYPES: tuple[PlugwiseSensorEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfPower.WATT,
         suggested_display_precision=2,
         node_feature=NodeFeature.POWER,
+        deadband_absolute=1.0,
+        deadband_relative=0.01,
     ),
     PlugwiseSensorEntityDescription(
         key="last_8_seconds",
@@ -61,6 +90,60 @@ SENSOR_TYPES: tuple[PlugwiseSensorEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfPower.WATT,
         suggested_display_precision=2,
         node_feature=NodeFeature.POWER,
+        deadband_absolute=1.0,
+        deadband_relative=0.01,
+        entity_registry_enabled_default=False,
+    ),
+    PlugwiseSensorEntityDescription(
+        key="power_mean",
+        translation_key="power_mean",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=2,
+        node_feature=NodeFeature.POWER,
+        value_fn=_power_statistic("mean"),
+        deadband_absolute=1.0,
+        deadband_relative=0.01,
+        entity_registry_enabled_default=False,
+    ),
+    PlugwiseSensorEntityDescription(
+        key="power_minimum",
+        translation_key="power_minimum",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=2,
+        node_feature=NodeFeature.POWER,
+        value_fn=_power_statistic("minimum"),
+        deadband_absolute=1.0,
+        deadband_relative=0.01,
+        entity_registry_enabled_default=False,
+    ),
+    PlugwiseSensorEntityDescription(
+        key="power_maximum",
+        translation_key="power_maximum",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=2,
+        node_feature=NodeFeature.POWER,
+        value_fn=_power_statistic("maximum"),
+        deadband_absolute=1.0,
+        deadband_relative=0.01,
+        entity_registry_enabled_default=False,
+    ),
+    PlugwiseSensorEntityDescription(
+        key="power_peak",
+        translation_key="power_peak",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=2,
+        node_feature=NodeFeature.POWER,
+        value_fn=_power_statistic("peak"),
+        deadband_absolute=1.0,
+        deadband_relative=0.01,
         entity_registry_enabled_default=False,
     ),
     PlugwiseSensorEntityDescription(
@@ -160,6 +243,132 @@ SENSOR_TYPES: tuple[PlugwiseSensorEntityDescription, ...] = (
         entity_registry_enabled_default=False,
         entity_category=EntityCategory.DIAGNOSTIC,
     ),
+    PlugwiseSensorEntityDescription(
+        key="poll_duration",
+        translation_key="poll_duration",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        suggested_display_precision=3,
+        node_feature=NodeFeature.AVAILABLE,
+        exists_fn=_is_polled,
+        value_fn=lambda node_duc: node_duc.metrics.mean_duration,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    PlugwiseSensorEntityDescription(
+        key="poll_timeouts",
+        translation_key="poll_timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        node_feature=NodeFeature.AVAILABLE,
+        exists_fn=_is_polled,
+        value_fn=lambda node_duc: node_duc.metrics.timeouts,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    PlugwiseSensorEntityDescription(
+        key="poll_consecutive_failures",
+        translation_key="poll_consecutive_failures",
+        state_class=SensorStateClass.MEASUREMENT,
+        node_feature=NodeFeature.AVAILABLE,
+        exists_fn=_is_polled,
+        value_fn=lambda node_duc: node_duc.metrics.consecutive_failures,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    PlugwiseSensorEntityDescription(
+        key="poll_last_success",
+        translation_key="poll_last_success",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        node_feature=NodeFeature.AVAILABLE,
+        exists_fn=_is_polled,
+        value_fn=lambda node_duc: node_duc.metrics.last_success,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    PlugwiseSensorEntityDescription(
+        key="poll_circuit",
+        translation_key="poll_circuit",
+        device_class=SensorDeviceClass.ENUM,
+        options=CIRCUIT_STATES,
+        node_feature=NodeFeature.AVAILABLE,
+        exists_fn=_is_polled,
+        value_fn=lambda node_duc: node_duc.breaker.state,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+)
+
+SENSOR_INDEX = feature_index(SENSOR_TYPES)
+
+
+@dataclass(kw_only=True)
+class PlugwiseStickSensorEntityDescription(SensorEntityDescription):
+    """Describes Plugwise USB-Stick sensor entity."""
+
+    value_fn: Callable[[PlugwiseUSBRequestQueue], float | int | None]
+
+
+STICK_SENSOR_TYPES: tuple[PlugwiseStickSensorEntityDescription, ...] = (
+    PlugwiseStickSensorEntityDescription(
+        key="requests_sent",
+        translation_key="stick_requests_sent",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement="requests/s",
+        suggested_display_precision=2,
+        value_fn=lambda queue: queue.telemetry.sent_rate,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    PlugwiseStickSensorEntityDescription(
+        key="responses_received",
+        translation_key="stick_responses_received",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement="responses/s",
+        suggested_display_precision=2,
+        value_fn=lambda queue: queue.telemetry.received_rate,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    PlugwiseStickSensorEntityDescription(
+        key="queue_depth",
+        translation_key="stick_queue_depth",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda queue: queue.depth,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    PlugwiseStickSensorEntityDescription(
+        key="in_flight",
+        translation_key="stick_in_flight",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda queue: queue.in_flight,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    PlugwiseStickSensorEntityDescription(
+        key="failure_rate",
+        translation_key="stick_failure_rate",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        suggested_display_precision=1,
+        value_fn=lambda queue: queue.telemetry.failure_rate,
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    PlugwiseStickSensorEntityDescription(
+        key="mean_rtt",
+        translation_key="stick_mean_rtt",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        value_fn=lambda queue: (
+            None if (rtt := queue.telemetry.mean_rtt) is None else rtt * 1000
+        ),
+        entity_registry_enabled_default=False,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
 )
 
 
@@ -169,57 +378,44 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Plugwise USB sensor based on config_entry."""
-
-    async def async_add_sensor(node_event: NodeEvent, mac: str) -> None:
-        """Initialize DUC for sensor."""
-        if node_event != NodeEvent.LOADED:
-            return
-        entities: list[PlugwiseUSBEntity] = []
-        if (node_duc := config_entry.runtime_data[NODES].get(mac)) is not None:
-            for entity_description in SENSOR_TYPES:
-                if entity_description.node_feature not in node_duc.node.features:
-                    continue
-                entities.append(PlugwiseUSBSensorEntity(node_duc, entity_description))
-                _LOGGER.debug(
-                    "Add %s sensor for node %s",
-                    entity_description.translation_key,
-                    node_duc.node.name,
-                )
-        if entities:
-            async_add_entities(entities)
-
-    api_stick = config_entry.runtime_data[STICK]
-
-    # Listen for loaded nodes
-    config_entry.runtime_data[Platform.SENSOR] = {}
-    config_entry.runtime_data[Platform.SENSOR][UNSUB_NODE_LOADED] = (
-        api_stick.subscribe_to_node_events(
-            async_add_sensor,
-            (NodeEvent.LOADED,),
-        )
+    async_add_entities(
+        PlugwiseUSBStickSensorEntity(config_entry, description)
+        for description in STICK_SENSOR_TYPES
+    )
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_add_platform(
+        Platform.SENSOR, SENSOR_INDEX, PlugwiseUSBSensorEntity, async_add_entities
     )
 
-    # load current nodes
-    for mac, node in api_stick.nodes.items():
-        if node.is_loaded:
-            await async_add_sensor(NodeEvent.LOADED, mac)
-        else:
-            _LOGGER.debug("Adding sensor(s) for node %s failed, not loaded", mac)
 
 async def async_unload_entry(
     _hass: HomeAssistant,
     config_entry: PlugwiseUSBConfigEntry,
 ) -> None:
     """Unload a config entry."""
-    config_entry.runtime_data[Platform.SENSOR][UNSUB_NODE_LOADED]()
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_remove_platform(Platform.SENSOR)
 
 
 class PlugwiseUSBSensorEntity(PlugwiseUSBEntity, SensorEntity):
     """Representation of a Plugwise USB Data Update Coordinator sensor."""
 
+    entity_description: PlugwiseSensorEntityDescription
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available, metrics are also of failing nodes."""
+        return (
+            self.entity_description.value_fn is not None
+            and self.entity_category == EntityCategory.DIAGNOSTIC
+        ) or super().available
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
+        if self.entity_description.value_fn is not None:
+            self._attr_native_value = self.entity_description.value_fn(self.node_duc)
+            self.async_write_ha_state_if_changed(self._attr_native_value)
+            return
+
         if self.coordinator.data is None:
             _LOGGER.debug(
                 "No coordinator data available for %s",
@@ -238,9 +434,37 @@ class PlugwiseUSBSensorEntity(PlugwiseUSBEntity, SensorEntity):
             self.coordinator.data[self.entity_description.node_feature],
             self.entity_description.key,
         )
+        last_reset = None
         if self.entity_description.node_feature == NodeFeature.ENERGY:
-            self._attr_last_reset = getattr(
+            last_reset = getattr(
                 self.coordinator.data[self.entity_description.node_feature],
                 f"{self.entity_description.key}_reset",
             )
-        self.async_write_ha_state()
+            self._attr_last_reset = last_reset
+        self.async_write_ha_state_if_changed(self._attr_native_value, last_reset)
+
+
+class PlugwiseUSBStickSensorEntity(SensorEntity):
+    """Representation of a telemetry sensor of the Plugwise USB-Stick."""
+
+    _attr_has_entity_name = True
+    # Sliding window values change without events, sample every SCAN_INTERVAL
+    _attr_should_poll = True
+    entity_description: PlugwiseStickSensorEntityDescription
+
+    def __init__(
+        self,
+        config_entry: PlugwiseUSBConfigEntry,
+        entity_description: PlugwiseStickSensorEntityDescription,
+    ) -> None:
+        """Initialize a Plugwise USB-Stick sensor."""
+        self.entity_description = entity_description
+        self._request_queue = config_entry.runtime_data[REQUEST_QUEUE]
+        mac_stick = str(config_entry.runtime_data[STICK].mac_stick)
+        self._attr_unique_id = f"{mac_stick}-{entity_description.key}"
+        self._attr_device_info = DeviceInfo(identifiers={(DOMAIN, mac_stick)})
+
+    @property
+    def native_value(self) -> float | int | None:
+        """Return the current value from the request queue."""
+        return self.entity_description.value_fn(self._request_queue)
@@ -0,0 +1,259 @@
+"""Services of the Plugwise USB integration acting on many nodes at once."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+from time import monotonic
+from typing import Any
+
+from plugwise_usb.api import NodeFeature
+from plugwise_usb.exceptions import NodeError, NodeTimeout, StickError, StickTimeout
+import voluptuous as vol
+
+from homeassistant.components.device_tracker import ATTR_MAC
+from homeassistant.const import ATTR_AREA_ID, ATTR_STATE
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+
+from .const import (
+    ATTR_ALL_CIRCLES,
+    ATTR_CONSUMPTION_INTERVAL,
+    ATTR_PRODUCTION_INTERVAL,
+    ATTR_RETRIES,
+    ATTR_STAGGER,
+    DEFAULT_ENERGY_INTERVAL,
+    DEFAULT_RELAY_RETRIES,
+    DOMAIN,
+    MAX_ENERGY_INTERVAL,
+    MAX_RELAY_RETRIES,
+    MAX_RELAY_STAGGER,
+    NODES,
+    REQUEST_QUEUE,
+    SERVICE_MAX_IN_FLIGHT,
+    SERVICE_NODES_FIELDS,
+    STICK,
+)
+from .coordinator import PlugwiseUSBConfigEntry
+from .request_queue import RequestPriority
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _CommandRefused(NodeError):
+    """The node refused a command, retrying it cannot succeed."""
+
+
+ENERGY_INTERVAL = vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_ENERGY_INTERVAL))
+
+
+def _valid_energy_intervals(data: dict[str, Any]) -> dict[str, Any]:
+    """Check the production interval is a multiple of the consumption interval."""
+    if data.get(ATTR_PRODUCTION_INTERVAL, 0) % data[ATTR_CONSUMPTION_INTERVAL]:
+        raise vol.Invalid(
+            "Production interval must be a multiple of the consumption interval"
+        )
+    return data
+
+
+SERVICE_ENABLE_PRODUCTION_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            **SERVICE_NODES_FIELDS,
+            vol.Optional(
+                ATTR_CONSUMPTION_INTERVAL, default=DEFAULT_ENERGY_INTERVAL
+            ): ENERGY_INTERVAL,
+            vol.Optional(
+                ATTR_PRODUCTION_INTERVAL, default=DEFAULT_ENERGY_INTERVAL
+            ): ENERGY_INTERVAL,
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_MAC, ATTR_AREA_ID, ATTR_ALL_CIRCLES),
+    _valid_energy_intervals,
+)
+SERVICE_DISABLE_PRODUCTION_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            **SERVICE_NODES_FIELDS,
+            vol.Optional(
+                ATTR_CONSUMPTION_INTERVAL, default=DEFAULT_ENERGY_INTERVAL
+            ): ENERGY_INTERVAL,
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_MAC, ATTR_AREA_ID, ATTR_ALL_CIRCLES),
+)
+SERVICE_SWITCH_RELAYS_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            **SERVICE_NODES_FIELDS,
+            vol.Required(ATTR_STATE): cv.boolean,
+            vol.Optional(ATTR_STAGGER, default=0.0): vol.All(
+                vol.Coerce(float), vol.Range(min=0.0, max=MAX_RELAY_STAGGER)
+            ),
+            vol.Optional(ATTR_RETRIES, default=DEFAULT_RELAY_RETRIES): vol.All(
+                vol.Coerce(int), vol.Range(min=0, max=MAX_RELAY_RETRIES)
+            ),
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_MAC, ATTR_AREA_ID, ATTR_ALL_CIRCLES),
+)
+
+
+@callback
+def async_service_nodes(
+    hass: HomeAssistant,
+    config_entry: PlugwiseUSBConfigEntry,
+    data: dict[str, Any],
+    feature: NodeFeature,
+) -> list[str]:
+    """Return the macs a service call applies to, without duplicates.
+
+    Macs are used as given, nodes selected by area or as all Circles are the
+    known nodes supporting feature.
+    """
+    nodes = config_entry.runtime_data[NODES]
+    macs = [mac.upper() for mac in data.get(ATTR_MAC, [])]
+    if areas := set(data.get(ATTR_AREA_ID, [])):
+        for device in dr.async_entries_for_config_entry(
+            dr.async_get(hass), config_entry.entry_id
+        ):
+            if device.area_id not in areas:
+                continue
+            macs.extend(
+                mac
+                for domain, mac in device.identifiers
+                if domain == DOMAIN and mac in nodes and feature in nodes[mac].features
+            )
+    if data.get(ATTR_ALL_CIRCLES):
+        macs.extend(
+            mac for mac, coordinator in nodes.items() if feature in coordinator.features
+        )
+    if not macs:
+        raise HomeAssistantError("No Plugwise USB nodes match the service call")
+    return list(dict.fromkeys(macs))
+
+
+async def async_run_per_node(
+    macs: list[str],
+    request: Callable[[str], Awaitable[Any]],
+    *,
+    stagger: float = 0.0,
+    retries: int = 0,
+) -> dict[str, Any]:
+    """Run request(mac) for all macs, a few at once, return the aggregate result.
+
+    Requests start in the order of macs, at least stagger seconds apart. Failed
+    requests are retried up to retries times, once all other requests finished,
+    unless the node refused the request.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    semaphore = asyncio.Semaphore(SERVICE_MAX_IN_FLIGHT)
+    results: dict[str, dict[str, Any]] = {
+        mac: {"success": False, "attempts": 0} for mac in macs
+    }
+    refused: set[str] = set()
+
+    async def _async_run(index: int, mac: str) -> None:
+        await asyncio.sleep(index * stagger)
+        async with semaphore:
+            result = results[mac]
+            result["attempts"] += 1
+            try:
+                await request(mac)
+            except (NodeError, NodeTimeout, StickError, StickTimeout) as exc:
+                _LOGGER.debug("Service request for %s failed: %s", mac, exc)
+                result["error"] = str(exc) or type(exc).__name__
+                if isinstance(exc, _CommandRefused):
+                    refused.add(mac)
+                return
+            results[mac] = {"success": True, "attempts": result["attempts"]}
+
+    pending = macs
+    for _ in range(retries + 1):
+        await asyncio.gather(
+            *(_async_run(index, mac) for index, mac in enumerate(pending))
+        )
+        pending = [
+            mac for mac in pending if not results[mac]["success"] and mac not in refused
+        ]
+        if not pending:
+            break
+    succeeded = sum(result["success"] for result in results.values())
+    return {
+        "succeeded": succeeded,
+        "failed": len(macs) - succeeded,
+        "duration": round(loop.time() - start, 3),
+        "nodes": results,
+    }
+
+
+def _raise_when_all_failed(action: str, results: dict[str, Any]) -> None:
+    """Fail the service call when not a single node succeeded."""
+    if results["succeeded"]:
+        return
+    errors = ", ".join(
+        f"{mac}: {result['error']}" for mac, result in results["nodes"].items()
+    )
+    raise HomeAssistantError(f"{action} failed for {errors}")
+
+
+async def async_set_energy_intervals(
+    hass: HomeAssistant, config_entry: PlugwiseUSBConfigEntry, call: ServiceCall
+) -> ServiceResponse:
+    """Set the energy log intervals, production is disabled without its interval."""
+    macs = async_service_nodes(hass, config_entry, call.data, NodeFeature.ENERGY)
+    consumption = call.data[ATTR_CONSUMPTION_INTERVAL]
+    production = call.data.get(ATTR_PRODUCTION_INTERVAL, 0)
+    stick = config_entry.runtime_data[STICK]
+    request_queue = config_entry.runtime_data[REQUEST_QUEUE]
+    results = await async_run_per_node(
+        macs,
+        lambda mac: request_queue.async_submit(
+            RequestPriority.INTERACTIVE,
+            stick.set_energy_intervals,
+            mac,
+            consumption,
+            production,
+        ),
+    )
+    _raise_when_all_failed(
+        "Enable production logs" if production else "Disable production logs",
+        results,
+    )
+    return results
+
+
+async def async_switch_relays(
+    hass: HomeAssistant, config_entry: PlugwiseUSBConfigEntry, call: ServiceCall
+) -> ServiceResponse:
+    """Switch the relays of a group of nodes as one batch."""
+    macs = async_service_nodes(hass, config_entry, call.data, NodeFeature.RELAY)
+    state = call.data[ATTR_STATE]
+    nodes = config_entry.runtime_data[NODES]
+    request_queue = config_entry.runtime_data[REQUEST_QUEUE]
+
+    async def _async_switch(mac: str) -> None:
+        """Switch one relay and merge its new state."""
+        coordinator = nodes.get(mac)
+        if coordinator is None or NodeFeature.RELAY not in coordinator.features:
+            raise NodeError(f"{mac} is not a known node with a relay")
+        start = monotonic()
+        switched = await request_queue.async_submit(
+            RequestPriority.INTERACTIVE, coordinator.node.set_relay, state
+        )
+        request_queue.record_relay_latency(monotonic() - start)
+        coordinator.async_relay_switched(switched)
+        if switched != state:
+            raise _CommandRefused(f"Relay of {mac} is locked")
+
+    results = await async_run_per_node(
+        macs,
+        _async_switch,
+        stagger=call.data[ATTR_STAGGER],
+        retries=call.data[ATTR_RETRIES],
+    )
+    _raise_when_all_failed("Switching relays", results)
+    return results
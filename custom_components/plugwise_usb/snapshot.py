@@ -0,0 +1,182 @@
+"""Snapshot of the last known node states, to warm restart the integration."""
+
+from __future__ import annotations
+
+from dataclasses import fields
+from datetime import datetime
+from enum import Enum
+import logging
+from types import UnionType
+from typing import Any, get_args, get_origin
+
+from plugwise_usb.api import (
+    AvailableState,
+    BatteryConfig,
+    EnergyStatistics,
+    MotionConfig,
+    MotionState,
+    NetworkStatistics,
+    NodeFeature,
+    PowerStatistics,
+    RelayConfig,
+    RelayLock,
+    RelayState,
+    SenseHysteresisConfig,
+    SenseStatistics,
+)
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, NODES
+from .coordinator import PlugwiseUSBConfigEntry
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# States worth restoring, switch events are not states and are never replayed
+SNAPSHOT_FEATURES: dict[NodeFeature, type] = {
+    NodeFeature.AVAILABLE: AvailableState,
+    NodeFeature.BATTERY: BatteryConfig,
+    NodeFeature.ENERGY: EnergyStatistics,
+    NodeFeature.MOTION: MotionState,
+    NodeFeature.MOTION_CONFIG: MotionConfig,
+    NodeFeature.PING: NetworkStatistics,
+    NodeFeature.POWER: PowerStatistics,
+    NodeFeature.RELAY: RelayState,
+    NodeFeature.RELAY_INIT: RelayConfig,
+    NodeFeature.RELAY_LOCK: RelayLock,
+    NodeFeature.SENSE: SenseStatistics,
+    NodeFeature.SENSE_HYSTERESIS: SenseHysteresisConfig,
+}
+
+type NodeSnapshot = dict[str, dict[str, Any]]
+
+
+def _encode_value(value: Any) -> Any:
+    """Return a JSON compatible representation of a state field."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, tuple):
+        return [_encode_value(item) for item in value]
+    return value
+
+
+def _decode_value(field_type: Any, value: Any) -> Any:
+    """Return the state field represented by value."""
+    if value is None:
+        return None
+    candidates = (
+        get_args(field_type) if isinstance(field_type, UnionType) else (field_type,)
+    )
+    for candidate in candidates:
+        if get_origin(candidate) is tuple:
+            item_type = get_args(candidate)[0]
+            return tuple(_decode_value(item_type, item) for item in value)
+        if candidate is datetime:
+            return datetime.fromisoformat(value)
+        if isinstance(candidate, type) and issubclass(candidate, Enum):
+            return candidate(value)
+    return value
+
+
+def encode_dataclass(state: Any, exclude: tuple[str, ...] = ()) -> dict[str, Any]:
+    """Return the JSON compatible fields of a state, leaving out None values."""
+    return {
+        field.name: _encode_value(value)
+        for field in fields(state)
+        if field.name not in exclude
+        and (value := getattr(state, field.name)) is not None
+    }
+
+
+def decode_dataclass[T](state_class: type[T], values: dict[str, Any]) -> T:
+    """Return the state of state_class represented by values."""
+    return state_class(
+        **{
+            field.name: _decode_value(field.type, values[field.name])
+            for field in fields(state_class)  # type: ignore[arg-type]
+            if field.name in values
+        }
+    )
+
+
+def encode_states(states: dict[NodeFeature, Any]) -> NodeSnapshot:
+    """Return the compact snapshot of the states of one node."""
+    return {
+        feature.value: encode_dataclass(state)
+        for feature, state in states.items()
+        if feature in SNAPSHOT_FEATURES and state is not None
+    }
+
+
+def decode_states(snapshot: NodeSnapshot) -> dict[NodeFeature, Any]:
+    """Return the states of one node from its snapshot."""
+    states: dict[NodeFeature, Any] = {}
+    for feature_value, values in snapshot.items():
+        try:
+            feature = NodeFeature(feature_value)
+            states[feature] = decode_dataclass(SNAPSHOT_FEATURES[feature], values)
+        except (KeyError, TypeError, ValueError) as err:
+            # Snapshot of an older library version, just skip this state
+            _LOGGER.debug("Skip restoring %s state: %s", feature_value, err)
+    return states
+
+
+class PlugwiseUSBSnapshot:
+    """Persist the last known states of all nodes of a config entry.
+
+    The snapshot is loaded before the network is discovered, so coordinators
+    can be seeded with the last known states as soon as their node shows up.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, config_entry: PlugwiseUSBConfigEntry
+    ) -> None:
+        """Initialize the snapshot store."""
+        self._hass = hass
+        self._config_entry = config_entry
+        self._store: Store[dict[str, NodeSnapshot]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.snapshot.{config_entry.entry_id}"
+        )
+        self._restored: dict[str, NodeSnapshot] = {}
+
+    async def async_load(self) -> None:
+        """Load the snapshot saved by the previous run."""
+        self._restored = await self._store.async_load() or {}
+        _LOGGER.debug("Loaded snapshot of %s nodes", len(self._restored))
+
+    def restored_states(self, mac: str) -> dict[NodeFeature, Any]:
+        """Return the last known states of a node."""
+        if (snapshot := self._restored.get(mac)) is None:
+            return {}
+        return decode_states(snapshot)
+
+    @callback
+    def async_remove(self, mac: str) -> None:
+        """Forget the restored states of a removed node."""
+        self._restored.pop(mac, None)
+
+    async def async_save(self) -> None:
+        """Save the current states of all nodes."""
+        await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self) -> dict[str, NodeSnapshot]:
+        """Return the snapshot of all nodes with a device.
+
+        Nodes not seen (yet) this run are kept, unless their device was removed.
+        """
+        data = dict(self._restored)
+        for mac, coordinator in self._config_entry.runtime_data.get(NODES, {}).items():
+            if coordinator.data:
+                data[mac] = encode_states(coordinator.data)
+        device_registry = dr.async_get(self._hass)
+        return {
+            mac: snapshot
+            for mac, snapshot in data.items()
+            if device_registry.async_get_device(identifiers={(DOMAIN, mac)})
+        }
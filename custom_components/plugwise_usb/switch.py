@@ -6,7 +6,7 @@ from dataclasses import dataclass
 from datetime import timedelta
 import logging
 
-from plugwise_usb.api import NodeEvent, NodeFeature
+from plugwise_usb.api import NodeFeature
 
 from homeassistant.components.switch import (
     SwitchDeviceClass,
@@ -17,11 +17,13 @@ from homeassistant.const import EntityCategory, Platform
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import NODES, STICK, UNSUB_NODE_LOADED
+from .const import ENTITY_DISPATCHER
 from .coordinator import PlugwiseUSBConfigEntry, PlugwiseUSBDataUpdateCoordinator
+from .dispatcher import feature_index
 from .entity import PlugwiseUSBEntity, PlugwiseUSBEntityDescription
 
 _LOGGER = logging.getLogger(__name__)
+ATTR_SWITCH_LATENCY = "switch_latency"  # ms, last relay command
 PARALLEL_UPDATES = 2
 SCAN_INTERVAL = timedelta(seconds=30)
 
@@ -104,6 +106,8 @@ SWITCH_TYPES: tuple[PlugwiseSwitchEntityDescription, ...] = (
     ),
 )
 
+SWITCH_INDEX = feature_index(SWITCH_TYPES)
+
 
 async def async_setup_entry(
     _hass: HomeAssistant,
@@ -111,49 +115,17 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the USB switches from a config entry."""
-
-    async def async_add_switch(node_event: NodeEvent, mac: str) -> None:
-        """Initialize DUC for switch."""
-        if node_event != NodeEvent.LOADED:
-            return
-        entities: list[PlugwiseUSBEntity] = []
-        if (node_duc := config_entry.runtime_data[NODES].get(mac)) is not None:
-            for entity_description in SWITCH_TYPES:
-                if entity_description.node_feature not in node_duc.node.features:
-                    continue
-                entities.append(PlugwiseUSBSwitchEntity(node_duc, entity_description))
-                _LOGGER.debug(
-                    "Add %s switch for node %s",
-                    entity_description.translation_key,
-                    node_duc.node.name,
-                )
-        if entities:
-            async_add_entities(entities)
-
-    api_stick = config_entry.runtime_data[STICK]
-
-    # Listen for loaded nodes
-    config_entry.runtime_data[Platform.SWITCH] = {}
-    config_entry.runtime_data[Platform.SWITCH][UNSUB_NODE_LOADED] = (
-        api_stick.subscribe_to_node_events(
-            async_add_switch,
-            (NodeEvent.LOADED,),
-        )
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_add_platform(
+        Platform.SWITCH, SWITCH_INDEX, PlugwiseUSBSwitchEntity, async_add_entities
     )
 
-    # load any current nodes
-    for mac, node in api_stick.nodes.items():
-        if node.is_loaded:
-            await async_add_switch(NodeEvent.LOADED, mac)
-        else:
-            _LOGGER.debug("Adding switch(es) for node %s failed, not loaded", mac)
 
 async def async_unload_entry(
     _hass: HomeAssistant,
     config_entry: PlugwiseUSBConfigEntry,
 ) -> None:
     """Unload a config entry."""
-    config_entry.runtime_data[Platform.SWITCH][UNSUB_NODE_LOADED]()
+    config_entry.runtime_data[ENTITY_DISPATCHER].async_remove_platform(Platform.SWITCH)
 
 
 class PlugwiseUSBSwitchEntity(PlugwiseUSBEntity, SwitchEntity):
@@ -192,14 +164,25 @@ class PlugwiseUSBSwitchEntity(PlugwiseUSBEntity, SwitchEntity):
             data,
             self.entity_description.api_attribute,
         )
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed(self._attr_is_on)
 
     async def async_turn_on(self, **kwargs):
         """Turn the switch on."""
-        self._attr_is_on = await self.async_switch_fn(True)
-        self.async_write_ha_state()
+        await self._async_switch(True)
 
     async def async_turn_off(self, **kwargs):
         """Turn the switch off."""
-        self._attr_is_on = await self.async_switch_fn(False)
-        self.async_write_ha_state()
+        await self._async_switch(False)
+
+    async def _async_switch(self, state: bool) -> None:
+        """Change the switch state, measuring relay command latency."""
+        start = self.hass.loop.time()
+        self._attr_is_on = await self.async_node_command(self.async_switch_fn, state)
+        if self.entity_description.node_feature == NodeFeature.RELAY:
+            latency = self.hass.loop.time() - start
+            self._node_duc.request_queue.record_relay_latency(latency)
+            self._attr_extra_state_attributes = {
+                ATTR_SWITCH_LATENCY: round(latency * 1000)
+            }
+            self._node_duc.async_boost_polling()
+        self.async_write_ha_state_if_changed(self._attr_is_on, force=True)
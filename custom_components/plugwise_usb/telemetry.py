@@ -0,0 +1,106 @@
+"""Throughput and reliability telemetry of the Plugwise USB-Stick link."""
+
+from __future__ import annotations
+
+from collections import deque
+from time import monotonic
+from typing import Any
+
+TELEMETRY_WINDOW = 60.0  # seconds of requests the rates are computed over
+
+
+class PlugwiseUSBLinkTelemetry:
+    """Count requests, responses and failures over a sliding window.
+
+    The plugwise_usb library has no public counters of the frames it sends, so
+    every request through the request queue is counted as one exchange with
+    the Stick. Round trip times are the time from sending a request until its
+    final response.
+    """
+
+    def __init__(self, window: float = TELEMETRY_WINDOW) -> None:
+        """Initialize the link telemetry."""
+        self.window = window
+        self._started = monotonic()
+        self._sent: deque[float] = deque()
+        # Time and round trip time of each response
+        self._responses: deque[tuple[float, float]] = deque()
+        # Time of each failure and whether it was a timeout
+        self._failures: deque[tuple[float, bool]] = deque()
+        self.sent_total = 0
+        self.responses_total = 0
+        self.timeouts_total = 0
+        self.rejected_total = 0
+
+    def record_sent(self) -> None:
+        """Store a request sent to the Stick."""
+        self._sent.append(monotonic())
+        self.sent_total += 1
+
+    def record_response(self, rtt: float) -> None:
+        """Store a response, with its round trip time in seconds."""
+        self._responses.append((monotonic(), rtt))
+        self.responses_total += 1
+
+    def record_failure(self, timeout: bool) -> None:
+        """Store a request which timed out or was rejected."""
+        self._failures.append((monotonic(), timeout))
+        if timeout:
+            self.timeouts_total += 1
+        else:
+            self.rejected_total += 1
+
+    def _prune(self) -> float:
+        """Drop the samples outside the window, return the covered seconds."""
+        now = monotonic()
+        cutoff = now - self.window
+        while self._sent and self._sent[0] < cutoff:
+            self._sent.popleft()
+        while self._responses and self._responses[0][0] < cutoff:
+            self._responses.popleft()
+        while self._failures and self._failures[0][0] < cutoff:
+            self._failures.popleft()
+        return max(min(self.window, now - self._started), 1.0)
+
+    @property
+    def sent_rate(self) -> float:
+        """Return the requests sent per second."""
+        return len(self._sent) / self._prune()
+
+    @property
+    def received_rate(self) -> float:
+        """Return the responses received per second."""
+        return len(self._responses) / self._prune()
+
+    @property
+    def failure_rate(self) -> float | None:
+        """Return the percentage of finished requests which failed."""
+        self._prune()
+        finished = len(self._responses) + len(self._failures)
+        if finished == 0:
+            return None
+        return 100 * len(self._failures) / finished
+
+    @property
+    def mean_rtt(self) -> float | None:
+        """Return the mean round trip time in seconds."""
+        self._prune()
+        if not self._responses:
+            return None
+        return sum(rtt for _, rtt in self._responses) / len(self._responses)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the summary of the telemetry."""
+        mean_rtt = self.mean_rtt
+        failure_rate = self.failure_rate
+        return {
+            "window": self.window,
+            "sent_rate": round(self.sent_rate, 3),
+            "received_rate": round(self.received_rate, 3),
+            "failure_rate": None if failure_rate is None else round(failure_rate, 1),
+            "mean_rtt": None if mean_rtt is None else round(mean_rtt, 3),
+            "sent_total": self.sent_total,
+            "responses_total": self.responses_total,
+            "timeouts_total": self.timeouts_total,
+            "rejected_total": self.rejected_total,
+        }
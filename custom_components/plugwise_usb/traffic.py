@@ -0,0 +1,311 @@
+"""Recording of the traffic between the integration and the Plugwise USB-Stick."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import gzip
+import json
+import logging
+from pathlib import Path
+from time import monotonic
+from typing import Any
+
+from plugwise_usb.api import NodeEvent, NodeFeature, NodeInfo, SwitchGroup
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .const import ATTR_DURATION, STICK, TRAFFIC_FLUSH_INTERVAL
+from .coordinator import PlugwiseUSBConfigEntry
+from .snapshot import SNAPSHOT_FEATURES, decode_dataclass, encode_dataclass
+
+_LOGGER = logging.getLogger(__name__)
+
+TRAFFIC_VERSION = 1
+
+# Record kinds, the first item of every record line
+RESPONSE = "q"
+ERROR = "e"
+PUSH = "p"
+NODE_EVENT = "n"
+
+# States of all features the integration requests or gets pushed
+TRAFFIC_FEATURES: dict[NodeFeature, type] = {
+    **SNAPSHOT_FEATURES,
+    NodeFeature.INFO: NodeInfo,
+    NodeFeature.SWITCH: SwitchGroup,
+}
+
+
+def _encode_states(states: dict[NodeFeature, Any]) -> dict[str, Any]:
+    """Return the recordable states, by feature value."""
+    return {
+        feature.value: encode_dataclass(state)
+        for feature, state in states.items()
+        if feature in TRAFFIC_FEATURES and state is not None
+    }
+
+
+def _decode_states(states: dict[str, Any]) -> dict[NodeFeature, Any]:
+    """Return the states of a record."""
+    decoded: dict[NodeFeature, Any] = {}
+    for feature_value, values in states.items():
+        feature = NodeFeature(feature_value)
+        decoded[feature] = decode_dataclass(TRAFFIC_FEATURES[feature], values)
+    return decoded
+
+
+@dataclass(frozen=True, kw_only=True)
+class TrafficRecord:
+    """One recorded exchange, push or node event."""
+
+    kind: str
+    time: float  # seconds since the start of the recording
+    mac: str
+    features: tuple[NodeFeature, ...] = ()
+    rtt: float | None = None
+    states: dict[NodeFeature, Any] = field(default_factory=dict)
+    error: str | None = None
+    event: NodeEvent | None = None
+    node_info: NodeInfo | None = None
+
+
+def _decode_record(values: list[Any]) -> TrafficRecord:
+    """Return the record represented by one line of a recording."""
+    kind, time, mac, *rest = values
+    if kind == RESPONSE:
+        features, rtt, states = rest
+        return TrafficRecord(
+            kind=kind,
+            time=time,
+            mac=mac,
+            features=tuple(NodeFeature(feature) for feature in features),
+            rtt=rtt,
+            states=_decode_states(states),
+        )
+    if kind == ERROR:
+        features, rtt, error = rest
+        return TrafficRecord(
+            kind=kind,
+            time=time,
+            mac=mac,
+            features=tuple(NodeFeature(feature) for feature in features),
+            rtt=rtt,
+            error=error,
+        )
+    if kind == PUSH:
+        feature, state = rest
+        return TrafficRecord(
+            kind=kind, time=time, mac=mac, states=_decode_states({feature: state})
+        )
+    if kind == NODE_EVENT:
+        event, node_info = rest
+        return TrafficRecord(
+            kind=kind,
+            time=time,
+            mac=mac,
+            event=NodeEvent(event),
+            node_info=decode_dataclass(NodeInfo, node_info),
+        )
+    raise ValueError(f"Unknown traffic record kind {kind}")
+
+
+def load_traffic(path: str | Path) -> tuple[dict[str, Any], list[TrafficRecord]]:
+    """Return the header and the records of a recording.
+
+    This does blocking I/O, run it in the executor.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        header = json.loads(file.readline())
+        if header.get("version") != TRAFFIC_VERSION:
+            raise ValueError(f"Unsupported traffic recording version of {path}")
+        header["nodes"] = {
+            mac: decode_dataclass(NodeInfo, node_info)
+            for mac, node_info in header["nodes"].items()
+        }
+        return header, [_decode_record(json.loads(line)) for line in file]
+
+
+def _append_lines(path: Path, lines: list[str]) -> None:
+    """Append lines as a new gzip member, which readers see as one stream."""
+    with gzip.open(path, "at", encoding="utf-8") as file:
+        file.writelines(lines)
+
+
+class PlugwiseUSBTrafficRecorder:
+    """Record the requests, responses and pushes seen by the integration.
+
+    Every record is one compact JSON array per line, in a gzip file in the
+    configuration folder. The first line holds the Stick and the node info of
+    all known nodes, so a recording can be replayed without the network.
+    Records are buffered and appended off the event loop every few seconds.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, config_entry: PlugwiseUSBConfigEntry
+    ) -> None:
+        """Initialize the traffic recorder."""
+        self._hass = hass
+        self._config_entry = config_entry
+        self.path: Path | None = None
+        self.records = 0
+        self._started = 0.0
+        self._buffer: list[str] = []
+        self._flush_lock = asyncio.Lock()
+        self._unsubscribers: list[Callable[[], None]] = []
+
+    @property
+    def recording(self) -> bool:
+        """Return True while recording."""
+        return self.path is not None
+
+    def _append(self, *values: Any) -> None:
+        """Buffer one record, time stamped relative to the start."""
+        self._buffer.append(
+            json.dumps(
+                [values[0], round(monotonic() - self._started, 3), *values[1:]],
+                separators=(",", ":"),
+            )
+            + "\n"
+        )
+        self.records += 1
+
+    def record_response(
+        self,
+        mac: str,
+        features: tuple[NodeFeature, ...],
+        rtt: float,
+        states: dict[NodeFeature, Any],
+    ) -> None:
+        """Record the states a node returned."""
+        if self.recording:
+            self._append(
+                RESPONSE,
+                mac,
+                [feature.value for feature in features],
+                round(rtt, 4),
+                _encode_states(states),
+            )
+
+    def record_error(
+        self,
+        mac: str,
+        features: tuple[NodeFeature, ...],
+        rtt: float,
+        error: Exception,
+    ) -> None:
+        """Record a request which failed."""
+        if self.recording:
+            self._append(
+                ERROR,
+                mac,
+                [feature.value for feature in features],
+                round(rtt, 4),
+                type(error).__name__,
+            )
+
+    def record_push(self, mac: str, feature: NodeFeature, state: Any) -> None:
+        """Record a state pushed by a node."""
+        if self.recording and feature in TRAFFIC_FEATURES and state is not None:
+            self._append(PUSH, mac, feature.value, encode_dataclass(state))
+
+    def record_node_event(self, event: NodeEvent, node_info: NodeInfo) -> None:
+        """Record a node being discovered or loaded."""
+        if self.recording:
+            self._append(
+                NODE_EVENT, node_info.mac, event.value, encode_dataclass(node_info)
+            )
+
+    def _header(self) -> str:
+        """Return the first line of a recording."""
+        stick = self._config_entry.runtime_data[STICK]
+        header = {
+            "version": TRAFFIC_VERSION,
+            "started": dt_util.utcnow().isoformat(),
+            "stick": {
+                "mac_stick": stick.mac_stick,
+                "mac_coordinator": stick.mac_coordinator,
+                "hardware": stick.hardware,
+                "firmware": stick.firmware.isoformat()
+                if isinstance(stick.firmware, datetime)
+                else stick.firmware,
+                "name": stick.name,
+            },
+            "nodes": {
+                mac: encode_dataclass(node.node_info)
+                for mac, node in stick.nodes.items()
+            },
+        }
+        return json.dumps(header, separators=(",", ":")) + "\n"
+
+    @callback
+    def async_start(self, duration: float | None = None) -> Path:
+        """Start a new recording, optionally stopping after duration seconds."""
+        if self.path is not None:
+            raise HomeAssistantError(f"Already recording traffic to {self.path}")
+        timestamp = dt_util.utcnow().strftime("%Y%m%d%H%M%S")
+        self.path = Path(
+            self._hass.config.path(f"plugwise_usb_traffic_{timestamp}.jsonl.gz")
+        )
+        self.records = 0
+        self._started = monotonic()
+        self._buffer = [self._header()]
+        self._unsubscribers.append(
+            async_track_time_interval(
+                self._hass,
+                self._async_flush,
+                timedelta(seconds=TRAFFIC_FLUSH_INTERVAL),
+            )
+        )
+        if duration is not None:
+            self._unsubscribers.append(
+                async_call_later(self._hass, duration, self._async_stop_later)
+            )
+        _LOGGER.info("Start recording Plugwise USB traffic to %s", self.path)
+        return self.path
+
+    async def _async_stop_later(self, _: Any) -> None:
+        """Stop the recording at the end of its duration."""
+        self._unsubscribers.pop()
+        await self.async_stop()
+
+    async def async_stop(self) -> dict[str, Any] | None:
+        """Stop recording, return the summary of the recording."""
+        if (path := self.path) is None:
+            return None
+        while self._unsubscribers:
+            self._unsubscribers.pop()()
+        await self._async_flush()
+        self.path = None
+        _LOGGER.info(
+            "Recorded %s Plugwise USB traffic records to %s", self.records, path
+        )
+        return {
+            "path": str(path),
+            "records": self.records,
+            "duration": round(monotonic() - self._started, 3),
+        }
+
+    async def _async_flush(self, _: Any = None) -> None:
+        """Append the buffered records to the recording."""
+        async with self._flush_lock:
+            if self.path is None or not self._buffer:
+                return
+            lines, self._buffer = self._buffer, []
+            await self._hass.async_add_executor_job(_append_lines, self.path, lines)
+
+    async def async_handle_start(self, call: ServiceCall) -> ServiceResponse:
+        """Handle the start recording service."""
+        path = self.async_start(call.data.get(ATTR_DURATION))
+        return {"path": str(path)}
+
+    async def async_handle_stop(self, _: ServiceCall) -> ServiceResponse:
+        """Handle the stop recording service."""
+        if (summary := await self.async_stop()) is None:
+            raise HomeAssistantError("No Plugwise USB traffic recording is running")
+        return summary
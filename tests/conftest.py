@@ -2,22 +2,111 @@
 
 from __future__ import annotations
 
-from collections.abc import Generator
-from typing import Final
+import asyncio
+from collections.abc import AsyncGenerator, Awaitable, Callable, Generator
+from datetime import UTC, datetime
+import json
+from pathlib import Path
+import platform
+from typing import Any, Final
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from plugwise_usb.api import (
+    AvailableState,
+    NodeEvent,
+    NodeFeature,
+    NodeInfo,
+    NodeType,
+    PowerStatistics,
+    RelayState,
+)
 from plugwise_usb.exceptions import StickError
 import pytest
 
-from custom_components.plugwise_usb.const import CONF_USB_PATH, DOMAIN
+from custom_components.plugwise_usb.const import (
+    CONF_USB_PATH,
+    DOMAIN,
+    REQUEST_QUEUE,
+    STICK,
+)
+from custom_components.plugwise_usb.coordinator import PlugwiseUSBDataUpdateCoordinator
+from custom_components.plugwise_usb.request_queue import PlugwiseUSBRequestQueue
+from homeassistant.config_entries import ConfigEntryState
 from homeassistant.core import HomeAssistant
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
+from .simulator import SimulatedNetwork, SimulatedNetworkConfig
+
 STICK_IMPORT_MOCK: Final[str] = "custom_components.plugwise_usb.config_flow.Stick"
+STICK_SETUP_MOCK: Final[str] = "custom_components.plugwise_usb.Stick"
+MANIFEST: Final[Path] = (
+    Path(__file__).parent.parent
+    / "custom_components"
+    / "plugwise_usb"
+    / "manifest.json"
+)
 TEST_MAC: Final[str] = "01:23:45:67:AB"
+TEST_NODE_MAC: Final[str] = "000D6F0000000011"
 TEST_USB_PATH: Final[str] = "/dev/ttyUSB1"
 
 
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Add the options of the benchmarks on the simulated network."""
+    group = parser.getgroup("benchmark")
+    group.addoption(
+        "--benchmark",
+        action="store_true",
+        help="run the benchmarks on a simulated network",
+    )
+    group.addoption(
+        "--benchmark-nodes",
+        type=int,
+        default=200,
+        help="number of nodes of the simulated benchmark network",
+    )
+    group.addoption(
+        "--benchmark-json",
+        metavar="PATH",
+        help="write the benchmark results as JSON to PATH",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """Register the benchmark marker."""
+    config.addinivalue_line("markers", "benchmark: benchmark, run with --benchmark")
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: list[pytest.Item]
+) -> None:
+    """Skip the benchmarks unless asked for."""
+    if config.getoption("--benchmark"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="benchmarks only run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
+@pytest.fixture(scope="session")
+def benchmark_results(
+    pytestconfig: pytest.Config,
+) -> Generator[dict[str, dict[str, float]]]:
+    """Collect the results of all benchmarks, write them as JSON when done."""
+    results: dict[str, dict[str, float]] = {}
+    yield results
+    if not results or (path := pytestconfig.getoption("--benchmark-json")) is None:
+        return
+    report: dict[str, Any] = {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "version": json.loads(MANIFEST.read_text())["version"],
+        "python": platform.python_version(),
+        "nodes": pytestconfig.getoption("--benchmark-nodes"),
+        "results": results,
+    }
+    Path(path).write_text(json.dumps(report, indent=2) + "\n")
+
+
 @pytest.fixture
 def mock_setup_entry() -> Generator[AsyncMock]:
     """Override async_setup_entry."""
@@ -127,6 +216,127 @@ def mock_usb_stick_init_error() -> Generator[MagicMock]:
         yield usb
 
 
+@pytest.fixture
+def mock_stick() -> Generator[MagicMock]:
+    """Return a mocked Stick used by the integration setup, without nodes."""
+
+    with patch(STICK_SETUP_MOCK, autospec=True) as mock_usb:
+        usb = mock_usb.return_value
+
+        usb.connect = AsyncMock(return_value=None)
+        usb.initialize = AsyncMock(return_value=None)
+        usb.disconnect = AsyncMock(return_value=None)
+        usb.discover_coordinator = AsyncMock(return_value=True)
+        usb.discover_nodes = AsyncMock(return_value=True)
+        usb.mac_stick = TEST_MAC
+        usb.nodes = {}
+        usb.node_event_subscriptions = []
+
+        def subscribe_to_node_events(
+            node_event_callback: Callable[[NodeEvent, str], Awaitable[None]],
+            events: tuple[NodeEvent, ...],
+        ) -> Callable[[], None]:
+            subscription = (node_event_callback, events)
+            usb.node_event_subscriptions.append(subscription)
+            return lambda: usb.node_event_subscriptions.remove(subscription)
+
+        usb.subscribe_to_node_events.side_effect = subscribe_to_node_events
+
+        yield usb
+
+
+def create_mock_node(mac: str, name: str) -> MagicMock:
+    """Return a mocked and loaded Circle, answering with the states it holds."""
+    now = datetime.now(UTC)
+    node = MagicMock()
+    node.mac = mac
+    node.node_info = NodeInfo(
+        mac=mac,
+        features=(
+            NodeFeature.AVAILABLE,
+            NodeFeature.INFO,
+            NodeFeature.POWER,
+            NodeFeature.RELAY,
+        ),
+        name=name,
+        node_type=NodeType.CIRCLE,
+    )
+    node.features = node.node_info.features
+    node.name = node.node_info.name
+    node.is_loaded = True
+    node.initialized = True
+    node.available = True
+    node.states = {
+        NodeFeature.AVAILABLE: AvailableState(True, now),
+        NodeFeature.POWER: PowerStatistics(100.0, 100.0, now),
+        NodeFeature.RELAY: RelayState(True, now),
+    }
+
+    async def get_state(features: tuple[NodeFeature, ...]) -> dict[NodeFeature, Any]:
+        """Return the requested states, like the library always with availability."""
+        return {
+            feature: node.states.get(feature)
+            for feature in (NodeFeature.AVAILABLE, *features)
+        }
+
+    node.get_state = AsyncMock(side_effect=get_state)
+    node.set_relay = AsyncMock(side_effect=lambda state: state)
+    node.load = AsyncMock(return_value=True)
+    return node
+
+
+@pytest.fixture
+def mock_node() -> MagicMock:
+    """Return a mocked and loaded Circle."""
+    return create_mock_node(TEST_NODE_MAC, "Circle 00011")
+
+
+@pytest.fixture
+async def mock_node_coordinator(
+    hass: HomeAssistant, mock_config_entry: MockConfigEntry, mock_node: MagicMock
+) -> AsyncGenerator[PlugwiseUSBDataUpdateCoordinator]:
+    """Return a coordinator of the mocked node, without setting up the integration."""
+    mock_config_entry.add_to_hass(hass)
+    mock_config_entry.runtime_data = {
+        STICK: MagicMock(),
+        REQUEST_QUEUE: PlugwiseUSBRequestQueue(),
+    }
+    coordinator = PlugwiseUSBDataUpdateCoordinator(hass, mock_config_entry, mock_node)
+    yield coordinator
+    # Cancel the open push windows
+    await coordinator.unsubscribe_all_nodefeatures()
+
+
+async def async_node_event(
+    hass: HomeAssistant, mock_stick: MagicMock, node_event: NodeEvent, mac: str
+) -> None:
+    """Notify the node event subscribers of the mocked Stick."""
+    for node_event_callback, events in list(mock_stick.node_event_subscriptions):
+        if node_event in events:
+            await node_event_callback(node_event, mac)
+    await hass.async_block_till_done()
+
+
+async def async_add_node(
+    hass: HomeAssistant, mock_stick: MagicMock, node: MagicMock
+) -> None:
+    """Let the mocked Stick discover and load a mocked node."""
+    mock_stick.nodes[node.mac] = node
+    await async_node_event(hass, mock_stick, NodeEvent.DISCOVERED, node.mac)
+    await async_node_event(hass, mock_stick, NodeEvent.LOADED, node.mac)
+
+
+@pytest.fixture
+def simulated_network(request: pytest.FixtureRequest) -> Generator[SimulatedNetwork]:
+    """Return a simulated network, used by the integration instead of a Stick.
+
+    Parametrize indirectly with a SimulatedNetworkConfig to change the network.
+    """
+    network = SimulatedNetwork(getattr(request, "param", SimulatedNetworkConfig()))
+    with patch(STICK_SETUP_MOCK, network.create_stick):
+        yield network
+
+
 async def setup_integration(
     hass: HomeAssistant, config_entry: MockConfigEntry
 ) -> MockConfigEntry:
@@ -138,6 +348,39 @@ async def setup_integration(
     return config_entry
 
 
+async def async_wait_discovered(hass: HomeAssistant, network: SimulatedNetwork) -> None:
+    """Wait until the discovery task of the integration loaded all nodes."""
+    async with asyncio.timeout(30):
+        while not network.stick.network_discovered:
+            await asyncio.sleep(0.01)
+    await hass.async_block_till_done()
+
+
+@pytest.fixture
+def entry_options() -> dict[str, Any]:
+    """Return the options of the config entry, parametrize to change them."""
+    return {}
+
+
+@pytest.fixture
+async def simulated_integration(
+    hass: HomeAssistant,
+    mock_config_entry: MockConfigEntry,
+    simulated_network: SimulatedNetwork,
+    entry_options: dict[str, Any],
+) -> AsyncGenerator[MockConfigEntry]:
+    """Set up the integration on the simulated network, with all nodes loaded."""
+    mock_config_entry.add_to_hass(hass)
+    hass.config_entries.async_update_entry(mock_config_entry, options=entry_options)
+    await hass.config_entries.async_setup(mock_config_entry.entry_id)
+    await async_wait_discovered(hass, simulated_network)
+
+    yield mock_config_entry
+
+    if mock_config_entry.state is ConfigEntryState.LOADED:
+        assert await hass.config_entries.async_unload(mock_config_entry.entry_id)
+
+
 @pytest.fixture(autouse=True)
 def auto_enable_custom_integrations(enable_custom_integrations):
     """Enable custom integrations."""
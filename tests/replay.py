@@ -0,0 +1,211 @@
+"""Replay of recorded Plugwise USB-Stick traffic for the integration tests.
+
+A replay session reads a recording of the traffic recorder and offers the
+same Stick API as the simulated network. Nodes answer each request with the
+next response recorded for them, after the recorded round trip time, and
+raise the recorded error of a failed request. The recorded pushes are fed to
+the subscribers on the recorded timeline by async_replay. The speed divides
+all delays, so a recorded hour can be replayed in minutes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from collections.abc import Callable, Coroutine
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from plugwise_usb import exceptions
+from plugwise_usb.api import AvailableState, NodeEvent, NodeFeature, NodeInfo, NodeType
+from plugwise_usb.exceptions import NodeError
+
+from custom_components.plugwise_usb.traffic import (
+    ERROR,
+    NODE_EVENT,
+    PUSH,
+    RESPONSE,
+    TrafficRecord,
+    load_traffic,
+)
+
+from .simulator import COMMAND_PREFIXES, SimulatedStick
+
+
+class ReplayNode:
+    """Node answering requests with its recorded responses."""
+
+    def __init__(
+        self, session: ReplaySession, node_info: NodeInfo, speed: float
+    ) -> None:
+        """Initialize a replayed node."""
+        self._session = session
+        self.mac = node_info.mac
+        self._recorded_info = node_info
+        self._speed = speed
+        # Before loading only the basic info is known, like with the library
+        self.node_info = NodeInfo(
+            mac=node_info.mac,
+            node_type=node_info.node_type,
+            is_battery_powered=node_info.is_battery_powered,
+        )
+        self.is_loaded = False
+        self.initialized = False
+        self.available = False
+        self.responses: list[TrafficRecord] = []
+        self.requests = 0
+        self.states: dict[NodeFeature, Any] = {}
+        self._subscribers: list[
+            tuple[Callable[[NodeFeature, Any], Coroutine[Any, Any, None]], tuple]
+        ] = []
+
+    @property
+    def features(self) -> tuple[NodeFeature, ...]:
+        """Return the supported features, only known once loaded."""
+        return self.node_info.features
+
+    @property
+    def name(self) -> str:
+        """Return the name of the node."""
+        return self.node_info.name or self.mac
+
+    async def load(self) -> bool:
+        """Load the node with its recorded node info."""
+        self.node_info = self._recorded_info
+        self.is_loaded = True
+        self.initialized = True
+        self.available = True
+        await self._session.stick.async_notify(NodeEvent.LOADED, self.mac)
+        return True
+
+    def subscribe_to_feature_update(
+        self,
+        node_feature_callback: Callable[[NodeFeature, Any], Coroutine[Any, Any, None]],
+        features: tuple[NodeFeature, ...] | NodeFeature,
+    ) -> Callable[[], None]:
+        """Subscribe to pushed state updates of features."""
+        if isinstance(features, NodeFeature):
+            features = (features,)
+        subscriber = (node_feature_callback, tuple(features))
+        self._subscribers.append(subscriber)
+        return lambda: self._subscribers.remove(subscriber)
+
+    async def async_push(self, feature: NodeFeature, state: Any) -> None:
+        """Push a state update to the subscribers of the feature."""
+        self.states[feature] = state
+        await asyncio.gather(
+            *(
+                node_feature_callback(feature, state)
+                for node_feature_callback, features in list(self._subscribers)
+                if feature in features
+            )
+        )
+
+    async def get_state(
+        self, features: tuple[NodeFeature, ...]
+    ) -> dict[NodeFeature, Any]:
+        """Return the next recorded response, start over when all are used."""
+        for feature in features:
+            if feature not in self.features:
+                raise NodeError(f"Feature {feature} not supported by {self.mac}")
+        if self.responses:
+            record = self.responses[self.requests % len(self.responses)]
+            self.requests += 1
+            await asyncio.sleep((record.rtt or 0.0) / self._speed)
+            if record.kind == ERROR:
+                raise getattr(exceptions, record.error or "", NodeError)(
+                    f"Replayed {record.error} of {self.mac}"
+                )
+            self.states.update(record.states)
+        states = {
+            feature: self.states.get(feature)
+            for feature in features
+            if feature != NodeFeature.AVAILABLE
+        }
+        states[NodeFeature.AVAILABLE] = self.states.get(
+            NodeFeature.AVAILABLE, AvailableState(self.available, datetime.now(UTC))
+        )
+        return states
+
+    def __getattr__(self, name: str) -> Callable[..., Coroutine[Any, Any, Any]]:
+        """Return a command which is acknowledged right away."""
+        if not name.startswith(COMMAND_PREFIXES) and name != "ping_update":
+            raise AttributeError(name)
+
+        async def async_command(*args: Any) -> Any:
+            return args[0] if args else True
+
+        return async_command
+
+
+class ReplayStick(SimulatedStick):
+    """Stick of a replay session, with the recorded Stick properties."""
+
+    def __init__(
+        self, session: ReplaySession, port: str | None = None, **kwargs: Any
+    ) -> None:
+        """Initialize the replayed Stick."""
+        super().__init__(session, port, **kwargs)  # type: ignore[arg-type]
+        stick = session.header["stick"]
+        self.mac_stick = stick["mac_stick"]
+        self.hardware = stick["hardware"]
+        self.firmware = stick["firmware"]
+        self.name = stick["name"]
+
+
+class ReplaySession:
+    """Recorded network behind one replayed Stick."""
+
+    def __init__(self, path: str | Path, speed: float = 1.0) -> None:
+        """Load a recording, replaying it speed times faster than recorded."""
+        self.header, self.records = load_traffic(path)
+        self.speed = speed
+        self.coordinator_mac: str = self.header["stick"]["mac_coordinator"]
+        self.nodes: dict[str, ReplayNode] = {
+            mac: ReplayNode(self, node_info, speed)
+            for mac, node_info in self.header["nodes"].items()
+        }
+        responses: dict[str, list[TrafficRecord]] = defaultdict(list)
+        for record in self.records:
+            if record.kind == NODE_EVENT and record.node_info is not None:
+                # Nodes joining while recording are part of the network as well
+                if record.mac not in self.nodes:
+                    self.nodes[record.mac] = ReplayNode(self, record.node_info, speed)
+                if record.event == NodeEvent.LOADED:
+                    self.nodes[record.mac]._recorded_info = record.node_info
+            elif record.kind in (RESPONSE, ERROR):
+                responses[record.mac].append(record)
+        for mac, node_responses in responses.items():
+            if mac in self.nodes:
+                self.nodes[mac].responses = node_responses
+        self.stick = ReplayStick(self)
+
+    def create_stick(self, port: str | None = None, **kwargs: Any) -> ReplayStick:
+        """Return the Stick of this session, used in place of the Stick class."""
+        self.stick = ReplayStick(self, port, **kwargs)
+        return self.stick
+
+    def macs(self, node_type: NodeType) -> list[str]:
+        """Return the macs of all nodes of a type."""
+        return [
+            mac
+            for mac, node in self.nodes.items()
+            if node.node_info.node_type == node_type
+        ]
+
+    async def async_replay(self) -> int:
+        """Push the recorded states on the recorded timeline, return the count."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        pushed = 0
+        for record in self.records:
+            if record.kind != PUSH or (node := self.nodes.get(record.mac)) is None:
+                continue
+            await asyncio.sleep(
+                max(0.0, start + record.time / self.speed - loop.time())
+            )
+            for feature, state in record.states.items():
+                await node.async_push(feature, state)
+                pushed += 1
+        return pushed
@@ -0,0 +1,456 @@
+"""Simulated Plugwise USB-Stick and node network for the integration tests.
+
+The simulated Stick implements the part of the plugwise_usb Stick API used by
+the integration, so the full setup runs without a serial port. Each node
+answers requests after its latency plus a random jitter, and drops a request
+(raising NodeTimeout) at its drop rate. Battery powered nodes answer from
+their cached states, like the library does.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Coroutine
+from dataclasses import dataclass, field, replace
+from datetime import UTC, datetime
+import random
+from typing import Any
+
+from plugwise_usb.api import (
+    AvailableState,
+    BatteryConfig,
+    EnergyStatistics,
+    MotionConfig,
+    MotionSensitivity,
+    MotionState,
+    NetworkStatistics,
+    NodeEvent,
+    NodeFeature,
+    NodeInfo,
+    NodeType,
+    PowerStatistics,
+    RelayConfig,
+    RelayLock,
+    RelayState,
+    SenseHysteresisConfig,
+    SenseStatistics,
+)
+from plugwise_usb.exceptions import NodeError, NodeTimeout
+
+STICK_MAC = "000D6F0000000001"
+FIRMWARE = datetime(2011, 6, 27, 8, 47, 37, tzinfo=UTC)
+
+BASE_FEATURES = (NodeFeature.AVAILABLE, NodeFeature.INFO, NodeFeature.PING)
+CIRCLE_FEATURES = (
+    *BASE_FEATURES,
+    NodeFeature.CIRCLE,
+    NodeFeature.RELAY,
+    NodeFeature.RELAY_INIT,
+    NodeFeature.RELAY_LOCK,
+    NodeFeature.ENERGY,
+    NodeFeature.POWER,
+)
+SED_FEATURES = (*BASE_FEATURES, NodeFeature.BATTERY)
+
+# Model name, features and battery powered per simulated node type
+NODE_TYPES: dict[NodeType, tuple[str, tuple[NodeFeature, ...], bool]] = {
+    NodeType.CIRCLE_PLUS: (
+        "Circle+",
+        (*CIRCLE_FEATURES, NodeFeature.CIRCLEPLUS),
+        False,
+    ),
+    NodeType.CIRCLE: ("Circle", CIRCLE_FEATURES, False),
+    NodeType.STEALTH: ("Stealth", CIRCLE_FEATURES, False),
+    NodeType.SCAN: (
+        "Scan",
+        (*SED_FEATURES, NodeFeature.MOTION, NodeFeature.MOTION_CONFIG),
+        True,
+    ),
+    NodeType.SENSE: (
+        "Sense",
+        (*SED_FEATURES, NodeFeature.SENSE, NodeFeature.SENSE_HYSTERESIS),
+        True,
+    ),
+    NodeType.SWITCH: ("Switch", (*SED_FEATURES, NodeFeature.SWITCH), True),
+}
+
+# Node methods which only acknowledge a command
+COMMAND_PREFIXES = ("set_", "enable_", "energy_reset", "scan_calibrate")
+
+
+@dataclass(kw_only=True)
+class SimulatedNodeConfig:
+    """Timing and reliability of one simulated node."""
+
+    latency: float = 0.01  # seconds until a request is answered
+    jitter: float = 0.0  # maximum random deviation of the latency
+    drop_rate: float = 0.0  # fraction of requests which time out
+    load_time: float = 0.0  # seconds it takes to load the node
+
+
+@dataclass(kw_only=True)
+class SimulatedNetworkConfig:
+    """Composition of a simulated network, the Circle+ is always included."""
+
+    circles: int = 1
+    stealths: int = 0
+    scans: int = 0
+    senses: int = 0
+    switches: int = 0
+    node: SimulatedNodeConfig = field(default_factory=SimulatedNodeConfig)
+    # Requests the Stick handles at the same time, others wait for the link
+    link_concurrency: int = 4
+    seed: int = 0
+
+
+class SimulatedNode:
+    """Simulated Plugwise node."""
+
+    def __init__(
+        self,
+        network: SimulatedNetwork,
+        mac: str,
+        node_type: NodeType,
+        config: SimulatedNodeConfig,
+    ) -> None:
+        """Initialize a simulated node."""
+        self._network = network
+        self.mac = mac
+        self.node_type = node_type
+        self.config = config
+        model, self._features, battery_powered = NODE_TYPES[node_type]
+        self._model = model
+        self.node_info = NodeInfo(
+            mac=mac, node_type=node_type, is_battery_powered=battery_powered
+        )
+        self.is_loaded = False
+        self.initialized = False
+        self.available = False
+        self.requests = 0
+        self.dropped = 0
+        self.loads = 0
+        self.energy_intervals = (60, 0)
+        self.requested_features: tuple[NodeFeature, ...] = ()
+        self._subscribers: list[
+            tuple[Callable[[NodeFeature, Any], Coroutine[Any, Any, None]], tuple]
+        ] = []
+        self.states: dict[NodeFeature, Any] = self._initial_states()
+
+    @property
+    def features(self) -> tuple[NodeFeature, ...]:
+        """Return the supported features, only known once loaded."""
+        return self.node_info.features
+
+    @property
+    def name(self) -> str:
+        """Return the name of the node."""
+        return self.node_info.name or self.mac
+
+    def _initial_states(self) -> dict[NodeFeature, Any]:
+        """Return the states the node starts with."""
+        now = datetime.now(UTC)
+        states: dict[NodeFeature, Any] = {
+            NodeFeature.PING: NetworkStatistics(now, -60, -60, 20),
+        }
+        if NodeFeature.POWER in self._features:
+            power = self._network.random.uniform(0, 2000)
+            states[NodeFeature.POWER] = PowerStatistics(power, power, now)
+            states[NodeFeature.RELAY] = RelayState(True, now)
+            states[NodeFeature.RELAY_INIT] = RelayConfig(True)
+            states[NodeFeature.RELAY_LOCK] = RelayLock(False)
+            hour = now.replace(minute=0, second=0, microsecond=0)
+            states[NodeFeature.ENERGY] = EnergyStatistics(
+                hour_consumption=0.0,
+                hour_consumption_reset=hour,
+                day_consumption=0.0,
+                day_consumption_reset=hour.replace(hour=0),
+            )
+        if NodeFeature.BATTERY in self._features:
+            states[NodeFeature.BATTERY] = BatteryConfig(
+                awake_duration=10,
+                clock_interval=25200,
+                clock_sync=False,
+                maintenance_interval=60,
+                sleep_duration=60,
+            )
+        if NodeFeature.MOTION in self._features:
+            states[NodeFeature.MOTION] = MotionState(False, now)
+            states[NodeFeature.MOTION_CONFIG] = MotionConfig(
+                daylight_mode=False,
+                reset_timer=10,
+                sensitivity_level=MotionSensitivity.MEDIUM,
+            )
+        if NodeFeature.SENSE in self._features:
+            states[NodeFeature.SENSE] = SenseStatistics(temperature=20.0, humidity=50.0)
+            states[NodeFeature.SENSE_HYSTERESIS] = SenseHysteresisConfig()
+        return states
+
+    async def _async_exchange(self) -> None:
+        """Wait for the answer to one request, or time out at the drop rate."""
+        async with self._network.link:
+            self.requests += 1
+            self._network.requests += 1
+            delay = self.config.latency + self._network.random.uniform(
+                -self.config.jitter, self.config.jitter
+            )
+            await asyncio.sleep(max(0.0, delay))
+            if self._network.random.random() < self.config.drop_rate:
+                self.dropped += 1
+                self._network.dropped += 1
+                raise NodeTimeout(f"No response from simulated node {self.mac}")
+
+    async def load(self) -> bool:
+        """Load the node, like the library this notifies the LOADED event."""
+        self.loads += 1
+        await asyncio.sleep(self.config.load_time)
+        self.node_info.features = self._features
+        self.node_info.name = f"{self._model} {self.mac[-5:]}"
+        self.node_info.model = self._model
+        self.node_info.model_type = None
+        self.node_info.version = "000000070008"
+        self.node_info.firmware = FIRMWARE
+        self.node_info.timestamp = datetime.now(UTC)
+        self.is_loaded = True
+        self.initialized = True
+        self.available = True
+        await self._network.stick.async_notify(NodeEvent.LOADED, self.mac)
+        return True
+
+    def subscribe_to_feature_update(
+        self,
+        node_feature_callback: Callable[[NodeFeature, Any], Coroutine[Any, Any, None]],
+        features: tuple[NodeFeature, ...] | NodeFeature,
+    ) -> Callable[[], None]:
+        """Subscribe to pushed state updates of features."""
+        if isinstance(features, NodeFeature):
+            features = (features,)
+        subscriber = (node_feature_callback, tuple(features))
+        self._subscribers.append(subscriber)
+        return lambda: self._subscribers.remove(subscriber)
+
+    async def async_push(self, feature: NodeFeature, state: Any) -> None:
+        """Push a state update to the subscribers of the feature."""
+        self.states[feature] = state
+        await asyncio.gather(
+            *(
+                node_feature_callback(feature, state)
+                for node_feature_callback, features in list(self._subscribers)
+                if feature in features
+            )
+        )
+
+    async def get_state(
+        self, features: tuple[NodeFeature, ...]
+    ) -> dict[NodeFeature, Any]:
+        """Return the state of the requested features."""
+        self.requested_features = features
+        for feature in features:
+            if feature not in self.features:
+                raise NodeError(f"Feature {feature} not supported by {self.mac}")
+        if not self.node_info.is_battery_powered:
+            await self._async_exchange()
+            self._drift()
+        states = {
+            feature: self.states.get(feature)
+            for feature in features
+            if feature != NodeFeature.AVAILABLE
+        }
+        states[NodeFeature.AVAILABLE] = AvailableState(
+            self.available, datetime.now(UTC)
+        )
+        return states
+
+    def _drift(self) -> None:
+        """Change the power usage a little and accumulate energy."""
+        if (power := self.states.get(NodeFeature.POWER)) is None:
+            return
+        now = datetime.now(UTC)
+        value = max(0.0, power.last_second + self._network.random.uniform(-5, 5))
+        self.states[NodeFeature.POWER] = PowerStatistics(value, value, now)
+        energy = self.states[NodeFeature.ENERGY]
+        self.states[NodeFeature.ENERGY] = replace(
+            energy,
+            hour_consumption=(energy.hour_consumption or 0.0) + value / 3600000,
+            day_consumption=(energy.day_consumption or 0.0) + value / 3600000,
+        )
+
+    async def set_relay(self, state: bool) -> bool:
+        """Switch the relay, a locked relay keeps its state like with the library."""
+        await self._async_exchange()
+        if self.states[NodeFeature.RELAY_LOCK].state:
+            return self.states[NodeFeature.RELAY].state
+        self.states[NodeFeature.RELAY] = RelayState(state, datetime.now(UTC))
+        return state
+
+    async def ping_update(self) -> NetworkStatistics:
+        """Ping the node."""
+        await self._async_exchange()
+        return self.states[NodeFeature.PING]
+
+    def __getattr__(self, name: str) -> Callable[..., Awaitable[Any]]:
+        """Return a command which is acknowledged after the node latency."""
+        if not name.startswith(COMMAND_PREFIXES):
+            raise AttributeError(name)
+
+        async def async_command(*args: Any) -> Any:
+            await self._async_exchange()
+            return args[0] if args else True
+
+        return async_command
+
+
+class SimulatedStick:
+    """Simulated Plugwise USB-Stick, created by the integration."""
+
+    def __init__(
+        self, network: SimulatedNetwork, port: str | None = None, **_: Any
+    ) -> None:
+        """Initialize the simulated Stick."""
+        self._network = network
+        self.port = port
+        self.cache_folder: str | None = None
+        self.is_connected = False
+        self.is_initialized = False
+        self.network_discovered = False
+        self.nodes: dict[str, SimulatedNode] = {}
+        self._subscribers: dict[
+            Callable[[], None],
+            tuple[Callable[[NodeEvent, str], Coroutine[Any, Any, None]], tuple],
+        ] = {}
+
+    mac_stick = STICK_MAC
+    hardware = "070085"
+    firmware = FIRMWARE
+    name = "Stick 00001"
+
+    @property
+    def mac_coordinator(self) -> str:
+        """Return the mac of the Circle+."""
+        return self._network.coordinator_mac
+
+    @property
+    def network_state(self) -> bool:
+        """Return if the network is online."""
+        return self.is_connected
+
+    @property
+    def joined_nodes(self) -> int:
+        """Return the number of registered nodes, including the Circle+."""
+        return len(self._network.nodes)
+
+    async def connect(self, port: str | None = None) -> None:
+        """Open the simulated serial connection."""
+        self.is_connected = True
+
+    async def initialize(self, create_root_cache_folder: bool = False) -> None:
+        """Initialize the simulated Stick."""
+        self.is_initialized = True
+
+    async def disconnect(self) -> None:
+        """Close the simulated serial connection."""
+        self.is_connected = False
+        self._subscribers.clear()
+
+    def subscribe_to_node_events(
+        self,
+        node_event_callback: Callable[[NodeEvent, str], Coroutine[Any, Any, None]],
+        events: tuple[NodeEvent, ...],
+    ) -> Callable[[], None]:
+        """Subscribe to node events."""
+
+        def unsubscribe() -> None:
+            self._subscribers.pop(unsubscribe, None)
+
+        self._subscribers[unsubscribe] = (node_event_callback, events)
+        return unsubscribe
+
+    async def async_notify(self, event: NodeEvent, mac: str) -> None:
+        """Notify the subscribers of a node event."""
+        await asyncio.gather(
+            *(
+                node_event_callback(event, mac)
+                for node_event_callback, events in list(self._subscribers.values())
+                if event in events
+            )
+        )
+
+    async def _async_discover(self, mac: str) -> None:
+        """Make a registered node known to the integration."""
+        if mac in self.nodes:
+            return
+        self.nodes[mac] = self._network.nodes[mac]
+        await self.async_notify(NodeEvent.DISCOVERED, mac)
+
+    async def discover_coordinator(self, load: bool = False) -> None:
+        """Discover the Circle+."""
+        await self._async_discover(self.mac_coordinator)
+        if load and not self.nodes[self.mac_coordinator].is_loaded:
+            await self.nodes[self.mac_coordinator].load()
+
+    async def discover_nodes(self, load: bool = False) -> None:
+        """Discover all registered nodes and optionally load them at once."""
+        await self.discover_coordinator(load=load)
+        for mac in self._network.nodes:
+            await self._async_discover(mac)
+        if load:
+            await asyncio.gather(
+                *(node.load() for node in self.nodes.values() if not node.is_loaded)
+            )
+        self.network_discovered = True
+
+    async def set_energy_intervals(
+        self, mac: str, consumption: int, production: int
+    ) -> bool:
+        """Set the energy log intervals of a node."""
+        node = self.nodes.get(mac)
+        if node is None or NodeFeature.ENERGY not in node.features:
+            raise NodeError(f"{mac} is not a known node with energy logs")
+        if production % consumption:
+            raise NodeError("Production interval must be a multiple of consumption")
+        await node._async_exchange()
+        node.energy_intervals = (consumption, production)
+        return True
+
+    async def unregister_node(self, mac: str) -> None:
+        """Remove a node from the network."""
+        self.nodes.pop(mac, None)
+        self._network.nodes.pop(mac, None)
+
+
+class SimulatedNetwork:
+    """Network of simulated nodes behind one simulated Stick."""
+
+    def __init__(self, config: SimulatedNetworkConfig | None = None) -> None:
+        """Initialize the simulated network."""
+        self.config = config or SimulatedNetworkConfig()
+        self.random = random.Random(self.config.seed)
+        self.link = asyncio.Semaphore(self.config.link_concurrency)
+        self.requests = 0
+        self.dropped = 0
+        self.nodes: dict[str, SimulatedNode] = {}
+        self.coordinator_mac = self._add(NodeType.CIRCLE_PLUS)
+        for node_type, count in (
+            (NodeType.CIRCLE, self.config.circles),
+            (NodeType.STEALTH, self.config.stealths),
+            (NodeType.SCAN, self.config.scans),
+            (NodeType.SENSE, self.config.senses),
+            (NodeType.SWITCH, self.config.switches),
+        ):
+            for _ in range(count):
+                self._add(node_type)
+        self.stick = SimulatedStick(self)
+
+    def _add(self, node_type: NodeType) -> str:
+        """Add a node of the given type, return its mac."""
+        mac = f"000D6F00{len(self.nodes) + 0x10:08X}"
+        self.nodes[mac] = SimulatedNode(self, mac, node_type, self.config.node)
+        return mac
+
+    def create_stick(self, port: str | None = None, **kwargs: Any) -> SimulatedStick:
+        """Return the Stick of this network, used in place of the Stick class."""
+        self.stick = SimulatedStick(self, port, **kwargs)
+        return self.stick
+
+    def macs(self, node_type: NodeType) -> list[str]:
+        """Return the macs of all nodes of a type."""
+        return [mac for mac, node in self.nodes.items() if node.node_type == node_type]
@@ -0,0 +1,269 @@
+"""Benchmarks of the Plugwise USB integration on a simulated network.
+
+Run with `pytest tests/test_benchmark.py --benchmark --benchmark-json=out.json`,
+optionally with `--benchmark-nodes=N`. Times are in seconds.
+"""
+
+import asyncio
+from collections.abc import Generator
+from dataclasses import replace
+from statistics import mean, median
+from time import perf_counter
+from unittest.mock import patch
+
+from plugwise_usb.api import MotionState, NodeFeature, NodeType
+import pytest
+
+from custom_components.plugwise_usb.const import (
+    CONF_NETWORK_REFRESH,
+    CONF_POLL_RATE,
+    CONF_PUSH_WINDOW,
+    CONF_USB_PATH,
+    DOMAIN,
+    MAX_POLL_RATE,
+    NODES,
+    REQUEST_QUEUE,
+    SCHEDULER,
+)
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .conftest import STICK_SETUP_MOCK, TEST_MAC, TEST_USB_PATH
+from .simulator import SimulatedNetwork, SimulatedNetworkConfig, SimulatedNodeConfig
+
+pytestmark = pytest.mark.benchmark
+
+PUSH_EVENTS = 100
+WRITE_ROUNDS = 5
+
+
+@pytest.fixture
+def benchmark_network(pytestconfig: pytest.Config) -> Generator[SimulatedNetwork]:
+    """Return a network of mostly Circles, with some of every other node type."""
+    nodes = pytestconfig.getoption("--benchmark-nodes")
+    scans = max(1, nodes // 25)
+    senses = max(1, nodes // 40)
+    switches = max(1, nodes // 50)
+    stealths = nodes // 20
+    network = SimulatedNetwork(
+        SimulatedNetworkConfig(
+            circles=max(0, nodes - 1 - scans - senses - switches - stealths),
+            stealths=stealths,
+            scans=scans,
+            senses=senses,
+            switches=switches,
+            node=SimulatedNodeConfig(latency=0.005, jitter=0.002),
+        )
+    )
+    with patch(STICK_SETUP_MOCK, network.create_stick):
+        yield network
+
+
+def _config_entry(network_refresh: bool = False) -> MockConfigEntry:
+    """Return the config entry of the benchmarked integration."""
+    return MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_USB_PATH: TEST_USB_PATH},
+        # Pace requests as fast as allowed, the simulated link is the limit, and
+        # measure every push instead of coalescing them
+        options={
+            CONF_NETWORK_REFRESH: network_refresh,
+            CONF_POLL_RATE: MAX_POLL_RATE,
+            CONF_PUSH_WINDOW: 0,
+        },
+        unique_id=TEST_MAC,
+    )
+
+
+def _all_entities_have_state(
+    hass: HomeAssistant, config_entry: MockConfigEntry
+) -> bool:
+    """Return True when every enabled entity of the entry has a state."""
+    entries = er.async_entries_for_config_entry(
+        er.async_get(hass), config_entry.entry_id
+    )
+    return all(
+        hass.states.get(entry.entity_id) is not None
+        for entry in entries
+        if not entry.disabled
+    )
+
+
+async def _async_setup(
+    hass: HomeAssistant, network: SimulatedNetwork, config_entry: MockConfigEntry
+) -> tuple[float, float]:
+    """Set up the integration, return setup time and time to all entities."""
+    config_entry.add_to_hass(hass)
+    start = perf_counter()
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    setup_time = perf_counter() - start
+    async with asyncio.timeout(120):
+        while not (
+            network.stick.network_discovered
+            and _all_entities_have_state(hass, config_entry)
+        ):
+            await asyncio.sleep(0.001)
+    return setup_time, perf_counter() - start
+
+
+async def test_benchmark_setup(
+    hass: HomeAssistant,
+    benchmark_network: SimulatedNetwork,
+    benchmark_results: dict[str, dict[str, float]],
+) -> None:
+    """Measure the setup time and the time until all entities have a state."""
+    config_entry = _config_entry()
+    setup_time, all_entities_time = await _async_setup(
+        hass, benchmark_network, config_entry
+    )
+    benchmark_results["setup"] = {
+        "setup_time": setup_time,
+        "time_to_all_entities": all_entities_time,
+        "entities": len(hass.states.async_all()),
+    }
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+@pytest.mark.parametrize("network_refresh", [False, True])
+async def test_benchmark_poll_sweep(
+    hass: HomeAssistant,
+    benchmark_network: SimulatedNetwork,
+    benchmark_results: dict[str, dict[str, float]],
+    network_refresh: bool,
+) -> None:
+    """Measure one refresh of all mains powered nodes.
+
+    Both modes start every refresh at once, without the spacing of the
+    scheduler, so only the number of requests in flight of each mode differs.
+    """
+    config_entry = _config_entry(network_refresh)
+    await _async_setup(hass, benchmark_network, config_entry)
+    scheduler = config_entry.runtime_data[SCHEDULER]
+    await scheduler.async_stop()
+    coordinators = [
+        coordinator
+        for coordinator in config_entry.runtime_data[NODES].values()
+        if not coordinator.node_info.is_battery_powered
+    ]
+    requests = benchmark_network.requests
+
+    start = perf_counter()
+    if network_refresh:
+        await scheduler.network_coordinator.async_refresh()
+    else:
+        await asyncio.gather(
+            *(coordinator.async_refresh() for coordinator in coordinators)
+        )
+    sweep_time = perf_counter() - start
+
+    assert all(coordinator.last_update_success for coordinator in coordinators)
+    benchmark_results[
+        "network_poll_sweep" if network_refresh else "node_poll_sweep"
+    ] = {
+        "nodes": len(coordinators),
+        "max_in_flight": config_entry.runtime_data[REQUEST_QUEUE].max_in_flight,
+        "requests": benchmark_network.requests - requests,
+        "sweep_time": sweep_time,
+        "nodes_per_second": len(coordinators) / sweep_time,
+    }
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_benchmark_push_latency(
+    hass: HomeAssistant,
+    benchmark_network: SimulatedNetwork,
+    benchmark_results: dict[str, dict[str, float]],
+) -> None:
+    """Measure the time from a pushed motion event until its state is written."""
+    config_entry = _config_entry()
+    await _async_setup(hass, benchmark_network, config_entry)
+    entity_registry = er.async_get(hass)
+    scans = {
+        entity_registry.async_get_entity_id(
+            "binary_sensor", DOMAIN, f"{mac}-motion"
+        ): benchmark_network.nodes[mac]
+        for mac in benchmark_network.macs(NodeType.SCAN)
+    }
+    written: dict[str, float] = {}
+
+    @callback
+    def _async_state_changed(event: Event) -> None:
+        if event.data["entity_id"] in scans:
+            written[event.data["entity_id"]] = perf_counter()
+
+    unsubscribe = hass.bus.async_listen(EVENT_STATE_CHANGED, _async_state_changed)
+    latencies: list[float] = []
+    for index in range(PUSH_EVENTS):
+        entity_id, node = list(scans.items())[index % len(scans)]
+        motion = (index // len(scans)) % 2 == 0
+        written.pop(entity_id, None)
+        start = perf_counter()
+        await node.async_push(NodeFeature.MOTION, MotionState(motion, dt_util.utcnow()))
+        await hass.async_block_till_done()
+        latencies.append(written[entity_id] - start)
+    unsubscribe()
+
+    benchmark_results["push_latency"] = {
+        "events": PUSH_EVENTS,
+        "mean": mean(latencies),
+        "median": median(latencies),
+        "max": max(latencies),
+    }
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_benchmark_state_writes(
+    hass: HomeAssistant,
+    benchmark_network: SimulatedNetwork,
+    benchmark_results: dict[str, dict[str, float]],
+) -> None:
+    """Measure the state writes per second of coordinator updates."""
+    config_entry = _config_entry()
+    await _async_setup(hass, benchmark_network, config_entry)
+    await config_entry.runtime_data[SCHEDULER].async_stop()
+    coordinators = [
+        coordinator
+        for coordinator in config_entry.runtime_data[NODES].values()
+        if NodeFeature.POWER in coordinator.features
+    ]
+    await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+    writes = 0
+
+    @callback
+    def _async_state_changed(_: Event) -> None:
+        nonlocal writes
+        writes += 1
+
+    unsubscribe = hass.bus.async_listen(EVENT_STATE_CHANGED, _async_state_changed)
+    updates = 0
+    start = perf_counter()
+    for round_index in range(WRITE_ROUNDS):
+        for coordinator in coordinators:
+            power = coordinator.data[NodeFeature.POWER]
+            step = 100.0 if round_index % 2 == 0 else -100.0
+            coordinator.async_set_updated_data(
+                {
+                    **coordinator.data,
+                    NodeFeature.POWER: replace(
+                        power,
+                        last_second=power.last_second + step,
+                        last_8_seconds=power.last_8_seconds + step,
+                    ),
+                }
+            )
+            updates += 1
+    await hass.async_block_till_done()
+    elapsed = perf_counter() - start
+    unsubscribe()
+
+    benchmark_results["state_writes"] = {
+        "coordinator_updates": updates,
+        "state_writes": writes,
+        "elapsed": elapsed,
+        "updates_per_second": updates / elapsed,
+        "writes_per_second": writes / elapsed,
+    }
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
@@ -0,0 +1,177 @@
+"""Test the write-behind of the Plugwise USB cache files."""
+
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from plugwise_usb.nodes.helpers.cache import NodeCache
+
+from custom_components.plugwise_usb.cache_writer import (
+    HOOKED_METHODS,
+    PlugwiseUSBCacheWriter,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+FIRST_MAC = "0123456789ABCDEF"
+SECOND_MAC = "FEDCBA9876543210"
+
+
+def _files(folder: Path) -> list[str]:
+    """Return the names of the files in folder."""
+    return sorted(path.name for path in folder.iterdir())
+
+
+async def _node_cache(
+    folder: Path, mac: str, writer: PlugwiseUSBCacheWriter | None = None
+) -> NodeCache:
+    """Return an initialized node cache in folder, added to writer if given."""
+    cache = NodeCache(mac, str(folder))
+    await cache.initialize_cache()
+    if writer is not None:
+        writer.async_add_cache(cache)
+    return cache
+
+
+async def test_writes_are_collected(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Test the writes of each file are merged and written in one flush."""
+    writer = PlugwiseUSBCacheWriter(hass, str(tmp_path), 60)
+    writer.async_start()
+    first = await _node_cache(tmp_path, FIRST_MAC, writer)
+    second = await _node_cache(tmp_path, SECOND_MAC, writer)
+    for log in range(10):
+        first.update_state(f"log_{log}", str(log))
+        await first.save_cache()
+    second.update_state("relay", "True")
+    await second.save_cache()
+
+    assert not _files(tmp_path)
+    assert (await first.read_cache())["log_9"] == "9"
+    assert writer.as_dict()["pending_files"] == 2
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done()
+    # Wait for the files written by the flush the timer started
+    await writer.async_flush()
+
+    assert _files(tmp_path) == [
+        f"{FIRST_MAC}.cache",
+        f"{SECOND_MAC}.cache",
+    ]
+    restored = await _node_cache(tmp_path, FIRST_MAC)
+    await restored.restore_cache()
+    assert restored.states == {f"log_{log}": str(log) for log in range(10)}
+    summary = writer.as_dict()
+    assert summary["collected_writes"] == 11
+    assert summary["files_written"] == 2
+    assert summary["flushes"] == 1
+    assert summary["pending_files"] == 0
+
+    await writer.async_stop()
+
+
+async def test_rewrite_and_delete(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Test a rewrite replaces all keys and a delete drops the pending changes."""
+    writer = PlugwiseUSBCacheWriter(hass, str(tmp_path), 60)
+    writer.async_start()
+    cache = await _node_cache(tmp_path, FIRST_MAC, writer)
+    await cache.write_cache({"first": "1", "second": "2"})
+    await writer.async_flush()
+
+    await cache.write_cache({"third": "3"})
+    await cache.write_cache({"first": "one"}, rewrite=True)
+    await cache.write_cache({"fourth": "4"})
+    assert await cache.read_cache() == {"first": "one", "fourth": "4"}
+    await writer.async_flush()
+    assert await cache.read_cache() == {"first": "one", "fourth": "4"}
+
+    await cache.write_cache({"fifth": "5"})
+    await cache.clear_cache()
+    await writer.async_flush()
+    assert not _files(tmp_path)
+    assert writer.files_written == 2
+
+    await writer.async_stop()
+
+
+async def test_stop_writes_through(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Test stopping writes the pending changes and restores the caches."""
+    writer = PlugwiseUSBCacheWriter(hass, str(tmp_path), 60)
+    cache = await _node_cache(tmp_path, FIRST_MAC, writer)
+    other = await _node_cache(tmp_path, SECOND_MAC)
+    writer.async_start()
+    assert "write_cache" in vars(cache)
+
+    # Only the writes of the added caches are collected
+    await other.write_cache({"relay": "True"})
+    assert (tmp_path / f"{SECOND_MAC}.cache").exists()
+    await cache.write_cache({"relay": "False"})
+    assert not (tmp_path / f"{FIRST_MAC}.cache").exists()
+
+    await writer.async_stop()
+    assert not set(HOOKED_METHODS) & set(vars(cache))
+    assert (tmp_path / f"{FIRST_MAC}.cache").read_text() == "relay;False\n"
+
+    await cache.write_cache({"relay": "True"})
+    assert (tmp_path / f"{FIRST_MAC}.cache").read_text() == "relay;True\n"
+    assert writer.collected == 1
+
+    # A restart hooks the added caches again
+    writer.async_start()
+    await cache.write_cache({"relay": "False"})
+    assert writer.collected == 2
+    await writer.async_stop()
+    assert (tmp_path / f"{FIRST_MAC}.cache").read_text() == "relay;False\n"
+
+
+async def test_failed_write_is_retried(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Test the changes of a file which failed to write are written later."""
+    writer = PlugwiseUSBCacheWriter(hass, str(tmp_path), 60)
+    writer.async_start()
+    cache = await _node_cache(tmp_path, FIRST_MAC, writer)
+    await cache.write_cache({"first": "1"})
+    # A folder in place of the cache file makes the write fail
+    (blocked := tmp_path / f"{FIRST_MAC}.cache").mkdir()
+    assert not await writer.async_flush()
+    assert writer.failed_writes == 1
+    assert writer.as_dict()["pending_files"] == 1
+
+    # Changes collected since are written together with the failed ones
+    await cache.write_cache({"second": "2"})
+    assert await cache.read_cache() == {"first": "1", "second": "2"}
+    blocked.rmdir()
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done()
+    await writer.async_flush()
+    assert blocked.read_text() == "first;1\nsecond;2\n"
+    assert writer.files_written == 1
+
+    # Stopping retries once more before giving up
+    await cache.write_cache({"third": "3"})
+    blocked.unlink()
+    blocked.mkdir()
+    await writer.async_stop()
+    assert writer.failed_writes == 3
+    assert writer.as_dict()["pending_files"] == 0
+
+
+async def test_node_caches(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Test only nodes with a library cache are hooked, others write through."""
+    writer = PlugwiseUSBCacheWriter(hass, str(tmp_path), 60)
+    writer.async_start()
+    writer.async_add_node(MagicMock(spec=["mac"], mac=FIRST_MAC))
+    writer.async_add_node(
+        MagicMock(spec=["mac", "_node_cache"], mac=FIRST_MAC, _node_cache=object())
+    )
+    assert writer.as_dict()["cache_files"] == 0
+
+    cache = await _node_cache(tmp_path, SECOND_MAC)
+    writer.async_add_node(
+        MagicMock(spec=["mac", "_node_cache"], mac=SECOND_MAC, _node_cache=cache)
+    )
+    assert writer.as_dict()["cache_files"] == 1
+    await cache.write_cache({"relay": "True"})
+    assert not (tmp_path / f"{SECOND_MAC}.cache").exists()
+    await writer.async_stop()
+    assert (tmp_path / f"{SECOND_MAC}.cache").read_text() == "relay;True\n"
@@ -7,7 +7,21 @@ from plugwise_usb.exceptions import StickError
 import pytest
 
 from custom_components.plugwise_usb.config_flow import CONF_MANUAL_PATH
-from custom_components.plugwise_usb.const import CONF_USB_PATH, DOMAIN
+from custom_components.plugwise_usb.const import (
+    CONF_CACHE_FLUSH_INTERVAL,
+    CONF_DISCOVERY_TIMEOUT,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_NETWORK_REFRESH,
+    CONF_POLL_INTERVAL,
+    CONF_POLL_RATE,
+    CONF_POWER_WINDOW,
+    CONF_PUSH_WINDOW,
+    CONF_UNAVAILABLE_GRACE,
+    CONF_UNAVAILABLE_POLLS,
+    CONF_USB_PATH,
+    DOMAIN,
+)
 from homeassistant.config_entries import SOURCE_USER, ConfigFlowResult
 from homeassistant.const import CONF_SOURCE
 from homeassistant.core import HomeAssistant
@@ -272,3 +286,73 @@ async def test_reconfigure_flow_errors(
     assert result.get("type") is FlowResultType.FORM
     assert result.get("errors") == {"base": reason}
     assert result.get("step_id") == "reconfigure"
+
+
+async def test_options_flow(
+    hass: HomeAssistant,
+    mock_setup_entry: AsyncMock,
+    mock_config_entry: MockConfigEntry,
+) -> None:
+    """Test the polling options flow."""
+    mock_config_entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(mock_config_entry.entry_id)
+    assert result.get("type") is FlowResultType.FORM
+    assert result.get("step_id") == "init"
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={CONF_POLL_INTERVAL: 30, CONF_POLL_RATE: 2.5},
+    )
+    assert result.get("type") is FlowResultType.CREATE_ENTRY
+    assert mock_config_entry.options == {
+        CONF_POLL_INTERVAL: 30,
+        CONF_MIN_POLL_INTERVAL: 10,
+        CONF_MAX_POLL_INTERVAL: 60,
+        CONF_POLL_RATE: 2.5,
+        CONF_NETWORK_REFRESH: False,
+        CONF_DISCOVERY_TIMEOUT: 0,
+        CONF_PUSH_WINDOW: 1.0,
+        CONF_UNAVAILABLE_POLLS: 3,
+        CONF_UNAVAILABLE_GRACE: 60,
+        CONF_POWER_WINDOW: 5,
+        CONF_CACHE_FLUSH_INTERVAL: 60,
+    }
+
+
+async def test_options_flow_out_of_range(
+    hass: HomeAssistant,
+    mock_setup_entry: AsyncMock,
+    mock_config_entry: MockConfigEntry,
+) -> None:
+    """Test the polling options flow rejects a too short interval."""
+    mock_config_entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(mock_config_entry.entry_id)
+    with pytest.raises(InvalidData):
+        await hass.config_entries.options.async_configure(
+            result["flow_id"],
+            user_input={CONF_POLL_INTERVAL: 1, CONF_POLL_RATE: 2.5},
+        )
+
+
+async def test_options_flow_invalid_range(
+    hass: HomeAssistant,
+    mock_setup_entry: AsyncMock,
+    mock_config_entry: MockConfigEntry,
+) -> None:
+    """Test the polling options flow rejects an interval outside its limits."""
+    mock_config_entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(mock_config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={
+            CONF_POLL_INTERVAL: 90,
+            CONF_MIN_POLL_INTERVAL: 10,
+            CONF_MAX_POLL_INTERVAL: 60,
+            CONF_POLL_RATE: 2.5,
+        },
+    )
+    assert result.get("type") is FlowResultType.FORM
+    assert result.get("errors") == {"base": "invalid_poll_range"}
@@ -0,0 +1,313 @@
+"""Test the Plugwise USB node coordinators."""
+
+import asyncio
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+from plugwise_usb.api import (
+    AvailableState,
+    MotionState,
+    NodeFeature,
+    NodeType,
+    PowerStatistics,
+    RelayState,
+)
+import pytest
+
+from custom_components.plugwise_usb.const import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_MIN_BACKOFF,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_UNAVAILABLE_POLLS,
+    DOMAIN,
+    NODES,
+    POLL_BOOST_DELAY,
+    SCHEDULER,
+)
+from custom_components.plugwise_usb.coordinator import PlugwiseUSBDataUpdateCoordinator
+from custom_components.plugwise_usb.metrics import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+)
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from .simulator import SimulatedNetwork, SimulatedNetworkConfig, SimulatedNodeConfig
+
+
+async def test_push_merge(
+    hass: HomeAssistant,
+    mock_node: MagicMock,
+    mock_node_coordinator: PlugwiseUSBDataUpdateCoordinator,
+) -> None:
+    """Test a push is merged into the states, only notifying its own listeners."""
+    coordinator = mock_node_coordinator
+    notified: list[NodeFeature] = []
+    for feature in (NodeFeature.POWER, NodeFeature.RELAY):
+        coordinator.async_add_listener(
+            lambda feature=feature: notified.append(feature), feature
+        )
+    await coordinator.async_refresh()
+    assert notified == [NodeFeature.POWER, NodeFeature.RELAY]
+    versions = coordinator.feature_versions.copy()
+
+    relay = RelayState(False, dt_util.utcnow())
+    await coordinator.async_push_event(NodeFeature.RELAY, relay)
+    assert coordinator.data[NodeFeature.POWER] == mock_node.states[NodeFeature.POWER]
+    assert coordinator.data[NodeFeature.RELAY] == relay
+    assert coordinator.feature_versions - versions == {NodeFeature.RELAY: 1}
+    assert notified[2:] == [NodeFeature.RELAY]
+
+    # The same state again does not change the version and is dropped
+    await coordinator.async_push_event(NodeFeature.RELAY, relay)
+    assert coordinator.feature_versions - versions == {NodeFeature.RELAY: 1}
+    assert notified[2:] == [NodeFeature.RELAY]
+
+
+async def test_adaptive_poll_interval(
+    hass: HomeAssistant,
+    mock_node: MagicMock,
+    mock_node_coordinator: PlugwiseUSBDataUpdateCoordinator,
+) -> None:
+    """Test the poll interval follows the volatility of the power usage."""
+    coordinator = mock_node_coordinator
+    coordinator.async_set_poll_limits(
+        timedelta(seconds=DEFAULT_POLL_INTERVAL),
+        timedelta(seconds=DEFAULT_MIN_POLL_INTERVAL),
+        timedelta(seconds=DEFAULT_MAX_POLL_INTERVAL),
+    )
+    remove_listener = coordinator.async_add_listener(lambda: None, NodeFeature.POWER)
+
+    def _set_power(power: float) -> None:
+        mock_node.states[NodeFeature.POWER] = PowerStatistics(
+            power, power, dt_util.utcnow()
+        )
+
+    # A flat power usage is polled less often, up to the maximal interval
+    _set_power(0.0)
+    for _ in range(6):
+        await coordinator.async_refresh()
+    assert coordinator.poll_interval == timedelta(seconds=DEFAULT_MAX_POLL_INTERVAL)
+
+    # A step change is polled as often as allowed at once
+    _set_power(500.0)
+    await coordinator.async_refresh()
+    assert coordinator.poll_interval == timedelta(seconds=DEFAULT_MIN_POLL_INTERVAL)
+
+    # As is a relay command, with the next poll moved forward
+    coordinator.poll_interval = timedelta(seconds=DEFAULT_MAX_POLL_INTERVAL)
+    scheduler = coordinator.config_entry.runtime_data[SCHEDULER] = MagicMock()
+    coordinator.async_boost_polling()
+    assert coordinator.poll_interval == timedelta(seconds=DEFAULT_MIN_POLL_INTERVAL)
+    scheduler.async_reschedule.assert_called_once_with(mock_node.mac, POLL_BOOST_DELAY)
+    remove_listener()
+
+
+@pytest.mark.parametrize(
+    "simulated_network", [SimulatedNetworkConfig(circles=1)], indirect=True
+)
+async def test_feature_refresh_cadences(
+    hass: HomeAssistant,
+    simulated_integration: MockConfigEntry,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test slowly changing features are only requested when due."""
+    await simulated_integration.runtime_data[SCHEDULER].async_stop()
+    mac = simulated_network.macs(NodeType.CIRCLE)[0]
+    coordinator = simulated_integration.runtime_data[NODES][mac]
+    node = simulated_network.nodes[mac]
+    # Like the round trip time sensor, which is disabled by default
+    remove_listener = coordinator.async_add_listener(lambda: None, NodeFeature.PING)
+    await coordinator.async_refresh()
+    assert {
+        NodeFeature.PING,
+        NodeFeature.POWER,
+        NodeFeature.ENERGY,
+        NodeFeature.RELAY,
+    } <= set(node.requested_features)
+
+    # Energy is requested with power at every poll, for the hour rollover
+    for _ in range(3):
+        await coordinator.async_refresh()
+        assert {NodeFeature.POWER, NodeFeature.ENERGY, NodeFeature.RELAY} <= set(
+            node.requested_features
+        )
+        assert NodeFeature.PING not in node.requested_features
+
+    coordinator.feature_updated[NodeFeature.PING] -= timedelta(seconds=301)
+    await coordinator.async_refresh()
+    assert NodeFeature.PING in node.requested_features
+
+    # A command makes its feature due at the next poll
+    coordinator.async_expire_feature(NodeFeature.PING)
+    await coordinator.async_refresh()
+    assert NodeFeature.PING in node.requested_features
+    await coordinator.async_refresh()
+    assert NodeFeature.PING not in node.requested_features
+
+    remove_listener()
+
+
+@pytest.mark.parametrize(
+    "simulated_network", [SimulatedNetworkConfig(circles=0, scans=1)], indirect=True
+)
+async def test_push_coalescing(
+    hass: HomeAssistant,
+    simulated_integration: MockConfigEntry,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test bursts of pushes are merged, without delaying the start of a motion."""
+    mac = simulated_network.macs(NodeType.SCAN)[0]
+    coordinator = simulated_integration.runtime_data[NODES][mac]
+    coordinator.push_window = 0.2
+    node = simulated_network.nodes[mac]
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "binary_sensor", DOMAIN, f"{mac}-motion"
+    )
+    written: list[str] = []
+
+    @callback
+    def _async_state_changed(event: Event) -> None:
+        if event.data["entity_id"] == entity_id:
+            written.append(event.data["new_state"].state)
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, _async_state_changed)
+
+    async def _async_motion(motion: bool) -> None:
+        await node.async_push(NodeFeature.MOTION, MotionState(motion, dt_util.utcnow()))
+        await hass.async_block_till_done()
+
+    await _async_motion(True)
+    assert written == ["on"]
+    # Chattering within the window only delivers its latest state, afterwards
+    for motion in (False, True, False):
+        await _async_motion(motion)
+    assert written == ["on"]
+    assert coordinator.coalesced_pushes == 3
+    await asyncio.sleep(0.3)
+    await hass.async_block_till_done()
+    assert written == ["on", "off"]
+
+    # The start of a motion is delivered at once, even within the window
+    await _async_motion(True)
+    assert written == ["on", "off", "on"]
+
+
+@pytest.mark.parametrize(
+    "simulated_network", [SimulatedNetworkConfig(circles=1)], indirect=True
+)
+async def test_circuit_breaker(
+    hass: HomeAssistant,
+    simulated_integration: MockConfigEntry,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test an unreachable node is backed off until it sends a frame again."""
+    scheduler = simulated_integration.runtime_data[SCHEDULER]
+    await scheduler.async_stop()
+    mac = simulated_network.macs(NodeType.CIRCLE)[0]
+    coordinator = simulated_integration.runtime_data[NODES][mac]
+    node = simulated_network.nodes[mac]
+    node.config = SimulatedNodeConfig(drop_rate=1.0)
+    # Like the poll circuit sensor, which is disabled by default
+    circuit_states: list[str] = []
+    remove_listener = coordinator.async_add_listener(
+        lambda: circuit_states.append(coordinator.breaker.state),
+        NodeFeature.AVAILABLE,
+    )
+
+    for _ in range(BREAKER_FAILURE_THRESHOLD - 1):
+        await coordinator.async_refresh()
+    assert coordinator.breaker.state == CIRCUIT_CLOSED
+    await coordinator.async_refresh()
+    assert coordinator.breaker.state == CIRCUIT_OPEN
+    assert coordinator.breaker.backoff == BREAKER_MIN_BACKOFF
+    assert not coordinator.breaker.allow_poll
+
+    # The half open state is written once the backoff expired
+    coordinator.breaker.retry_at = dt_util.utcnow()
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=BREAKER_MIN_BACKOFF + 1)
+    )
+    await hass.async_block_till_done()
+    assert circuit_states[-1] == CIRCUIT_HALF_OPEN
+
+    # A failed probe doubles the backoff
+    await coordinator.async_refresh()
+    assert coordinator.breaker.state == CIRCUIT_OPEN
+    assert coordinator.breaker.backoff == 2 * BREAKER_MIN_BACKOFF
+    assert coordinator.breaker.trips == 1
+
+    # Any frame of the node closes the circuit and polls it right away
+    node.config = SimulatedNodeConfig()
+    await node.async_push(NodeFeature.AVAILABLE, AvailableState(True, dt_util.utcnow()))
+    assert coordinator.breaker.state == CIRCUIT_CLOSED
+    assert scheduler.as_dict()["due_in"][mac] <= 0
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success
+
+    remove_listener()
+
+
+@pytest.mark.parametrize(
+    "simulated_network", [SimulatedNetworkConfig(circles=1)], indirect=True
+)
+async def test_availability_hysteresis(
+    hass: HomeAssistant,
+    simulated_integration: MockConfigEntry,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test entities stay available with their last value for a few failed polls."""
+    await simulated_integration.runtime_data[SCHEDULER].async_stop()
+    mac = simulated_network.macs(NodeType.CIRCLE)[0]
+    coordinator = simulated_integration.runtime_data[NODES][mac]
+    node = simulated_network.nodes[mac]
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "sensor", DOMAIN, f"{mac}-last_second"
+    )
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    power = hass.states.get(entity_id).state
+    assert power != "unavailable"
+
+    node.config = SimulatedNodeConfig(drop_rate=1.0)
+    for _ in range(DEFAULT_UNAVAILABLE_POLLS - 1):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+        assert hass.states.get(entity_id).state == power
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == "unavailable"
+
+    # A push shows the node responds, the failed polls before it no longer count
+    await node.async_push(NodeFeature.AVAILABLE, AvailableState(True, dt_util.utcnow()))
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == power
+    assert coordinator.metrics.consecutive_failures == 0
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == power
+
+    node.config = SimulatedNodeConfig()
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state != "unavailable"
+
+    # The grace period ends the availability before enough polls failed
+    coordinator.unavailable_polls = 10
+    coordinator.unavailable_grace = 0.1
+    node.config = SimulatedNodeConfig(drop_rate=1.0)
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state != "unavailable"
+    await asyncio.sleep(0.2)
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == "unavailable"
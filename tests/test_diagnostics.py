@@ -0,0 +1,72 @@
+"""Test the diagnostics of the Plugwise USB integration."""
+
+import json
+from unittest.mock import MagicMock
+
+from custom_components.plugwise_usb.const import DOMAIN, NODES
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.components.diagnostics import (
+    get_diagnostics_for_config_entry,
+    get_diagnostics_for_device,
+)
+from pytest_homeassistant_custom_component.typing import ClientSessionGenerator
+
+from .conftest import (
+    TEST_MAC,
+    TEST_NODE_MAC,
+    TEST_USB_PATH,
+    async_add_node,
+    create_mock_node,
+    setup_integration,
+)
+
+CIRCLE_PLUS_MAC = "000D6F0000000010"
+OTHER_NODE_MAC = "000D6F0000000012"
+
+
+async def test_diagnostics_redacted(
+    hass: HomeAssistant,
+    hass_client: ClientSessionGenerator,
+    mock_config_entry: MockConfigEntry,
+    mock_stick: MagicMock,
+    mock_node: MagicMock,
+) -> None:
+    """Test the diagnostics leave out the USB path and all MAC addresses."""
+    mock_stick.mac_coordinator = CIRCLE_PLUS_MAC
+    mock_stick.hardware = "070085"
+    mock_stick.firmware = None
+    mock_stick.network_state = True
+    mock_stick.network_discovered = True
+    mock_stick.joined_nodes = 2
+    await setup_integration(hass, mock_config_entry)
+    for node in (
+        create_mock_node(CIRCLE_PLUS_MAC, "Circle+ 00010"),
+        mock_node,
+        create_mock_node(OTHER_NODE_MAC, "Circle 00012"),
+    ):
+        await async_add_node(hass, mock_stick, node)
+    await mock_config_entry.runtime_data[NODES][TEST_NODE_MAC].async_refresh()
+    macs = [TEST_MAC, CIRCLE_PLUS_MAC, TEST_NODE_MAC, OTHER_NODE_MAC]
+
+    diagnostics = await get_diagnostics_for_config_entry(
+        hass, hass_client, mock_config_entry
+    )
+    dump = json.dumps(diagnostics)
+    assert not [leaked for leaked in macs if leaked in dump]
+    assert TEST_USB_PATH not in dump
+    assert sorted(diagnostics["nodes"]) == ["**CIRCLE+**", "**NODE_1**", "**NODE_2**"]
+    assert diagnostics["stick"]["mac_stick"] == "**STICK**"
+    assert "coordinator_discovery" in diagnostics["setup_timings"]
+    assert diagnostics["nodes"]["**NODE_1**"]["metrics"]["polls"] >= 1
+
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, TEST_NODE_MAC)})
+    node_diagnostics = await get_diagnostics_for_device(
+        hass, hass_client, mock_config_entry, device
+    )
+    dump = json.dumps(node_diagnostics)
+    assert not [leaked for leaked in macs if leaked in dump]
+    assert node_diagnostics["node_info"]["mac"] == "**NODE_1**"
+
+    assert await hass.config_entries.async_unload(mock_config_entry.entry_id)
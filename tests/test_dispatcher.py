@@ -0,0 +1,76 @@
+"""Test the entity dispatcher of the Plugwise USB integration."""
+
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import MagicMock
+
+from plugwise_usb.api import NodeFeature
+
+from custom_components.plugwise_usb.const import NODES
+from custom_components.plugwise_usb.dispatcher import (
+    PlugwiseUSBEntityDispatcher,
+    feature_index,
+)
+from custom_components.plugwise_usb.entity import PlugwiseUSBEntityDescription
+from homeassistant.const import Platform
+
+RELAY = PlugwiseUSBEntityDescription(key="relay", node_feature=NodeFeature.RELAY)
+POWER = PlugwiseUSBEntityDescription(key="power", node_feature=NodeFeature.POWER)
+ENERGY = PlugwiseUSBEntityDescription(
+    key="energy",
+    node_feature=NodeFeature.ENERGY,
+    exists_fn=lambda node_duc: node_duc.polled,
+)
+
+
+def _node(mac: str, *features: NodeFeature, polled: bool = True) -> Any:
+    """Return a coordinator stand-in of a node with the given features."""
+    return SimpleNamespace(
+        features=features,
+        entity_features={},
+        node_info=SimpleNamespace(mac=mac),
+        polled=polled,
+    )
+
+
+def _entity(node_duc: Any, description: PlugwiseUSBEntityDescription) -> str:
+    """Return a stand-in entity naming its node and key."""
+    return f"{node_duc.node_info.mac}-{description.key}"
+
+
+def test_entities_dispatched() -> None:
+    """Test each platform gets the new entities of a node in one call."""
+    circle = _node("circle", NodeFeature.RELAY, NodeFeature.POWER, NodeFeature.ENERGY)
+    config_entry = MagicMock(runtime_data={NODES: {"circle": circle}})
+    dispatcher = PlugwiseUSBEntityDispatcher(config_entry)
+    add_switches = MagicMock()
+    add_sensors = MagicMock()
+
+    # A platform gets the entities of the nodes known when it registers
+    dispatcher.async_add_platform(
+        Platform.SWITCH, feature_index((RELAY,)), _entity, add_switches
+    )
+    add_switches.assert_called_once_with(["circle-relay"])
+    dispatcher.async_add_platform(
+        Platform.SENSOR, feature_index((POWER, ENERGY)), _entity, add_sensors
+    )
+    add_sensors.assert_called_once_with(["circle-power", "circle-energy"])
+    assert circle.entity_features == {
+        (Platform.SWITCH, "relay"): NodeFeature.RELAY,
+        (Platform.SENSOR, "power"): NodeFeature.POWER,
+        (Platform.SENSOR, "energy"): NodeFeature.ENERGY,
+    }
+
+    # Entities are added once, and only when they exist for the node
+    add_switches.reset_mock()
+    add_sensors.reset_mock()
+    dispatcher.async_add_node_entities(circle)
+    stealth = _node("stealth", NodeFeature.POWER, NodeFeature.ENERGY, polled=False)
+    dispatcher.async_add_node_entities(stealth)
+    add_switches.assert_not_called()
+    add_sensors.assert_called_once_with(["stealth-power"])
+
+    # An unloaded platform gets no more entities
+    dispatcher.async_remove_platform(Platform.SWITCH)
+    dispatcher.async_add_node_entities(_node("plug", NodeFeature.RELAY))
+    add_switches.assert_not_called()
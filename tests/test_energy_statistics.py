@@ -0,0 +1,158 @@
+"""Test the import of the hourly energy of Plugwise USB nodes."""
+
+from collections.abc import Generator
+from datetime import UTC, datetime, timedelta
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+from plugwise_usb.api import EnergyStatistics
+import pytest
+
+from custom_components.plugwise_usb.const import DOMAIN
+from custom_components.plugwise_usb.energy_statistics import (
+    PlugwiseUSBEnergyStatistics,
+    statistic_id,
+)
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+MAC = "0123456789ABCDEF"
+HOUR = datetime(2025, 6, 1, 10, tzinfo=UTC)
+CONSUMPTION = statistic_id(MAC, "consumption")
+PRODUCTION = statistic_id(MAC, "production")
+
+
+def _energy(
+    hour: int,
+    consumption: tuple[float, float],
+    production: tuple[float, float] = (0.0, 0.0),
+) -> EnergyStatistics:
+    """Return the energy statistics of a node during the given hour.
+
+    Consumption and production are given as the hour and the day counter.
+    """
+    start = HOUR + timedelta(hours=hour)
+    day = start.replace(hour=0)
+    return EnergyStatistics(
+        hour_consumption=consumption[0],
+        hour_consumption_reset=start,
+        day_consumption=consumption[1],
+        day_consumption_reset=day,
+        hour_production=production[0],
+        hour_production_reset=start,
+        day_production=production[1],
+        day_production_reset=day,
+    )
+
+
+@pytest.fixture
+def mock_add_statistics() -> Generator[MagicMock]:
+    """Mock the import of external statistics by the recorder."""
+    with patch(
+        "custom_components.plugwise_usb.energy_statistics.async_add_external_statistics"
+    ) as add_statistics:
+        yield add_statistics
+
+
+def _imported(add_statistics: MagicMock) -> dict[str, list[tuple[Any, ...]]]:
+    """Return the imported rows of each call, by statistic id."""
+    return {
+        metadata["statistic_id"]: [
+            (row["start"], row["state"], row["sum"]) for row in rows
+        ]
+        for _, metadata, rows in (call.args for call in add_statistics.call_args_list)
+    }
+
+
+async def test_completed_hours_imported(
+    hass: HomeAssistant,
+    mock_config_entry: MockConfigEntry,
+    mock_add_statistics: MagicMock,
+) -> None:
+    """Test an hour is imported with its total from the day counter."""
+    importer = PlugwiseUSBEnergyStatistics(hass, mock_config_entry)
+    await importer.async_load()
+    for energy in (
+        _energy(0, (0.125, 0.125)),
+        _energy(0, (0.25, 0.25), (0.125, 0.125)),
+        # The first sample after the hour includes the end of the hour
+        _energy(1, (0.125, 0.625), (0.0, 0.125)),
+        _energy(1, (0.25, 0.75), (0.0, 0.125)),
+        _energy(2, (0.125, 1.0), (0.0, 0.125)),
+    ):
+        importer.async_add_energy(MAC, "Circle", energy)
+
+    await importer.async_import()
+
+    # One batched call per statistic, with a running sum
+    assert mock_add_statistics.call_count == 2
+    assert _imported(mock_add_statistics) == {
+        CONSUMPTION: [(HOUR, 0.5, 0.5), (HOUR + timedelta(hours=1), 0.375, 0.875)],
+        PRODUCTION: [(HOUR, 0.125, 0.125), (HOUR + timedelta(hours=1), 0.0, 0.125)],
+    }
+
+
+async def test_missed_hours(
+    hass: HomeAssistant,
+    mock_config_entry: MockConfigEntry,
+    mock_add_statistics: MagicMock,
+) -> None:
+    """Test hours without samples share the energy, also after a new day."""
+    importer = PlugwiseUSBEnergyStatistics(hass, mock_config_entry)
+    await importer.async_load()
+    importer.async_add_energy(MAC, "Circle", _energy(0, (0.25, 5.0)))
+    importer.async_add_energy(MAC, "Circle", _energy(3, (0.25, 6.5)))
+    # At 23:00, followed by 01:00 of the next day
+    importer.async_add_energy(MAC, "Circle", _energy(13, (0.5, 9.25)))
+    importer.async_add_energy(MAC, "Circle", _energy(15, (0.125, 0.625)))
+    await importer.async_import()
+
+    assert _imported(mock_add_statistics)[CONSUMPTION] == [
+        (HOUR, 0.5, 0.5),
+        (HOUR + timedelta(hours=1), 0.5, 1.0),
+        (HOUR + timedelta(hours=2), 0.5, 1.5),
+        # The hours up to 23:00 share the increase of the day counter
+        *(
+            (HOUR + timedelta(hours=hour), 0.25, 1.5 + 0.25 * (hour - 2))
+            for hour in range(3, 13)
+        ),
+        # The day counter restarted, the last value of 23:00 is its total
+        (HOUR + timedelta(hours=13), 0.5, 4.5),
+        (HOUR + timedelta(hours=14), 0.5, 5.0),
+    ]
+
+
+async def test_imported_once_after_restart(
+    hass: HomeAssistant,
+    hass_storage: dict[str, Any],
+    mock_config_entry: MockConfigEntry,
+    mock_add_statistics: MagicMock,
+) -> None:
+    """Test the running hour is completed after a restart, and imported once."""
+    importer = PlugwiseUSBEnergyStatistics(hass, mock_config_entry)
+    await importer.async_load()
+    importer.async_add_energy(MAC, "Circle", _energy(0, (0.125, 0.125)))
+    importer.async_add_energy(MAC, "Circle", _energy(1, (0.125, 0.625)))
+    await importer.async_import()
+    assert mock_add_statistics.call_count == 2
+    mock_add_statistics.reset_mock()
+    stored = hass_storage[f"{DOMAIN}.energy_statistics.{mock_config_entry.entry_id}"]
+    assert stored["data"]["imported"][CONSUMPTION] == {
+        "start": HOUR.isoformat(),
+        "sum": 0.5,
+    }
+    assert stored["data"]["running"][CONSUMPTION]["day_start"] == 0.5
+
+    restarted = PlugwiseUSBEnergyStatistics(hass, mock_config_entry)
+    await restarted.async_load()
+    # The node reports the hour already imported again
+    restarted.async_add_energy(MAC, "Circle", _energy(0, (0.125, 0.125)))
+    await restarted.async_import()
+    mock_add_statistics.assert_not_called()
+
+    # The hour running before the restart is completed after it
+    restarted.async_add_energy(MAC, "Circle", _energy(2, (0.25, 1.25)))
+    await restarted.async_import()
+    assert _imported(mock_add_statistics)[CONSUMPTION] == [
+        (HOUR + timedelta(hours=1), 0.5, 1.0)
+    ]
@@ -0,0 +1,92 @@
+"""Test the state writes of Plugwise USB entities."""
+
+from datetime import UTC, datetime
+from unittest.mock import MagicMock
+
+from plugwise_usb.api import NodeFeature, PowerStatistics, RelayState
+
+from custom_components.plugwise_usb.coordinator import PlugwiseUSBDataUpdateCoordinator
+from custom_components.plugwise_usb.entity import PlugwiseUSBEntity
+from custom_components.plugwise_usb.sensor import SENSOR_TYPES, PlugwiseUSBSensorEntity
+from custom_components.plugwise_usb.switch import SWITCH_TYPES, PlugwiseUSBSwitchEntity
+from homeassistant.core import HomeAssistant
+
+
+def _mock_writes(hass: HomeAssistant, entity: PlugwiseUSBEntity) -> MagicMock:
+    """Replace the state writes of an entity by a mock counting them."""
+    entity.hass = hass
+    entity.async_write_ha_state = MagicMock()
+    return entity.async_write_ha_state
+
+
+def _set_power(node: MagicMock, power: float) -> None:
+    """Set the power usage the mocked node answers with."""
+    node.states[NodeFeature.POWER] = PowerStatistics(power, power, datetime.now(UTC))
+
+
+async def test_unchanged_state_not_written(
+    hass: HomeAssistant,
+    mock_node: MagicMock,
+    mock_node_coordinator: PlugwiseUSBDataUpdateCoordinator,
+) -> None:
+    """Test a poll only writes the state of a power sensor outside its deadband."""
+    description = next(
+        description for description in SENSOR_TYPES if description.key == "last_second"
+    )
+    entity = PlugwiseUSBSensorEntity(mock_node_coordinator, description)
+    writes = _mock_writes(hass, entity)
+    remove_listener = mock_node_coordinator.async_add_listener(
+        entity._handle_coordinator_update, NodeFeature.POWER
+    )
+
+    await mock_node_coordinator.async_refresh()
+    assert writes.call_count == 1
+
+    # An unchanged poll is not written
+    await mock_node_coordinator.async_refresh()
+    assert writes.call_count == 1
+
+    # A change within the deadband of 1 W or 1 % is not written either
+    _set_power(mock_node, 100.5)
+    await mock_node_coordinator.async_refresh()
+    assert writes.call_count == 1
+    _set_power(mock_node, 102.0)
+    await mock_node_coordinator.async_refresh()
+    assert writes.call_count == 2
+
+    # Changed attributes and forced writes are always written
+    entity.async_write_ha_state_if_changed(102.0, {"last_reset": None})
+    assert writes.call_count == 3
+    entity.async_write_ha_state_if_changed(102.0, {"last_reset": None}, force=True)
+    assert writes.call_count == 4
+    remove_listener()
+
+
+async def test_command_result_is_compared(
+    hass: HomeAssistant,
+    mock_node: MagicMock,
+    mock_node_coordinator: PlugwiseUSBDataUpdateCoordinator,
+) -> None:
+    """Test a poll reverting the state written by a command is written."""
+    description = next(
+        description for description in SWITCH_TYPES if description.key == "relay"
+    )
+    entity = PlugwiseUSBSwitchEntity(mock_node_coordinator, description)
+    writes = _mock_writes(hass, entity)
+    remove_listener = mock_node_coordinator.async_add_listener(
+        entity._handle_coordinator_update, NodeFeature.RELAY
+    )
+    await mock_node_coordinator.async_refresh()
+    assert entity.is_on
+    assert writes.call_count == 1
+
+    await entity.async_turn_off()
+    assert not entity.is_on
+    assert writes.call_count == 2
+
+    # The relay is switched back at the node before the next poll
+    mock_node.states[NodeFeature.RELAY] = RelayState(True, datetime.now(UTC))
+    await mock_node_coordinator.async_refresh()
+    assert entity.is_on
+    assert writes.call_count == 3
+    remove_listener()
@@ -0,0 +1,157 @@
+"""Test the setup of the Plugwise USB integration."""
+
+import asyncio
+from datetime import UTC, datetime
+from unittest.mock import MagicMock
+
+from plugwise_usb.api import MotionState, NodeFeature, NodeType
+import pytest
+
+from custom_components.plugwise_usb.const import (
+    CONF_DISCOVERY_TIMEOUT,
+    DOMAIN,
+    NODES,
+    SCHEDULER,
+)
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .simulator import SimulatedNetwork, SimulatedNetworkConfig, SimulatedNodeConfig
+
+LARGE_NETWORK = SimulatedNetworkConfig(
+    circles=160,
+    stealths=10,
+    scans=12,
+    senses=12,
+    switches=6,
+    node=SimulatedNodeConfig(latency=0.001, jitter=0.0005),
+)
+
+
+def _block_discovery(mock_stick: MagicMock) -> asyncio.Event:
+    """Let the network discovery of the mocked Stick run until the event is set."""
+    discovered = asyncio.Event()
+
+    async def discover_nodes(load: bool = False) -> bool:
+        await discovered.wait()
+        return True
+
+    mock_stick.discover_nodes.side_effect = discover_nodes
+    return discovered
+
+
+async def test_setup_before_discovery(
+    hass: HomeAssistant, mock_config_entry: MockConfigEntry, mock_stick: MagicMock
+) -> None:
+    """Test setup completes while the network discovery runs in the background."""
+    discovered = _block_discovery(mock_stick)
+    mock_config_entry.add_to_hass(hass)
+    async with asyncio.timeout(1):
+        assert await hass.config_entries.async_setup(mock_config_entry.entry_id)
+    assert mock_config_entry.state is ConfigEntryState.LOADED
+    mock_stick.discover_nodes.assert_called_once_with(load=True)
+    assert not discovered.is_set()
+
+    discovered.set()
+    assert await hass.config_entries.async_unload(mock_config_entry.entry_id)
+
+
+async def test_setup_discovery_timeout(
+    hass: HomeAssistant, mock_config_entry: MockConfigEntry, mock_stick: MagicMock
+) -> None:
+    """Test setup waits for the discovery up to the timeout, then continues."""
+    mock_config_entry.add_to_hass(hass)
+    hass.config_entries.async_update_entry(
+        mock_config_entry, options={CONF_DISCOVERY_TIMEOUT: 1}
+    )
+
+    # Setup waits for a discovery finishing within the timeout
+    discovered = _block_discovery(mock_stick)
+    hass.loop.call_later(0.2, discovered.set)
+    start = hass.loop.time()
+    assert await hass.config_entries.async_setup(mock_config_entry.entry_id)
+    assert 0.2 <= hass.loop.time() - start < 1
+    assert await hass.config_entries.async_unload(mock_config_entry.entry_id)
+
+    # A slower discovery continues in the background once the timeout expired
+    discovered = _block_discovery(mock_stick)
+    start = hass.loop.time()
+    assert await hass.config_entries.async_setup(mock_config_entry.entry_id)
+    assert 1 <= hass.loop.time() - start < 2
+    assert mock_config_entry.state is ConfigEntryState.LOADED
+    assert not discovered.is_set()
+
+    discovered.set()
+    assert await hass.config_entries.async_unload(mock_config_entry.entry_id)
+
+
+@pytest.mark.parametrize("simulated_network", [LARGE_NETWORK], indirect=True)
+async def test_setup_large_network(
+    hass: HomeAssistant,
+    simulated_integration: MockConfigEntry,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test all 201 nodes of a large network get coordinators and entities."""
+    nodes = simulated_integration.runtime_data[NODES]
+    assert len(nodes) == 201
+    assert all(coordinator.node.is_loaded for coordinator in nodes.values())
+    # Every node is loaded once, by the library or for the Circle+ at discovery
+    assert all(node.loads == 1 for node in simulated_network.nodes.values())
+    mains = [
+        mac
+        for mac, node in simulated_network.nodes.items()
+        if not node.node_info.is_battery_powered
+    ]
+    assert sorted(simulated_integration.runtime_data[SCHEDULER].coordinators) == sorted(
+        mains
+    )
+    entities = er.async_entries_for_config_entry(
+        er.async_get(hass), simulated_integration.entry_id
+    )
+    assert {entity.unique_id.split("-")[0] for entity in entities} >= set(nodes)
+
+
+@pytest.mark.parametrize(
+    "simulated_network",
+    [SimulatedNetworkConfig(circles=2, node=SimulatedNodeConfig(drop_rate=1.0))],
+    indirect=True,
+)
+async def test_refresh_timeouts(
+    hass: HomeAssistant,
+    simulated_integration: MockConfigEntry,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test dropped requests are counted as timeouts of the node."""
+    mac = simulated_network.macs(NodeType.CIRCLE)[0]
+    coordinator = simulated_integration.runtime_data[NODES][mac]
+    await coordinator.async_refresh()
+    await coordinator.async_refresh()
+
+    assert not coordinator.last_update_success
+    assert coordinator.metrics.consecutive_failures == 2
+    assert coordinator.metrics.timeouts == 2
+    assert simulated_network.nodes[mac].dropped == 2
+
+
+@pytest.mark.parametrize(
+    "simulated_network", [SimulatedNetworkConfig(circles=0, scans=1)], indirect=True
+)
+@pytest.mark.usefixtures("simulated_integration")
+async def test_motion_push(
+    hass: HomeAssistant,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test a motion pushed by a Scan is written to its binary sensor."""
+    mac = simulated_network.macs(NodeType.SCAN)[0]
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "binary_sensor", DOMAIN, f"{mac}-motion"
+    )
+    assert entity_id is not None
+
+    await simulated_network.nodes[mac].async_push(
+        NodeFeature.MOTION, MotionState(True, datetime.now(UTC))
+    )
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == "on"
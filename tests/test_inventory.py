@@ -0,0 +1,68 @@
+"""Test the node inventory of the Plugwise USB integration."""
+
+from dataclasses import replace
+from datetime import UTC, datetime
+from typing import Any
+from unittest.mock import MagicMock
+
+from plugwise_usb.api import NodeEvent, NodeFeature
+
+from custom_components.plugwise_usb.const import DOMAIN, INVENTORY
+from custom_components.plugwise_usb.snapshot import encode_dataclass
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .conftest import TEST_NODE_MAC, async_node_event, setup_integration
+
+FIRMWARE = datetime(2011, 6, 27, 8, 52, 18, tzinfo=UTC)
+
+
+async def test_inventory_reconciled(
+    hass: HomeAssistant,
+    hass_storage: dict[str, Any],
+    mock_config_entry: MockConfigEntry,
+    mock_stick: MagicMock,
+    mock_node: MagicMock,
+) -> None:
+    """Test an outdated inventory is corrected once the node is loaded."""
+    mac = TEST_NODE_MAC
+    mock_node.node_info = replace(mock_node.node_info, firmware=FIRMWARE)
+    features = mock_node.node_info.features
+    outdated = replace(
+        mock_node.node_info,
+        features=(*features, NodeFeature.SENSE),
+        firmware=datetime(2008, 1, 1, tzinfo=UTC),
+    )
+    key = f"{DOMAIN}.inventory.{mock_config_entry.entry_id}"
+    hass_storage[key] = {
+        "version": 1,
+        "minor_version": 1,
+        "key": key,
+        "data": {mac: encode_dataclass(outdated)},
+    }
+    await setup_integration(hass, mock_config_entry)
+    entity_registry = er.async_get(hass)
+
+    # Entities of the inventory are added before the node is loaded
+    mock_node.is_loaded = False
+    mock_stick.nodes[mac] = mock_node
+    await async_node_event(hass, mock_stick, NodeEvent.DISCOVERED, mac)
+    assert entity_registry.async_get_entity_id("sensor", DOMAIN, f"{mac}-temperature")
+    # Loading is left to the library, only the Circle+ is loaded at discovery
+    mock_node.load.assert_not_called()
+
+    # The unsupported ones are removed once loaded
+    mock_node.is_loaded = True
+    await async_node_event(hass, mock_stick, NodeEvent.LOADED, mac)
+    assert not entity_registry.async_get_entity_id(
+        "sensor", DOMAIN, f"{mac}-temperature"
+    )
+    assert entity_registry.async_get_entity_id("switch", DOMAIN, f"{mac}-relay")
+    node_info = mock_config_entry.runtime_data[INVENTORY].node_info(mac)
+    assert node_info.features == features
+    assert node_info.firmware == FIRMWARE
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, mac)})
+    assert device.sw_version == str(FIRMWARE)
+
+    assert await hass.config_entries.async_unload(mock_config_entry.entry_id)
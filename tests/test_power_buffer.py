@@ -0,0 +1,82 @@
+"""Test the rolling power statistics of Plugwise USB nodes."""
+
+from datetime import UTC, datetime, timedelta
+import random
+
+from plugwise_usb.api import NodeType, PowerStatistics
+import pytest
+
+from custom_components.plugwise_usb.const import NODES, SCHEDULER
+from custom_components.plugwise_usb.power_buffer import PlugwiseUSBPowerBuffer
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .simulator import SimulatedNetwork, SimulatedNetworkConfig
+
+START = datetime(2025, 6, 1, 10, 0, tzinfo=UTC)
+
+
+def _sample(seconds: float, average: float, second: float) -> PowerStatistics:
+    """Return a power sample taken seconds after the start."""
+    return PowerStatistics(second, average, START + timedelta(seconds=seconds))
+
+
+def test_power_buffer_matches_window() -> None:
+    """Test the rolling statistics equal the ones of the samples in the window."""
+    buffer = PlugwiseUSBPowerBuffer(60, size=8)
+    assert buffer.mean is None
+    assert buffer.peak is None
+
+    rng = random.Random(1)
+    samples: list[tuple[float, float, float]] = []
+    for index in range(200):
+        time = index * 5.0 + rng.random()
+        average = rng.uniform(0, 2000)
+        second = average + rng.uniform(-50, 50)
+        assert buffer.add(_sample(time, average, second))
+        samples.append((time, average, second))
+        # At most 8 samples, none older than the window
+        window = [sample for sample in samples[-8:] if sample[0] > time - 60]
+        assert len(buffer) == len(window)
+        assert buffer.mean == pytest.approx(
+            sum(sample[1] for sample in window) / len(window)
+        )
+        assert buffer.minimum == min(sample[1] for sample in window)
+        assert buffer.maximum == max(sample[1] for sample in window)
+        assert buffer.peak == max(sample[2] for sample in window)
+
+
+def test_power_buffer_skips_repeated_samples() -> None:
+    """Test samples without a newer timestamp or values are not added."""
+    buffer = PlugwiseUSBPowerBuffer(300)
+    assert buffer.add(_sample(0, 10, 12))
+    assert not buffer.add(_sample(0, 20, 22))
+    assert not buffer.add(PowerStatistics(None, None, START + timedelta(seconds=5)))
+    assert len(buffer) == 1
+
+    buffer.expire(START.timestamp() + 300)
+    assert len(buffer) == 0
+    assert buffer.mean is None
+
+
+@pytest.mark.parametrize(
+    "simulated_network", [SimulatedNetworkConfig(circles=1)], indirect=True
+)
+async def test_power_statistics_of_polls(
+    hass: HomeAssistant,
+    simulated_integration: MockConfigEntry,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test every polled power sample ends up in the rolling statistics."""
+    await simulated_integration.runtime_data[SCHEDULER].async_stop()
+    mac = simulated_network.macs(NodeType.CIRCLE)[0]
+    coordinator = simulated_integration.runtime_data[NODES][mac]
+    node = simulated_network.nodes[mac]
+    requests = node.requests
+
+    for _ in range(3):
+        await coordinator.async_refresh()
+    assert coordinator.power_buffer is not None
+    assert coordinator.power_buffer.window == 300
+    assert len(coordinator.power_buffer) == 3
+    assert node.requests - requests == 3
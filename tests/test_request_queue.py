@@ -0,0 +1,56 @@
+"""Test the priority lane of the Plugwise USB requests."""
+
+import asyncio
+from collections import defaultdict
+
+from custom_components.plugwise_usb.request_queue import (
+    PlugwiseUSBRequestQueue,
+    RequestPriority,
+)
+
+
+async def test_priority_order() -> None:
+    """Test commands pre-empt polls, and polls go before background requests."""
+    queue = PlugwiseUSBRequestQueue()
+    started: list[str] = []
+    answers: defaultdict[str, asyncio.Event] = defaultdict(asyncio.Event)
+
+    async def _request(name: str) -> str:
+        started.append(name)
+        await answers[name].wait()
+        return name
+
+    async def _async_answer(name: str, task: asyncio.Task[str]) -> None:
+        answers[name].set()
+        assert await task == name
+        await asyncio.sleep(0)
+
+    def _submit(priority: RequestPriority, name: str) -> asyncio.Task[str]:
+        return asyncio.create_task(queue.async_submit(priority, _request, name))
+
+    first = _submit(RequestPriority.POLL, "first")
+    await asyncio.sleep(0)
+    background = _submit(RequestPriority.BACKGROUND, "background")
+    poll = _submit(RequestPriority.POLL, "poll")
+    await asyncio.sleep(0)
+    assert started == ["first"]
+    assert queue.depth == 2
+
+    # A command does not wait for the request in flight
+    command = _submit(RequestPriority.INTERACTIVE, "command")
+    await asyncio.sleep(0)
+    assert started == ["first", "command"]
+    assert queue.in_flight == 2
+
+    # No poll starts while a command is in flight
+    await _async_answer("first", first)
+    assert started == ["first", "command"]
+
+    await _async_answer("command", command)
+    assert started == ["first", "command", "poll"]
+    await _async_answer("poll", poll)
+    await _async_answer("background", background)
+    assert started == ["first", "command", "poll", "background"]
+    assert queue.depth == 0
+    assert queue.in_flight == 0
+    assert queue.telemetry.sent_total == 4
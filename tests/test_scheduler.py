@@ -0,0 +1,137 @@
+"""Test the poll scheduler of the Plugwise USB integration."""
+
+import asyncio
+from datetime import timedelta
+from itertools import pairwise
+from time import perf_counter
+from unittest.mock import MagicMock
+
+from plugwise_usb.api import NodeFeature
+
+from custom_components.plugwise_usb.const import DOMAIN
+from custom_components.plugwise_usb.coordinator import PlugwiseUSBNetworkCoordinator
+from custom_components.plugwise_usb.scheduler import PlugwiseUSBPollScheduler
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+
+def _mock_coordinator(
+    hass: HomeAssistant, mac: str, polls: list[tuple[str, float]]
+) -> MagicMock:
+    """Return a mocked node coordinator recording the time of each refresh."""
+    coordinator = MagicMock()
+    coordinator.node.mac = mac
+    coordinator.async_contexts.return_value = [NodeFeature.POWER]
+
+    async def async_refresh() -> None:
+        polls.append((mac, hass.loop.time()))
+
+    async def async_node_update() -> dict[NodeFeature, float]:
+        await asyncio.sleep(0.05)
+        polls.append((mac, hass.loop.time()))
+        return {NodeFeature.POWER: 1.0}
+
+    def async_set_poll_limits(poll_interval: timedelta, *_: timedelta) -> None:
+        coordinator.poll_interval = poll_interval
+
+    coordinator.async_refresh = async_refresh
+    coordinator.async_node_update = async_node_update
+    coordinator.async_set_poll_limits = async_set_poll_limits
+    coordinator.polled_features = (NodeFeature.POWER,)
+    coordinator.breaker.backoff = None
+    return coordinator
+
+
+async def _async_wait_polls(polls: list[tuple[str, float]], count: int) -> None:
+    """Wait until the scheduler refreshed a number of times."""
+    async with asyncio.timeout(10):
+        while len(polls) < count:
+            await asyncio.sleep(0.01)
+
+
+async def test_polls_are_spaced(hass: HomeAssistant) -> None:
+    """Test the polls of all nodes are spread evenly over their interval."""
+    config_entry = MockConfigEntry(domain=DOMAIN)
+    config_entry.add_to_hass(hass)
+    scheduler = PlugwiseUSBPollScheduler(
+        hass, config_entry, timedelta(seconds=1), poll_rate=10
+    )
+    polls: list[tuple[str, float]] = []
+    macs = [f"000D6F000000001{index}" for index in range(4)]
+    for mac in macs:
+        scheduler.async_add_coordinator(_mock_coordinator(hass, mac, polls))
+    # A node without entities is not polled
+    idle = _mock_coordinator(hass, "000D6F0000000019", polls)
+    idle.async_contexts.return_value = []
+    idle.polled_features = ()
+    scheduler.async_add_coordinator(idle)
+    scheduler.async_start()
+
+    # Four nodes polled once per second, one poll every 0.25 seconds
+    await _async_wait_polls(polls, 8)
+    assert [mac for mac, _ in polls] == macs * 2
+    assert all(later - earlier >= 0.19 for (_, earlier), (_, later) in pairwise(polls))
+
+    # The request budget of the Stick bounds the spacing
+    scheduler.async_update_settings(timedelta(seconds=1), 2)
+    polls.clear()
+    await _async_wait_polls(polls, 3)
+    assert all(later - earlier >= 0.45 for (_, earlier), (_, later) in pairwise(polls))
+
+    await scheduler.async_stop()
+
+
+async def test_network_sweep(hass: HomeAssistant) -> None:
+    """Test network sweeps follow the schedule of each node, without pacing."""
+    config_entry = MockConfigEntry(domain=DOMAIN)
+    config_entry.add_to_hass(hass)
+    scheduler = PlugwiseUSBPollScheduler(
+        hass, config_entry, timedelta(seconds=60), poll_rate=1
+    )
+    network_coordinator = PlugwiseUSBNetworkCoordinator(
+        hass, config_entry, max_in_flight=2
+    )
+    scheduler.async_set_network_coordinator(network_coordinator)
+    polls: list[tuple[str, float]] = []
+    coordinators = {
+        mac: _mock_coordinator(hass, mac, polls)
+        for mac in (f"000D6F000000001{index}" for index in range(4))
+    }
+    for coordinator in coordinators.values():
+        scheduler.async_add_coordinator(coordinator)
+    scheduler.async_start()
+    await _async_wait_polls(polls, 4)
+
+    # A rescheduled node is swept on its own, ahead of the others
+    boosted = next(iter(coordinators))
+    scheduler.async_reschedule(boosted)
+    async with asyncio.timeout(10):
+        while coordinators[boosted].async_set_updated_data.call_count < 2:
+            await asyncio.sleep(0.01)
+    assert [mac for mac, _ in polls[4:]] == [boosted]
+
+    # A node backed off by its circuit breaker is only swept after its backoff
+    coordinators[boosted].breaker.backoff = 600
+    scheduler.async_reschedule(boosted)
+    async with asyncio.timeout(10):
+        while coordinators[boosted].async_set_updated_data.call_count < 3:
+            await asyncio.sleep(0.01)
+    assert scheduler.as_dict()["due_in"][boosted] > 60
+    coordinators[boosted].breaker.backoff = None
+    await scheduler.async_stop()
+
+    # Requests are only limited by the number in flight, not spaced in time
+    start = perf_counter()
+    await network_coordinator.async_refresh()
+    assert perf_counter() - start < 0.2
+    assert len(polls) == 10
+
+    # A node failing unexpectedly only fails its own refresh
+    coordinators[boosted].async_node_update = MagicMock(side_effect=RuntimeError)
+    await network_coordinator.async_refresh()
+    assert network_coordinator.last_update_success
+    coordinators[boosted].async_set_update_error.assert_called_once()
+    assert all(
+        coordinator.async_set_updated_data.call_count == (4 if mac == boosted else 3)
+        for mac, coordinator in coordinators.items()
+    )
@@ -0,0 +1,128 @@
+"""Test the diagnostic sensors of the Plugwise USB integration."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+from plugwise_usb.exceptions import NodeTimeout
+import pytest
+
+from custom_components.plugwise_usb.const import DOMAIN, NODES, REQUEST_QUEUE, SCHEDULER
+from custom_components.plugwise_usb.coordinator import PlugwiseUSBDataUpdateCoordinator
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity_component import async_update_entity
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .conftest import TEST_MAC, TEST_NODE_MAC, async_add_node, setup_integration
+
+
+def _enable(hass: HomeAssistant, mac: str, *keys: str) -> dict[str, str]:
+    """Enable sensors disabled by default, return their entity id by key."""
+    entity_registry = er.async_get(hass)
+    return {
+        key: entity_registry.async_get_or_create(
+            "sensor", DOMAIN, f"{mac}-{key}", disabled_by=None
+        ).entity_id
+        for key in keys
+    }
+
+
+async def _async_setup_node(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    mock_stick: MagicMock,
+    mock_node: MagicMock,
+) -> PlugwiseUSBDataUpdateCoordinator:
+    """Set up the integration with the mocked node, without scheduled polls."""
+    await setup_integration(hass, config_entry)
+    await config_entry.runtime_data[SCHEDULER].async_stop()
+    await async_add_node(hass, mock_stick, mock_node)
+    return config_entry.runtime_data[NODES][mock_node.mac]
+
+
+async def test_poll_metric_sensors(
+    hass: HomeAssistant,
+    mock_config_entry: MockConfigEntry,
+    mock_stick: MagicMock,
+    mock_node: MagicMock,
+) -> None:
+    """Test the poll metrics of a node stay available while it fails."""
+    mac = TEST_NODE_MAC
+    entity_ids = _enable(
+        hass,
+        mac,
+        "poll_duration",
+        "poll_timeouts",
+        "poll_consecutive_failures",
+    )
+    coordinator = await _async_setup_node(
+        hass, mock_config_entry, mock_stick, mock_node
+    )
+
+    power_id = er.async_get(hass).async_get_entity_id(
+        "sensor", DOMAIN, f"{mac}-last_second"
+    )
+    await coordinator.async_refresh()
+    failures = 3
+    get_state = mock_node.get_state
+    mock_node.get_state = AsyncMock(side_effect=NodeTimeout)
+    for _ in range(failures):
+        await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get(power_id).state == STATE_UNAVAILABLE
+    assert hass.states.get(entity_ids["poll_timeouts"]).state == str(failures)
+    assert hass.states.get(entity_ids["poll_consecutive_failures"]).state == str(
+        failures
+    )
+
+    mock_node.get_state = get_state
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get(power_id).state != STATE_UNAVAILABLE
+    assert hass.states.get(entity_ids["poll_timeouts"]).state == str(failures)
+    assert hass.states.get(entity_ids["poll_consecutive_failures"]).state == "0"
+    assert float(hass.states.get(entity_ids["poll_duration"]).state) > 0
+
+    assert await hass.config_entries.async_unload(mock_config_entry.entry_id)
+
+
+async def test_stick_telemetry_sensors(
+    hass: HomeAssistant,
+    mock_config_entry: MockConfigEntry,
+    mock_stick: MagicMock,
+    mock_node: MagicMock,
+) -> None:
+    """Test the sensors of the Stick sample the link telemetry."""
+    entity_ids = _enable(
+        hass,
+        TEST_MAC,
+        "requests_sent",
+        "responses_received",
+        "queue_depth",
+        "in_flight",
+        "failure_rate",
+        "mean_rtt",
+    )
+    coordinator = await _async_setup_node(
+        hass, mock_config_entry, mock_stick, mock_node
+    )
+    telemetry = mock_config_entry.runtime_data[REQUEST_QUEUE].telemetry
+
+    await coordinator.async_refresh()
+    mock_node.get_state = AsyncMock(side_effect=NodeTimeout)
+    await coordinator.async_refresh()
+    for entity_id in entity_ids.values():
+        await async_update_entity(hass, entity_id)
+
+    def _value(key: str) -> float:
+        return float(hass.states.get(entity_ids[key]).state)
+
+    assert telemetry.timeouts_total == 1
+    assert _value("failure_rate") == pytest.approx(50)
+    assert _value("failure_rate") == pytest.approx(telemetry.failure_rate)
+    assert _value("requests_sent") > _value("responses_received") > 0
+    assert _value("mean_rtt") > 0
+    assert _value("queue_depth") == 0
+    assert _value("in_flight") == 0
+
+    assert await hass.config_entries.async_unload(mock_config_entry.entry_id)
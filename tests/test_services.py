@@ -0,0 +1,178 @@
+"""Test the services of the Plugwise USB integration."""
+
+from plugwise_usb.api import NodeFeature, NodeType, RelayLock
+import pytest
+import voluptuous as vol
+
+from custom_components.plugwise_usb.const import (
+    DOMAIN,
+    SERVICE_DISABLE_PRODUCTION,
+    SERVICE_ENABLE_PRODUCTION,
+    SERVICE_SWITCH_RELAYS,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import (
+    area_registry as ar,
+    device_registry as dr,
+    entity_registry as er,
+)
+
+from .simulator import SimulatedNetwork, SimulatedNetworkConfig, SimulatedNodeConfig
+
+UNKNOWN_MAC = "000D6F00FFFFFFFF"
+PRODUCTION_NETWORK = SimulatedNetworkConfig(circles=3, scans=1)
+RELAY_NETWORK = SimulatedNetworkConfig(circles=6, scans=1)
+
+
+@pytest.mark.parametrize("simulated_network", [PRODUCTION_NETWORK], indirect=True)
+@pytest.mark.usefixtures("simulated_integration")
+async def test_enable_production_all_circles(
+    hass: HomeAssistant,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test production logging is enabled for every node with energy logs."""
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_ENABLE_PRODUCTION,
+        {"all_circles": True, "consumption_interval": 30},
+        blocking=True,
+        return_response=True,
+    )
+
+    circles = [
+        simulated_network.coordinator_mac,
+        *simulated_network.macs(NodeType.CIRCLE),
+    ]
+    assert response["succeeded"] == 4
+    assert response["nodes"] == {
+        mac: {"success": True, "attempts": 1} for mac in circles
+    }
+    for mac in circles:
+        assert simulated_network.nodes[mac].energy_intervals == (30, 60)
+
+
+@pytest.mark.parametrize("simulated_network", [PRODUCTION_NETWORK], indirect=True)
+@pytest.mark.usefixtures("simulated_integration")
+async def test_disable_production_by_area_and_mac(
+    hass: HomeAssistant,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test nodes selected by area and by mac, with the result per node."""
+    first, second, third = simulated_network.macs(NodeType.CIRCLE)
+    scan = simulated_network.macs(NodeType.SCAN)[0]
+    for mac in (first, second, third):
+        simulated_network.nodes[mac].energy_intervals = (60, 60)
+    area = ar.async_get(hass).async_create("Roof")
+    device_registry = dr.async_get(hass)
+    for mac in (first, scan):
+        device = device_registry.async_get_device(identifiers={(DOMAIN, mac)})
+        device_registry.async_update_device(device.id, area_id=area.id)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_DISABLE_PRODUCTION,
+        {"area_id": area.id, "mac": [second.lower(), UNKNOWN_MAC]},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert list(response["nodes"]) == [second, UNKNOWN_MAC, first]
+    assert response["succeeded"] == 2
+    assert response["failed"] == 1
+    assert response["nodes"][first]["success"]
+    assert response["nodes"][second]["success"]
+    assert not response["nodes"][UNKNOWN_MAC]["success"]
+    assert simulated_network.nodes[first].energy_intervals == (60, 0)
+    assert simulated_network.nodes[second].energy_intervals == (60, 0)
+    assert simulated_network.nodes[third].energy_intervals == (60, 60)
+
+
+@pytest.mark.usefixtures("simulated_integration")
+async def test_production_failures(hass: HomeAssistant) -> None:
+    """Test a call fails when no node succeeds or the intervals are invalid."""
+    with pytest.raises(HomeAssistantError, match=UNKNOWN_MAC):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_ENABLE_PRODUCTION, {"mac": UNKNOWN_MAC}, blocking=True
+        )
+    with pytest.raises(vol.Invalid):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_ENABLE_PRODUCTION,
+            {
+                "all_circles": True,
+                "consumption_interval": 60,
+                "production_interval": 90,
+            },
+            blocking=True,
+        )
+    with pytest.raises(vol.Invalid):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_DISABLE_PRODUCTION, {}, blocking=True
+        )
+
+
+@pytest.mark.parametrize("simulated_network", [RELAY_NETWORK], indirect=True)
+@pytest.mark.usefixtures("simulated_integration")
+async def test_switch_relays(
+    hass: HomeAssistant,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test all relays are switched in one staggered batch."""
+    circles = [
+        simulated_network.coordinator_mac,
+        *simulated_network.macs(NodeType.CIRCLE),
+    ]
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SWITCH_RELAYS,
+        {"all_circles": True, "state": False, "stagger": 0.02},
+        blocking=True,
+        return_response=True,
+    )
+    await hass.async_block_till_done()
+
+    assert response["succeeded"] == 7
+    assert response["failed"] == 0
+    assert response["duration"] >= 6 * 0.02
+    entity_registry = er.async_get(hass)
+    for mac in circles:
+        assert not simulated_network.nodes[mac].states[NodeFeature.RELAY].state
+        entity_id = entity_registry.async_get_entity_id(
+            "switch", DOMAIN, f"{mac}-relay"
+        )
+        assert hass.states.get(entity_id).state == "off"
+
+
+@pytest.mark.parametrize("simulated_network", [RELAY_NETWORK], indirect=True)
+@pytest.mark.usefixtures("simulated_integration")
+async def test_switch_relays_retries(
+    hass: HomeAssistant,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test failed relay commands are retried and reported per node."""
+    first, second, third, *_ = simulated_network.macs(NodeType.CIRCLE)
+    simulated_network.nodes[second].config = SimulatedNodeConfig(drop_rate=1.0)
+    simulated_network.nodes[third].states[NodeFeature.RELAY_LOCK] = RelayLock(True)
+    scan = simulated_network.macs(NodeType.SCAN)[0]
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SWITCH_RELAYS,
+        {"mac": [first, second, third, scan], "state": False, "retries": 2},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response["succeeded"] == 1
+    assert response["nodes"][first] == {"success": True, "attempts": 1}
+    assert response["nodes"][second]["attempts"] == 3
+    assert simulated_network.nodes[second].dropped == 3
+    # A locked relay is not retried
+    assert response["nodes"][third]["attempts"] == 1
+    assert "locked" in response["nodes"][third]["error"]
+    assert simulated_network.nodes[third].states[NodeFeature.RELAY].state
+    assert not response["nodes"][scan]["success"]
+    assert not simulated_network.nodes[first].states[NodeFeature.RELAY].state
+    assert simulated_network.nodes[second].states[NodeFeature.RELAY].state
@@ -0,0 +1,129 @@
+"""Test the warm restart of the Plugwise USB integration from a snapshot."""
+
+from datetime import UTC, datetime
+from typing import Any
+from unittest.mock import MagicMock
+
+from plugwise_usb.api import EnergyStatistics, NodeFeature, PowerStatistics, RelayState
+from plugwise_usb.exceptions import NodeTimeout
+
+from custom_components.plugwise_usb.const import (
+    DEFAULT_UNAVAILABLE_POLLS,
+    DOMAIN,
+    NODES,
+)
+from custom_components.plugwise_usb.coordinator import PlugwiseUSBDataUpdateCoordinator
+from custom_components.plugwise_usb.sensor import SENSOR_TYPES, PlugwiseUSBSensorEntity
+from custom_components.plugwise_usb.snapshot import (
+    PlugwiseUSBSnapshot,
+    decode_states,
+    encode_states,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .conftest import TEST_NODE_MAC
+
+NOW = datetime(2025, 6, 1, 10, 15, tzinfo=UTC)
+REMOVED_MAC = "000D6F0000000012"
+UNREGISTERED_MAC = "000D6F0000000013"
+
+
+def _snapshot(power: float) -> dict[str, Any]:
+    """Return the snapshot of a node using power."""
+    return encode_states({NodeFeature.POWER: PowerStatistics(power, power, NOW)})
+
+
+def test_states_round_trip() -> None:
+    """Test the snapshot of the states of a node decodes to the same states."""
+    states = {
+        NodeFeature.POWER: PowerStatistics(12.5, 10.0, NOW),
+        NodeFeature.RELAY: RelayState(False, NOW),
+        NodeFeature.ENERGY: EnergyStatistics(
+            hour_consumption=0.25,
+            hour_consumption_reset=NOW.replace(minute=0),
+            day_consumption=3.5,
+            day_consumption_reset=NOW.replace(hour=0, minute=0),
+        ),
+        # Switch events are no states and are not restored
+        NodeFeature.SWITCH: object(),
+    }
+
+    restored = decode_states(encode_states(states))
+
+    del states[NodeFeature.SWITCH]
+    assert restored == states
+
+
+async def test_restored_until_refreshed(
+    hass: HomeAssistant,
+    mock_node: MagicMock,
+    mock_node_coordinator: PlugwiseUSBDataUpdateCoordinator,
+) -> None:
+    """Test restored states are served until a refresh succeeds."""
+    coordinator = mock_node_coordinator
+    coordinator.async_restore_states(decode_states(_snapshot(123.0)))
+    description = next(
+        description for description in SENSOR_TYPES if description.key == "last_second"
+    )
+    entity = PlugwiseUSBSensorEntity(coordinator, description)
+    remove_listener = coordinator.async_add_listener(lambda: None, NodeFeature.POWER)
+
+    # A failed refresh keeps serving the restored state
+    get_state = mock_node.get_state
+    mock_node.get_state = MagicMock(side_effect=NodeTimeout)
+    await coordinator.async_refresh()
+    assert not coordinator.last_update_success
+    assert coordinator.stale
+    assert entity.available
+    assert coordinator.data[NodeFeature.POWER].last_second == 123.0
+
+    # Until as many polls failed in a row as for a live state
+    for _ in range(DEFAULT_UNAVAILABLE_POLLS - 1):
+        await coordinator.async_refresh()
+    assert not entity.available
+
+    mock_node.get_state = get_state
+    await coordinator.async_refresh()
+    assert not coordinator.stale
+    assert entity.available
+    assert coordinator.data[NodeFeature.POWER] == mock_node.states[NodeFeature.POWER]
+    remove_listener()
+
+
+async def test_removed_nodes_pruned(
+    hass: HomeAssistant,
+    hass_storage: dict[str, Any],
+    mock_config_entry: MockConfigEntry,
+    mock_node_coordinator: PlugwiseUSBDataUpdateCoordinator,
+) -> None:
+    """Test the snapshot only keeps nodes with a device."""
+    key = f"{DOMAIN}.snapshot.{mock_config_entry.entry_id}"
+    hass_storage[key] = {
+        "version": 1,
+        "minor_version": 1,
+        "key": key,
+        "data": {
+            mac: _snapshot(1.0)
+            for mac in (TEST_NODE_MAC, REMOVED_MAC, UNREGISTERED_MAC)
+        },
+    }
+    device_registry = dr.async_get(hass)
+    for mac in (TEST_NODE_MAC, REMOVED_MAC):
+        device_registry.async_get_or_create(
+            config_entry_id=mock_config_entry.entry_id, identifiers={(DOMAIN, mac)}
+        )
+    mock_config_entry.runtime_data[NODES] = {TEST_NODE_MAC: mock_node_coordinator}
+    await mock_node_coordinator.async_refresh()
+    snapshot = PlugwiseUSBSnapshot(hass, mock_config_entry)
+    await snapshot.async_load()
+    assert snapshot.restored_states(UNREGISTERED_MAC)
+
+    # A removed node is forgotten at once, a node without device at the save
+    snapshot.async_remove(REMOVED_MAC)
+    assert not snapshot.restored_states(REMOVED_MAC)
+    await snapshot.async_save()
+    assert hass_storage[key]["data"] == {
+        TEST_NODE_MAC: encode_states(mock_node_coordinator.data)
+    }
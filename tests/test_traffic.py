@@ -0,0 +1,128 @@
+"""Test the recording and replay of Plugwise USB-Stick traffic."""
+
+import asyncio
+from datetime import UTC, datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from plugwise_usb.api import MotionState, NodeFeature, NodeType
+import pytest
+
+from custom_components.plugwise_usb.const import (
+    CONF_USB_PATH,
+    DOMAIN,
+    NODES,
+    SCHEDULER,
+    SERVICE_START_RECORDING,
+    SERVICE_STOP_RECORDING,
+)
+from custom_components.plugwise_usb.traffic import ERROR, PUSH, RESPONSE, load_traffic
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .conftest import STICK_SETUP_MOCK, TEST_MAC, TEST_USB_PATH, setup_integration
+from .replay import ReplaySession
+from .simulator import SimulatedNetwork, SimulatedNetworkConfig
+
+RECORDED_NETWORK = SimulatedNetworkConfig(circles=2, scans=1)
+
+
+@pytest.fixture(autouse=True)
+def config_dir(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Write the recordings to a temporary configuration folder."""
+    hass.config.config_dir = str(tmp_path)
+
+
+async def _async_record(
+    hass: HomeAssistant, config_entry: MockConfigEntry, network: SimulatedNetwork
+) -> Path:
+    """Record two refreshes of every Circle and a motion of the Scan."""
+    await config_entry.runtime_data[SCHEDULER].async_stop()
+    response = await hass.services.async_call(
+        DOMAIN, SERVICE_START_RECORDING, blocking=True, return_response=True
+    )
+
+    coordinators = [
+        config_entry.runtime_data[NODES][mac]
+        for mac in (network.coordinator_mac, *network.macs(NodeType.CIRCLE))
+    ]
+    for _ in range(2):
+        for coordinator in coordinators:
+            await coordinator.async_refresh()
+    await network.nodes[network.macs(NodeType.SCAN)[0]].async_push(
+        NodeFeature.MOTION, MotionState(True, datetime.now(UTC))
+    )
+
+    summary = await hass.services.async_call(
+        DOMAIN, SERVICE_STOP_RECORDING, blocking=True, return_response=True
+    )
+    assert summary["path"] == response["path"]
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    return Path(summary["path"])
+
+
+@pytest.mark.parametrize("simulated_network", [RECORDED_NETWORK], indirect=True)
+async def test_record_traffic(
+    hass: HomeAssistant,
+    simulated_integration: MockConfigEntry,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test requests, responses and pushes are recorded."""
+    path = await _async_record(hass, simulated_integration, simulated_network)
+
+    header, records = await hass.async_add_executor_job(load_traffic, path)
+    assert header["stick"]["mac_coordinator"] == simulated_network.coordinator_mac
+    assert set(header["nodes"]) == set(simulated_network.nodes)
+    responses = [record for record in records if record.kind == RESPONSE]
+    assert len(responses) == 6
+    mac = simulated_network.macs(NodeType.CIRCLE)[0]
+    last_response = [record for record in responses if record.mac == mac][-1]
+    assert (
+        last_response.states[NodeFeature.POWER]
+        == simulated_network.nodes[mac].states[NodeFeature.POWER]
+    )
+    assert all(record.rtt is not None for record in responses)
+    assert [record.kind for record in records].count(PUSH) == 1
+    assert not any(record.kind == ERROR for record in records)
+
+
+@pytest.mark.parametrize("simulated_network", [RECORDED_NETWORK], indirect=True)
+async def test_replay_traffic(
+    hass: HomeAssistant,
+    simulated_integration: MockConfigEntry,
+    simulated_network: SimulatedNetwork,
+) -> None:
+    """Test a recording replays the recorded states through the integration."""
+    path = await _async_record(hass, simulated_integration, simulated_network)
+    session = await hass.async_add_executor_job(ReplaySession, path, 100.0)
+
+    config_entry = MockConfigEntry(
+        domain=DOMAIN, data={CONF_USB_PATH: TEST_USB_PATH}, unique_id=TEST_MAC
+    )
+    with patch(STICK_SETUP_MOCK, session.create_stick):
+        await setup_integration(hass, config_entry)
+        async with asyncio.timeout(10):
+            while not session.stick.network_discovered:
+                await asyncio.sleep(0.01)
+        await config_entry.runtime_data[SCHEDULER].async_stop()
+
+        mac = simulated_network.macs(NodeType.CIRCLE)[0]
+        coordinator = config_entry.runtime_data[NODES][mac]
+        await coordinator.async_refresh()
+        await coordinator.async_refresh()
+        assert (
+            coordinator.data[NodeFeature.POWER]
+            == simulated_network.nodes[mac].states[NodeFeature.POWER]
+        )
+
+        scan = simulated_network.macs(NodeType.SCAN)[0]
+        entity_id = er.async_get(hass).async_get_entity_id(
+            "binary_sensor", DOMAIN, f"{scan}-motion"
+        )
+        assert hass.states.get(entity_id).state != "on"
+        assert await session.async_replay() == 1
+        await hass.async_block_till_done()
+        assert hass.states.get(entity_id).state == "on"
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)